@@ -136,8 +136,9 @@ protected function reprocessSession($session, $apiKey)
         $scriptPath = storage_path('app/scripts/bank_statement_extractor.py');
         $model = $session->model_used ?? 'gpt-4o';
 
+        // Reprocessing exists to re-run extraction: skip the result cache, store the fresh result
         $command = sprintf(
-            '/var/www/html/crmfinity_underwriting/crmfinity-ai/venv/bin/python3 %s %s %s %s %s 2>&1',
+            'BANK_EXTRACTOR_CACHE=refresh /var/www/html/crmfinity_underwriting/crmfinity-ai/venv/bin/python3 %s %s %s %s %s 2>&1',
             escapeshellarg($scriptPath),
             escapeshellarg($pdfPath),
             escapeshellarg($apiKey),
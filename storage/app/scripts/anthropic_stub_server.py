@@ -0,0 +1,537 @@
+#!/usr/bin/env python3
+"""
+Anthropic API Stand-in Server
+A local HTTP server speaking enough of the Messages and Message Batches APIs to run
+bank_statement_extractor.py end to end without network access or API spend, and to
+benchmark or load-test the AI path deterministically.
+
+Responses come from, in order:
+  1. a replay directory of recorded responses (--replay DIR), matched by request hash
+  2. a synthetic extraction: every statement line that starts with a date and carries
+     an amount becomes a transaction, in whichever output format (json or compact) the
+     system prompt asks for, or as a call to the tool that tool_choice forces. Usage is reported at ~4 characters per token.
+
+Recording: with --record DIR --upstream https://api.anthropic.com every message
+request is forwarded (non-streaming, with the caller's API key), the response saved
+under DIR, and returned to the caller (as SSE if it asked to stream).
+
+Fault injection (all draws come from one RNG seeded with --seed):
+  --error-rate 529=0.1 --error-rate 500=0.02   fail requests with that status
+  --retry-after SECONDS                         retry-after header on 429/529/503
+  --truncate-rate 0.1                           cut responses short (stop_reason max_tokens)
+  --stream-error-rate 0.05                      kill streams midway with an overloaded error event
+  --latency SECONDS / --tokens-per-sec N        time to first byte / output pacing
+
+Endpoints:
+  POST /v1/messages                      (streaming and non-streaming)
+  POST /v1/messages/batches
+  GET  /v1/messages/batches/<id>
+  GET  /v1/messages/batches/<id>/results
+
+Usage: python3 anthropic_stub_server.py [--port 8765] [--replay DIR | --record DIR --upstream URL]
+                                        [--error-rate CODE=RATE ...] [--truncate-rate R] [--seed N] ...
+
+Point the extractor at it with BANK_EXTRACTOR_API_BASE_URL=http://127.0.0.1:<port>
+(or ANTHROPIC_BASE_URL); any API key works unless recording.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+_AMOUNT = r'-?\$?[\d,]+\.\d{2}-?'
+_LINE_RE = re.compile(
+    rf'^\s*(\d{{1,2}})/(\d{{1,2}})(?:/(\d{{2,4}}))?\s+(.+?)\s+({_AMOUNT})(?:\s+({_AMOUNT}))?\s*$'
+)
+_CONTINUATION_RE = re.compile(r'stopped at the output limit after (\d+) transactions')
+_DEBIT_WORDS_RE = re.compile(r'\b(?:PURCHASE|PAYMENT|WITHDRAWAL|DEBIT|CHECK|FEE|ACH DEBIT|POS)\b', re.IGNORECASE)
+
+# status → (error type, message) as the real API reports them
+_ERRORS = {
+    429: ("rate_limit_error", "Number of request tokens has exceeded your rate limit (stub)"),
+    500: ("api_error", "Internal server error (stub)"),
+    503: ("api_error", "Service unavailable (stub)"),
+    529: ("overloaded_error", "Overloaded (stub)"),
+}
+_STREAM_DELTA_CHARS = 64
+
+
+def _amount_value(text: str) -> float:
+    """'$1,234.56', '-1234.56' or '1,234.56-' (trailing minus) as a float."""
+    negative = text.startswith('-') or text.endswith('-')
+    value = float(text.strip('-').replace('$', '').replace(',', ''))
+    return -value if negative else value
+
+
+def synthetic_transactions(text: str) -> List[Dict]:
+    """Every 'MM/DD[/YY] description amount [balance]' line as a transaction."""
+    year = datetime.now().year
+    transactions = []
+    for line in text.split('\n'):
+        m = _LINE_RE.match(line)
+        if not m:
+            continue
+        month, day, yr, description, amount, balance = m.groups()
+        if not (1 <= int(month) <= 12 and 1 <= int(day) <= 31):
+            continue
+        if yr:
+            year_value = int(yr) + 2000 if len(yr) == 2 else int(yr)
+        else:
+            year_value = year
+        value = _amount_value(amount)
+        debit = value < 0 or bool(_DEBIT_WORDS_RE.search(description))
+        txn = {
+            "date": f"{year_value:04d}-{int(month):02d}-{int(day):02d}",
+            "description": description.strip(),
+            "amount": abs(value),
+            "type": "debit" if debit else "credit",
+        }
+        if balance:
+            txn["ending_balance"] = _amount_value(balance)
+        transactions.append(txn)
+    return transactions
+
+
+def render_response(transactions: List[Dict], compact: bool) -> str:
+    if not compact:
+        return json.dumps({"transactions": transactions}, indent=2)
+    lines = ["SUMMARY|||"]
+    for t in transactions:
+        balance = t.get("ending_balance")
+        lines.append('|'.join([
+            t["date"], "C" if t["type"] == "credit" else "D", f'{t["amount"]:.2f}',
+            f'{balance:.2f}' if balance is not None else '', t["description"],
+        ]))
+    return '\n'.join(lines)
+
+
+def _text_of(content) -> str:
+    if isinstance(content, str):
+        return content
+    return '\n'.join(block.get("text", "") for block in content or [] if isinstance(block, dict))
+
+
+def request_key(params: Dict) -> str:
+    """Recording key: everything that determines the answer, not stream/metadata flags."""
+    material = {k: params.get(k) for k in ("model", "system", "messages", "max_tokens", "temperature",
+                                           "tools", "tool_choice")}
+    return hashlib.sha256(json.dumps(material, sort_keys=True).encode()).hexdigest()
+
+
+def synthetic_message(params: Dict) -> Dict:
+    """
+    A Messages API response for one request body: a call to the forced tool when the
+    request sets tool_choice, otherwise text.
+    """
+    system = _text_of(params.get("system") or "")
+    user = '\n'.join(_text_of(m.get("content")) for m in params.get("messages", []) if m.get("role") == "user")
+    # A continuation request (previous answer cut off after N transactions) gets the
+    # N-th transaction echoed back and everything after it
+    statement, _, continuation = user.partition("=== CONTINUATION ===")
+    transactions = synthetic_transactions(statement)
+    m = _CONTINUATION_RE.search(continuation)
+    if m:
+        transactions = transactions[max(0, int(m.group(1)) - 1):]
+    tool_choice = params.get("tool_choice") or {}
+    if tool_choice.get("type") == "tool":
+        tool_input = {"transactions": transactions}
+        content = [{"type": "tool_use", "id": f"toolu_{uuid.uuid4().hex[:24]}", "name": tool_choice["name"],
+                    "input": tool_input}]
+        output_chars, stop_reason = len(json.dumps(tool_input)), "tool_use"
+    else:
+        text = render_response(transactions, compact="pipe-delimited" in system)
+        content = [{"type": "text", "text": text}]
+        output_chars, stop_reason = len(text), "end_turn"
+    return {
+        "id": f"msg_{uuid.uuid4().hex[:24]}",
+        "type": "message",
+        "role": "assistant",
+        "model": params.get("model", "claude-haiku-4-5"),
+        "content": content,
+        "stop_reason": stop_reason,
+        "stop_sequence": None,
+        "usage": {
+            "input_tokens": (len(system) + len(user) + len(json.dumps(params.get("tools") or ""))) // 4,
+            "output_tokens": output_chars // 4,
+            "cache_creation_input_tokens": 0,
+            "cache_read_input_tokens": 0,
+        },
+    }
+
+
+def truncate_message(message: Dict, fraction: float) -> Dict:
+    """The message cut to `fraction` of its output, as if max_tokens had been hit."""
+    message = json.loads(json.dumps(message))
+    for block in message["content"]:
+        if block.get("type") == "text":
+            block["text"] = block["text"][:max(1, int(len(block["text"]) * fraction))]
+            message["usage"]["output_tokens"] = len(block["text"]) // 4
+        elif block.get("type") == "tool_use":
+            transactions = block["input"].get("transactions") or []
+            block["input"]["transactions"] = transactions[:int(len(transactions) * fraction)]
+            message["usage"]["output_tokens"] = len(json.dumps(block["input"])) // 4
+    message["stop_reason"] = "max_tokens"
+    return message
+
+
+def _iso(ts: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat() if ts is not None else None
+
+
+class StubState:
+    """
+    Server configuration, fault-injection RNG, recordings and message batches (held in
+    memory; a batch ends batch_delay seconds after creation).
+    """
+
+    def __init__(self, batch_delay: float = 2.0, fail_every: int = 0, replay_dir: Optional[str] = None,
+                 record_dir: Optional[str] = None, upstream: Optional[str] = None, strict_replay: bool = False,
+                 error_rates: Optional[Dict[int, float]] = None, retry_after: Optional[float] = None,
+                 truncate_rate: float = 0.0, stream_error_rate: float = 0.0, latency: float = 0.0,
+                 tokens_per_sec: float = 0.0, seed: Optional[int] = None):
+        self.batch_delay = batch_delay
+        self.fail_every = fail_every
+        self.replay_dir = replay_dir
+        self.record_dir = record_dir
+        self.upstream = upstream.rstrip('/') if upstream else None
+        self.strict_replay = strict_replay
+        self.error_rates = error_rates or {}
+        self.retry_after = retry_after
+        self.truncate_rate = truncate_rate
+        self.stream_error_rate = stream_error_rate
+        self.latency = latency
+        self.tokens_per_sec = tokens_per_sec
+        self.rng = random.Random(seed)
+        self.batches: Dict[str, Dict] = {}
+        self.stats = {"requests": 0, "errors": 0, "truncated": 0, "stream_errors": 0,
+                      "replayed": 0, "recorded": 0, "synthetic": 0}
+        self.lock = threading.Lock()
+
+    def draw(self) -> float:
+        with self.lock:
+            return self.rng.random()
+
+    def count(self, stat: str) -> None:
+        with self.lock:
+            self.stats[stat] += 1
+
+    def injected_error(self) -> Optional[int]:
+        """Status code to fail this request with, if any."""
+        roll = self.draw()
+        for status, rate in sorted(self.error_rates.items()):
+            if roll < rate:
+                return status
+            roll -= rate
+        return None
+
+    def message_for(self, params: Dict, headers) -> Tuple[Optional[Dict], Optional[str]]:
+        """(response message, error) for a request: recorded, upstream or synthetic."""
+        key = request_key(params)
+        if self.replay_dir:
+            path = os.path.join(self.replay_dir, f"{key}.json")
+            if os.path.exists(path):
+                self.count("replayed")
+                with open(path) as f:
+                    return json.load(f), None
+            if self.strict_replay:
+                return None, f"No recorded response for request {key[:12]}"
+
+        if self.upstream:
+            body = {k: v for k, v in params.items() if k != "stream"}
+            request = urllib.request.Request(
+                f"{self.upstream}/v1/messages", data=json.dumps(body).encode(), method="POST",
+                headers={"content-type": "application/json",
+                         "x-api-key": headers.get("x-api-key", ""),
+                         "anthropic-version": headers.get("anthropic-version", "2023-06-01")})
+            try:
+                with urllib.request.urlopen(request, timeout=1200) as response:
+                    message = json.load(response)
+            except urllib.error.HTTPError as e:
+                return None, f"Upstream returned {e.code}: {e.read()[:200]!r}"
+            if self.record_dir:
+                os.makedirs(self.record_dir, exist_ok=True)
+                with open(os.path.join(self.record_dir, f"{key}.json"), "w") as f:
+                    json.dump(message, f)
+                self.count("recorded")
+            return message, None
+
+        self.count("synthetic")
+        return synthetic_message(params), None
+
+    def create_batch(self, requests: List[Dict]) -> str:
+        batch_id = f"msgbatch_{uuid.uuid4().hex[:24]}"
+        with self.lock:
+            self.batches[batch_id] = {"requests": requests, "created": time.time()}
+        return batch_id
+
+    def batch_object(self, batch_id: str, base_url: str) -> Optional[Dict]:
+        with self.lock:
+            batch = self.batches.get(batch_id)
+        if batch is None:
+            return None
+        n = len(batch["requests"])
+        ended = time.time() - batch["created"] >= self.batch_delay
+        errored = n // self.fail_every if ended and self.fail_every else 0
+        return {
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": {
+                "processing": 0 if ended else n,
+                "succeeded": n - errored if ended else 0,
+                "errored": errored,
+                "canceled": 0,
+                "expired": 0,
+            },
+            "created_at": _iso(batch["created"]),
+            "expires_at": _iso(batch["created"] + timedelta(days=1).total_seconds()),
+            "ended_at": _iso(batch["created"] + self.batch_delay) if ended else None,
+            "cancel_initiated_at": None,
+            "archived_at": None,
+            "results_url": f"{base_url}/v1/messages/batches/{batch_id}/results" if ended else None,
+        }
+
+    def batch_results(self, batch_id: str, headers) -> List[Dict]:
+        with self.lock:
+            requests = self.batches[batch_id]["requests"]
+        entries = []
+        for i, request in enumerate(requests, 1):
+            message, error = (None, "Overloaded (stub)") if self.fail_every and i % self.fail_every == 0 \
+                else self.message_for(request["params"], headers)
+            if message is None:
+                result = {"type": "errored", "error": {"type": "error", "error": {
+                    "type": "overloaded_error", "message": error}}}
+            else:
+                result = {"type": "succeeded", "message": message}
+            entries.append({"custom_id": request["custom_id"], "result": result})
+        return entries
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    state: StubState = None
+
+    def log_message(self, fmt, *args):
+        print(f"stub: {self.command} {self.path} " + (fmt % args), file=sys.stderr)
+
+    def _send_json(self, status: int, body: Dict, headers: Optional[Dict] = None) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("request-id", f"req_stub_{uuid.uuid4().hex[:16]}")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status: int, error_type: str, message: str, headers: Optional[Dict] = None) -> None:
+        self._send_json(status, {"type": "error", "error": {"type": error_type, "message": message}}, headers)
+
+    def _base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _sse(self, event: str, data: Dict) -> None:
+        self.wfile.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+    def _pace(self, chars: int) -> None:
+        if self.state.tokens_per_sec > 0:
+            time.sleep(chars / 4 / self.state.tokens_per_sec)
+
+    def _stream_message(self, message: Dict, fail_after: Optional[float]) -> None:
+        """Send a message as Messages API server-sent events, optionally dying midway."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("request-id", f"req_stub_{uuid.uuid4().hex[:16]}")
+        self.end_headers()
+
+        usage = dict(message["usage"])
+        self._sse("message_start", {"type": "message_start", "message": {
+            **{k: v for k, v in message.items() if k not in ("content", "stop_reason", "usage")},
+            "content": [], "stop_reason": None, "stop_sequence": None,
+            "usage": {**usage, "output_tokens": 1}}})
+        self._sse("ping", {"type": "ping"})
+
+        for index, block in enumerate(message["content"]):
+            if block.get("type") == "text":
+                payload, start_block = block["text"], {"type": "text", "text": ""}
+                delta_type, delta_field = "text_delta", "text"
+            else:
+                payload, start_block = json.dumps(block.get("input", {})), {**block, "input": {}}
+                delta_type, delta_field = "input_json_delta", "partial_json"
+            self._sse("content_block_start", {"type": "content_block_start", "index": index,
+                                              "content_block": start_block})
+            cut = int(len(payload) * fail_after) if fail_after is not None else None
+            for start in range(0, len(payload), _STREAM_DELTA_CHARS):
+                if cut is not None and start >= cut:
+                    self._sse("error", {"type": "error", "error": {
+                        "type": "overloaded_error", "message": "Overloaded (stub, mid-stream)"}})
+                    return
+                chunk = payload[start:start + _STREAM_DELTA_CHARS]
+                self._pace(len(chunk))
+                self._sse("content_block_delta", {"type": "content_block_delta", "index": index,
+                                                  "delta": {"type": delta_type, delta_field: chunk}})
+            self._sse("content_block_stop", {"type": "content_block_stop", "index": index})
+
+        self._sse("message_delta", {"type": "message_delta",
+                                    "delta": {"stop_reason": message["stop_reason"], "stop_sequence": None},
+                                    "usage": {"output_tokens": usage.get("output_tokens", 0)}})
+        self._sse("message_stop", {"type": "message_stop"})
+
+    def _messages(self, body: Dict) -> None:
+        state = self.state
+        state.count("requests")
+        if state.latency > 0:
+            time.sleep(state.latency)
+
+        status = state.injected_error()
+        if status is not None:
+            state.count("errors")
+            error_type, message = _ERRORS.get(status, ("api_error", f"Error {status} (stub)"))
+            headers = {"retry-after": f"{state.retry_after:g}"} \
+                if state.retry_after is not None and status in (429, 503, 529) else None
+            return self._error(status, error_type, message, headers)
+
+        message, error = state.message_for(body, self.headers)
+        if message is None:
+            return self._error(400 if state.strict_replay else 502, "invalid_request_error", error)
+
+        if state.truncate_rate and state.draw() < state.truncate_rate:
+            state.count("truncated")
+            message = truncate_message(message, 0.2 + 0.6 * state.draw())
+
+        if body.get("stream"):
+            fail_after = None
+            if state.stream_error_rate and state.draw() < state.stream_error_rate:
+                state.count("stream_errors")
+                fail_after = 0.1 + 0.8 * state.draw()
+            return self._stream_message(message, fail_after)
+
+        self._pace(message["usage"].get("output_tokens", 0) * 4)
+        return self._send_json(200, message)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            return self._error(400, "invalid_request_error", "Body is not valid JSON")
+
+        path = self.path.split('?')[0]
+        if path == "/v1/messages":
+            return self._messages(body)
+        if path == "/v1/messages/batches":
+            requests = body.get("requests") or []
+            custom_ids = [r.get("custom_id", "") for r in requests]
+            if not requests or len(set(custom_ids)) != len(custom_ids) or \
+                    not all(re.fullmatch(r'[a-zA-Z0-9_-]{1,64}', c) for c in custom_ids):
+                return self._error(400, "invalid_request_error", "requests need unique, valid custom_ids")
+            batch_id = self.state.create_batch(requests)
+            return self._send_json(200, self.state.batch_object(batch_id, self._base_url()))
+        return self._error(404, "not_found_error", f"No route for POST {path}")
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        m = re.fullmatch(r'/v1/messages/batches/([A-Za-z0-9_]+)(/results)?', path)
+        if not m:
+            return self._error(404, "not_found_error", f"No route for GET {path}")
+        batch = self.state.batch_object(m.group(1), self._base_url())
+        if batch is None:
+            return self._error(404, "not_found_error", f"Unknown batch {m.group(1)}")
+        if not m.group(2):
+            return self._send_json(200, batch)
+        if batch["processing_status"] != "ended":
+            return self._error(400, "invalid_request_error", "Batch has not ended yet")
+
+        entries = self.state.batch_results(m.group(1), self.headers)
+        data = ''.join(json.dumps(entry) + '\n' for entry in entries).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/binary")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def start_stub_server(host: str = "127.0.0.1", port: int = 0, **options) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Run a stub server on a daemon thread (port 0 picks a free port) and return
+    (server, base_url). Keyword options are StubState's; server.state has the stats.
+    """
+    handler = type("BoundStubHandler", (StubHandler,), {"state": StubState(**options)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.state = handler.state
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def parse_error_rates(values: List[str]) -> Dict[int, float]:
+    """['529=0.1', '500=0.02'] → {529: 0.1, 500: 0.02}"""
+    rates = {}
+    for value in values:
+        status, _, rate = value.partition('=')
+        rates[int(status)] = float(rate)
+    return rates
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Anthropic Messages API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--batch-delay", type=float, default=2.0,
+                        help="Seconds before a message batch reports 'ended' (default 2)")
+    parser.add_argument("--fail-every", type=int, default=0,
+                        help="Make every Nth request of a batch come back errored (default: none)")
+    parser.add_argument("--replay", help="Directory of recorded responses to serve by request hash")
+    parser.add_argument("--strict", action="store_true", help="With --replay, reject requests with no recording")
+    parser.add_argument("--record", help="Directory to save upstream responses in (needs --upstream)")
+    parser.add_argument("--upstream", help="Real API base URL to forward requests to, e.g. https://api.anthropic.com")
+    parser.add_argument("--error-rate", action="append", default=[], metavar="CODE=RATE",
+                        help="Fail this share of message requests with the status (429/500/503/529), repeatable")
+    parser.add_argument("--retry-after", type=float, help="retry-after seconds sent with 429/503/529 errors")
+    parser.add_argument("--truncate-rate", type=float, default=0.0,
+                        help="Share of responses cut short with stop_reason max_tokens")
+    parser.add_argument("--stream-error-rate", type=float, default=0.0,
+                        help="Share of streamed responses that die midway with an overloaded error event")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before each response starts")
+    parser.add_argument("--tokens-per-sec", type=float, default=0.0,
+                        help="Output pacing, ~4 chars per token (default: unpaced)")
+    parser.add_argument("--seed", type=int, help="Seed for fault injection, for reproducible runs")
+    args = parser.parse_args()
+    if args.record and not args.upstream:
+        parser.error("--record needs --upstream")
+
+    StubHandler.state = StubState(
+        batch_delay=args.batch_delay, fail_every=args.fail_every, replay_dir=args.replay,
+        record_dir=args.record, upstream=args.upstream, strict_replay=args.strict,
+        error_rates=parse_error_rates(args.error_rate), retry_after=args.retry_after,
+        truncate_rate=args.truncate_rate, stream_error_rate=args.stream_error_rate,
+        latency=args.latency, tokens_per_sec=args.tokens_per_sec, seed=args.seed,
+    )
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    print(f"Anthropic stub listening on http://{args.host}:{args.port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"stub stats: {json.dumps(StubHandler.state.stats)}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6593 @@
+#!/usr/bin/env python3
+"""
+Bank Statement Transaction Extractor
+A production-level script to extract and analyze bank statement transactions using AI.
+
+Works with any bank statement from any financial institution (banks, credit unions, etc.)
+as long as the statement contains dated transactions.
+
+Usage: python3 bank_statement_extractor.py <pdf_path> <api_key> [model] [corrections_json]
+       python3 bank_statement_extractor.py --serve <socket_path>
+       python3 bank_statement_extractor.py --batch [--manifest FILE] [--workers N] [--ai-concurrency N]
+                                           [--message-batches] <pdf_path>...
+"""
+
+import pdfplumber
+import json
+import sys
+import os
+import re
+import time
+import hashlib
+import tempfile
+import signal
+import socketserver
+import threading
+import argparse
+import bisect
+import multiprocessing
+import fcntl
+import random
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timedelta
+import httpx
+from anthropic import (
+    Anthropic, APIConnectionError, APIError, APIStatusError, OverloadedError, RateLimitError,
+)
+from typing import List, Dict, Tuple, Optional, Iterator
+from collections import Counter, defaultdict
+from types import SimpleNamespace
+import pytesseract
+from pdf2image import convert_from_path
+from PIL import Image
+import fitz  # PyMuPDF
+
+# Bump whenever extraction output changes so cached results from older code are not reused
+EXTRACTOR_VERSION = "2026.10.3"
+
+# Pricing per 1M tokens (as of 2026)
+# cache_write / cache_read: prompt-cache writes bill at 1.25x input, reads at 0.1x input
+# Requests sent through the Message Batches API bill at MESSAGE_BATCH_DISCOUNT of these rates
+PRICING = {
+    "claude-opus-4-6": {
+        "input": 15.00,
+        "output": 75.00,
+        "cache_write": 18.75,
+        "cache_read": 1.50
+    },
+    "claude-sonnet-4-5": {
+        "input": 3.00,
+        "output": 15.00,
+        "cache_write": 3.75,
+        "cache_read": 0.30
+    },
+    "claude-haiku-4-5": {
+        "input": 0.80,
+        "output": 4.00,
+        "cache_write": 1.00,
+        "cache_read": 0.08
+    }
+}
+MESSAGE_BATCH_DISCOUNT = 0.5
+
+
+class StatementDocument:
+    """
+    One open PDF shared by every extraction stage.
+
+    pdfplumber and PyMuPDF handles are opened lazily on first use and every
+    per-page result (text, words, chars, tables) is memoized, so the strategy
+    cascade, the text extractor and the AI fallback never re-open or re-parse
+    the same page. Use as a context manager or call close() when done.
+    """
+
+    def __init__(self, pdf_path: str):
+        if not os.path.exists(pdf_path):
+            raise FileNotFoundError(f"PDF file not found: {pdf_path}")
+        self.path = pdf_path
+        self._plumber = None
+        self._fitz = None
+        self._cache: Dict[Tuple, object] = {}
+        self._years: Dict[str, int] = {}
+
+    def __enter__(self) -> "StatementDocument":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._plumber is not None:
+            self._plumber.close()
+            self._plumber = None
+        if self._fitz is not None:
+            self._fitz.close()
+            self._fitz = None
+        self._cache.clear()
+
+    @property
+    def plumber(self):
+        if self._plumber is None:
+            self._plumber = pdfplumber.open(self.path)
+        return self._plumber
+
+    @property
+    def fitz_doc(self):
+        if self._fitz is None:
+            self._fitz = fitz.open(self.path)
+        return self._fitz
+
+    def _memo(self, key: Tuple, fn):
+        if key not in self._cache:
+            self._cache[key] = fn()
+        return self._cache[key]
+
+    # ─── pdfplumber views ───
+
+    @property
+    def page_count(self) -> int:
+        return self._memo(('page_count',), lambda: len(self.plumber.pages))
+
+    def page_text(self, page_num: int) -> str:
+        return self._memo(('text', page_num),
+                          lambda: self.plumber.pages[page_num].extract_text() or '')
+
+    def page_texts(self) -> List[str]:
+        return [self.page_text(i) for i in range(self.page_count)]
+
+    def page_words(self, page_num: int) -> List[Dict]:
+        return self._memo(('words', page_num),
+                          lambda: self.plumber.pages[page_num].extract_words())
+
+    def page_chars(self, page_num: int) -> List[Dict]:
+        return self._memo(('chars', page_num),
+                          lambda: self.plumber.pages[page_num].chars)
+
+    def page_tables(self, page_num: int) -> List:
+        return self._memo(('tables', page_num),
+                          lambda: self.plumber.pages[page_num].extract_tables())
+
+    # ─── PyMuPDF views ───
+
+    @property
+    def fitz_page_count(self) -> int:
+        return self._memo(('fitz_page_count',), lambda: self.fitz_doc.page_count)
+
+    def fitz_page_text(self, page_num: int) -> str:
+        return self._memo(('fitz_text', page_num),
+                          lambda: self.fitz_doc[page_num].get_text("text"))
+
+    def fitz_page_words(self, page_num: int) -> List[Tuple]:
+        return self._memo(('fitz_words', page_num),
+                          lambda: self.fitz_doc[page_num].get_text("words"))
+
+    def fitz_page_image_coverage(self, page_num: int) -> float:
+        """Fraction of the page area covered by placed images (0.0 - 1.0)."""
+        def _coverage() -> float:
+            page = self.fitz_doc[page_num]
+            page_area = abs(page.rect) or 1.0
+            covered = sum(abs(fitz.Rect(info['bbox']) & page.rect) for info in page.get_image_info())
+            return min(1.0, covered / page_area)
+        return self._memo(('fitz_image_coverage', page_num), _coverage)
+
+    def detect_year(self, text: str) -> int:
+        """_detect_year() memoized per input text."""
+        if text not in self._years:
+            self._years[text] = _detect_year(text)
+        return self._years[text]
+
+
+# PSM 6 = Assume uniform block of text (faster than PSM 4)
+# OEM 1 = Neural nets LSTM only (faster than OEM 3)
+OCR_CONFIG = r'--oem 1 --psm 6'
+
+# OCR at most this many pages per statement to bound processing time
+OCR_MAX_PAGES = 10
+
+
+def ocr_worker_count(pages: int) -> int:
+    """Parallel OCR workers: BANK_EXTRACTOR_OCR_WORKERS, default one per CPU, never more than pages."""
+    workers = int(os.environ.get("BANK_EXTRACTOR_OCR_WORKERS") or os.cpu_count() or 1)
+    return max(1, min(workers, pages))
+
+
+def _ocr_image(image: Image.Image) -> str:
+    return pytesseract.image_to_string(image, lang='eng', config=OCR_CONFIG)
+
+
+# Concurrent OCR runs (server mode) sharing the OMP_THREAD_LIMIT override
+_OCR_THREAD_LIMIT_LOCK = threading.Lock()
+_OCR_THREAD_LIMIT_RUNS = 0
+# A limit the operator set is never overridden or removed
+_OMP_THREAD_LIMIT_PRESET = "OMP_THREAD_LIMIT" in os.environ
+
+
+@contextmanager
+def _tesseract_single_threaded():
+    """
+    OMP_THREAD_LIMIT=1 for the tesseract subprocesses started inside the block.
+    pytesseract hands os.environ to every subprocess and has no per-call env, so the
+    variable is set for the duration of the OCR run and removed again when the last
+    concurrent run ends, instead of staying set for the life of a server process.
+    """
+    global _OCR_THREAD_LIMIT_RUNS
+    if _OMP_THREAD_LIMIT_PRESET:
+        yield
+        return
+    with _OCR_THREAD_LIMIT_LOCK:
+        _OCR_THREAD_LIMIT_RUNS += 1
+        os.environ["OMP_THREAD_LIMIT"] = "1"
+    try:
+        yield
+    finally:
+        with _OCR_THREAD_LIMIT_LOCK:
+            _OCR_THREAD_LIMIT_RUNS -= 1
+            if _OCR_THREAD_LIMIT_RUNS == 0:
+                os.environ.pop("OMP_THREAD_LIMIT", None)
+
+
+def _render_page_pymupdf(doc: StatementDocument, page_number: int, dpi: int) -> Image.Image:
+    # Grayscale pixmap straight into PIL - no subprocess, no intermediate JPEG
+    pix = doc.fitz_doc[page_number - 1].get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+    return Image.frombytes("L", (pix.width, pix.height), pix.samples)
+
+
+def _render_page_pdf2image(doc: StatementDocument, page_number: int, dpi: int) -> Optional[Image.Image]:
+    images = convert_from_path(doc.path, dpi=dpi, fmt='jpeg',
+                               first_page=page_number, last_page=page_number)
+    return images[0] if images else None
+
+
+OCR_RENDERERS = {
+    "pymupdf":   _render_page_pymupdf,
+    "pdf2image": _render_page_pdf2image,
+}
+
+
+def ocr_renderer() -> str:
+    """OCR rendering backend: BANK_EXTRACTOR_OCR_RENDERER, default "pymupdf"."""
+    return os.environ.get("BANK_EXTRACTOR_OCR_RENDERER") or "pymupdf"
+
+
+def render_pages(doc: StatementDocument, page_numbers: List[int], dpi: int = 150,
+                 renderer: Optional[str] = None) -> Iterator[Tuple[int, Image.Image]]:
+    """
+    Rasterize pages one at a time, yielding (page_number, image) with 1-based
+    page numbers. Only the requested pages are ever rendered, and each image
+    exists only until the consumer drops it.
+
+    renderer (default BANK_EXTRACTOR_OCR_RENDERER, else "pymupdf") picks the
+    backend: "pymupdf" renders in-process from the already-open document,
+    "pdf2image" shells out to poppler's pdftoppm.
+    """
+    renderer = renderer or ocr_renderer()
+    if renderer not in OCR_RENDERERS:
+        raise ValueError(f"Unknown OCR renderer '{renderer}' (expected one of: {', '.join(OCR_RENDERERS)})")
+    render_fn = OCR_RENDERERS[renderer]
+    for page_number in page_numbers:
+        image = render_fn(doc, page_number, dpi)
+        if image is not None:
+            yield page_number, image
+
+
+def ocr_pages(doc: StatementDocument, page_numbers: List[int]) -> Dict[int, str]:
+    """
+    OCR the given 1-based pages and return {page_number: text}.
+
+    Pages are OCR'd concurrently. pytesseract runs each page in its own tesseract
+    subprocess, so a thread pool keeps every core busy without pickling the page
+    images across processes; OMP_THREAD_LIMIT=1 (for this run only, see
+    _tesseract_single_threaded) stops each tesseract from also spawning its own
+    OpenMP threads and oversubscribing the machine.
+
+    Pages are rendered lazily as workers free up, so at most two images per
+    worker are held in memory and pages that are not requested are never rendered.
+    """
+    workers = ocr_worker_count(len(page_numbers))
+    max_in_flight = workers * 2
+    print(f"OCR: Processing {len(page_numbers)} pages at 150 DPI with {workers} workers...", file=sys.stderr)
+
+    # Convert PDF pages to images at 150 DPI (optimized for speed)
+    # Lower DPI = faster processing, still readable for bank statements
+    # Most bank statements are clear enough at 150 DPI
+    pages = render_pages(doc, page_numbers, dpi=150)
+
+    page_texts: Dict[int, str] = {}
+    with _tesseract_single_threaded() if workers > 1 else nullcontext(), \
+            ThreadPoolExecutor(max_workers=workers) as pool:
+        in_flight: Dict = {}
+        exhausted = False
+        while in_flight or not exhausted:
+            # Top up the pool from the renderer, keeping in-flight images bounded
+            while not exhausted and len(in_flight) < max_in_flight:
+                try:
+                    page_number, image = next(pages)
+                except StopIteration:
+                    exhausted = True
+                    break
+                in_flight[pool.submit(_ocr_image, image)] = page_number
+                del image
+            if not in_flight:
+                break
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                page_number = in_flight.pop(future)
+                page_texts[page_number] = future.result()
+                print(f"  Page {page_number} ✓", file=sys.stderr)
+
+    return page_texts
+
+
+def _ocr_page_text(page_number: int, text: str) -> str:
+    return f"\n=== PAGE {page_number} ===\n{text}"
+
+
+def is_text_garbled(text: str) -> bool:
+    """
+    Check if extracted text is garbled (contains too many CID references, encoding issues, or watermarks).
+    CID references look like (cid:0), (cid:2), etc. and indicate font encoding problems.
+    Watermarks create scattered single letters throughout the text.
+
+    NOTE: This is intentionally LESS strict to avoid triggering slow OCR unnecessarily.
+    We prefer to use slightly garbled text over waiting minutes for OCR.
+    """
+    if not text or len(text) < 50:  # Reduced from 100 to be less strict
+        return True
+
+    # Count CID references
+    cid_count = text.count('(cid:')
+
+    # If more than 5% of the text is CID references (each ~10 chars), it's garbled
+    # 5% threshold = very lenient, most good PDFs have 0%
+    cid_percentage = (cid_count * 10) / len(text)
+
+    if cid_percentage > 0.05:
+        return True
+
+    # Detect watermark interference: count lines with scattered single letters
+    # Watermarks typically create lines like "e c h k a c r l p n t a"
+    lines = text.split('\n')
+    single_letter_lines = 0
+    total_lines = len(lines)
+
+    for line in lines:
+        # Strip and check if line consists mostly of single letters separated by spaces
+        stripped = line.strip()
+        if len(stripped) > 0 and len(stripped) < 50:
+            # Count single-letter tokens
+            tokens = stripped.split()
+            if len(tokens) > 3:
+                single_letter_count = sum(1 for t in tokens if len(t) == 1 and t.isalpha())
+                # If more than 70% are single letters, it's likely watermark noise
+                if single_letter_count / len(tokens) > 0.7:
+                    single_letter_lines += 1
+
+    # If more than 10% of lines are watermark noise, consider it garbled
+    # Increased threshold from 3% to 10% to avoid triggering OCR unnecessarily
+    # Most bank statements can be processed even with minor watermark noise
+    if total_lines > 0 and (single_letter_lines / total_lines) > 0.10:
+        return True
+
+    return False
+
+
+def page_needs_ocr(text: str, image_coverage: float, doc_has_text: bool) -> bool:
+    """
+    Per-page version of the text-vs-OCR decision. A page needs OCR when its text
+    layer is (nearly) empty and images cover a real share of it - a scanned page
+    or check images, not just a logo - or when the whole document has no text
+    layer at all. A garbled text layer is OCR'd only if it is also short; long
+    garbled pages are kept as-is (mostly readable, not worth minutes of OCR).
+    Every garbled page is still retried with PyMuPDF first (see _extract_pages).
+    """
+    stripped = text.strip() if text else ''
+    if len(stripped) < 50:
+        return image_coverage >= 0.25 or not doc_has_text
+    return is_text_garbled(text) and len(stripped) <= 500
+
+
+def extract_pages_from_pdf(doc: StatementDocument) -> Tuple[List[str], bool]:
+    """
+    Returns (page_texts, ocr_used) with one entry per page, in page order ('' for
+    pages with no text). Each page comes from the cheapest source that yields
+    usable text: the pdfplumber text layer, then PyMuPDF, then OCR - so OCR cost
+    scales with the number of bad pages, not the size of the document.
+    The result is memoized on the document, so OCR never runs twice.
+    """
+    page_texts, ocr_used = doc._memo(('extracted_pages',), lambda: _extract_pages(doc))
+    return list(page_texts), ocr_used
+
+
+def _extract_pages(doc: StatementDocument) -> Tuple[List[str], bool]:
+    pages = doc.page_count
+    if pages == 0:
+        raise Exception("PDF file has no pages")
+
+    # First, try to extract text using pdfplumber (fast for text-based PDFs)
+    page_texts = doc.page_texts()
+    doc_has_text = any(t.strip() for t in page_texts)
+
+    # Pages that would need OCR, and long garbled pages that are kept if PyMuPDF can't do better
+    ocr_candidates = {
+        i for i, text in enumerate(page_texts)
+        if page_needs_ocr(text, doc.fitz_page_image_coverage(i), doc_has_text)
+    }
+    bad_pages = [i for i, text in enumerate(page_texts) if i in ocr_candidates or is_text_garbled(text)]
+    if not bad_pages:
+        return page_texts, False
+
+    print(f"⚠️  pdfplumber text unusable on {len(bad_pages)}/{pages} pages, trying PyMuPDF...", file=sys.stderr)
+
+    # Retry the bad pages with PyMuPDF (better font handling, e.g. CID-encoded text layers)
+    still_bad = []
+    recovered = 0
+    for i in bad_pages:
+        try:
+            fitz_text = doc.fitz_page_text(i)
+        except Exception as pymupdf_error:
+            print(f"⚠️  PyMuPDF failed on page {i+1}: {str(pymupdf_error)}", file=sys.stderr)
+            fitz_text = ''
+        if fitz_text.strip() and not page_needs_ocr(fitz_text, 0.0, True) and not is_text_garbled(fitz_text):
+            page_texts[i] = fitz_text
+            recovered += 1
+        elif i in ocr_candidates:
+            still_bad.append(i)
+
+    if recovered:
+        print(f"✓ PyMuPDF recovered {recovered} pages", file=sys.stderr)
+    if not still_bad:
+        return page_texts, False
+
+    # Last resort: OCR (SLOW!) only the pages that are still unusable
+    ocr_targets = still_bad[:OCR_MAX_PAGES]
+    if len(still_bad) > OCR_MAX_PAGES:
+        print(f"  WARNING: {len(still_bad)} pages need OCR, limiting to first {OCR_MAX_PAGES}", file=sys.stderr)
+    print(f"⚠️  Falling back to OCR for {len(ocr_targets)} pages: "
+          f"{', '.join(str(i + 1) for i in ocr_targets)}", file=sys.stderr)
+
+    try:
+        ocr_results = ocr_pages(doc, [i + 1 for i in ocr_targets])
+    except Exception as ocr_error:
+        print(f"⚠️  OCR failed: {str(ocr_error)}", file=sys.stderr)
+        return page_texts, False
+
+    ocr_used = False
+    for i in ocr_targets:
+        text = ocr_results.get(i + 1, '')
+        if text and text.strip():
+            page_texts[i] = _ocr_page_text(i + 1, text)
+            ocr_used = True
+    return page_texts, ocr_used
+
+
+def extract_text_from_pdf(doc: StatementDocument) -> Tuple[str, int, bool]:
+    """Returns (text, page_count, ocr_used). ocr_used=True when any page had to be OCR'd."""
+    page_texts, ocr_used = extract_pages_from_pdf(doc)
+
+    # Stitch pages back together in page order
+    extracted_text = "\n\n".join(t for t in page_texts if t)
+    if not extracted_text.strip():
+        raise Exception(f"No text could be extracted from PDF. Text extraction (pdfplumber), PyMuPDF, and OCR all failed.")
+
+    return extracted_text, doc.page_count, ocr_used
+
+
+def preprocess_check_tables(text: str) -> str:
+    """
+    Extract checks from table format commonly found in bank statements.
+
+    Handles formats like:
+    CATE CHECK # AMOUNT(S)   DATE CHECK # AMOUNT(S)   DATE CHECK # AMOUNT(S)
+    /03  03      310.30       /13  56      270.00      /21  79     705.00
+
+    Also handles two-column formats like:
+    '08/22/25 2745 -756.00 08/13/25 3879 -648.00'
+
+    And PNC 3-column format like:
+    '11/10    14381  *               12.92    081942621   11/17    14390                276.00    018849020'
+    """
+    lines = text.split('\n')
+    processed_lines = []
+    extracted_checks = []
+    in_check_table = False
+
+    # Pattern for two-column check lines: DATE CHECKNUM AMOUNT DATE CHECKNUM AMOUNT
+    two_col_pattern = re.compile(
+        r'^(\d{2}/\d{2}/\d{2})\s+(\d{4})\*?\s+(-[\d,]+\.\d{2})\s+(\d{2}/\d{2}/\d{2})\s+(\d{4})\*?\s+(-[\d,]+\.\d{2})$'
+    )
+
+    # Pattern for 3-column check table (Truist format):
+    # /03  03  310.30  /13  56  270.00  /21  79  705.00
+    three_col_pattern = re.compile(
+        r'(/\d{2})\s+(\*?\d+|\*\d+)\s+([\d,]+\.?\d*)\s+(/\d{2})\s+(\*?\d+|\*\d+)\s+([\d,]+\.?\d*)\s+(/\d{2})\s+(\*?\d+|\*\d+)\s+([\d,]+\.?\d*)'
+    )
+
+    # Pattern for PNC 3-column format with reference numbers:
+    # 11/10    14381  *               12.92    081942621   11/17    14390                276.00    018849020   11/24    14400                496.00    011725650
+    # Each check: MM/DD CheckNum [*] Amount RefNum
+    pnc_check_pattern = re.compile(
+        r'(\d{2}/\d{2})\s+(\d{4,5})\s+\*?\s+([\d,]+\.\d{2})\s+(\d{9,10})'
+    )
+
+    # Single check entry pattern: /03  03  310.30
+    single_check_pattern = re.compile(r'(/\d{2})\s+(\*?\d+)\s+([\d,]+\.?\d*)')
+
+    for line in lines:
+        line_stripped = line.strip()
+
+        # Detect check table header (Truist format)
+        if 'CATE' in line and 'CHECK' in line and 'AMOUNT' in line:
+            in_check_table = True
+            processed_lines.append(line)
+            continue
+
+        # Detect PNC check table header
+        if 'Checks and Substitute Checks' in line or ('Date' in line and 'Check' in line and 'Reference' in line):
+            in_check_table = True
+            processed_lines.append(line)
+            continue
+
+        # End of check table
+        if in_check_table and ('total checks' in line.lower() or 'Other withdrawals' in line or 'Debit Card Purchases' in line or 'POS Purchases' in line):
+            in_check_table = False
+            processed_lines.append(line)
+            continue
+
+        # Process check table rows
+        if in_check_table:
+            # Try 3-column pattern
+            match_3col = three_col_pattern.search(line_stripped)
+            if match_3col:
+                groups = match_3col.groups()
+                # Extract 3 checks from this line
+                for i in range(0, 9, 3):
+                    date, check_num, amount = groups[i], groups[i+1], groups[i+2]
+                    extracted_checks.append((date, check_num.replace('*', ''), amount))
+                processed_lines.append(f"[3 CHECK TRANSACTIONS extracted]")
+                continue
+
+            # Try single or multiple check patterns
+            matches = single_check_pattern.findall(line_stripped)
+            if matches:
+                for date, check_num, amount in matches:
+                    extracted_checks.append((date, check_num.replace('*', ''), amount))
+                processed_lines.append(f"[{len(matches)} CHECK TRANSACTION(S) extracted]")
+                continue
+
+        # Try PNC format (outside or inside check table) - extract all checks on the line
+        pnc_matches = pnc_check_pattern.findall(line_stripped)
+        if pnc_matches:
+            for date, check_num, amount, ref_num in pnc_matches:
+                extracted_checks.append((date, check_num, amount))
+            processed_lines.append(f"[{len(pnc_matches)} PNC CHECK TRANSACTION(S) extracted]")
+            continue
+
+        # Handle two-column format outside table
+        match_2col = two_col_pattern.match(line_stripped)
+        if match_2col:
+            date1, check1, amt1, date2, check2, amt2 = match_2col.groups()
+            extracted_checks.append((date1, check1, amt1))
+            extracted_checks.append((date2, check2, amt2))
+            processed_lines.append(f"[2 CHECK TRANSACTIONS extracted]")
+        else:
+            processed_lines.append(line)
+
+    # Add all extracted checks as clear, individual transactions
+    if extracted_checks:
+        processed_lines.append("")
+        processed_lines.append("=== INDIVIDUAL CHECK TRANSACTIONS (IMPORTANT: These are DEBITS) ===")
+        processed_lines.append(f"Total {len(extracted_checks)} checks found - each is a separate withdrawal transaction")
+        processed_lines.append("")
+        for date, check_num, amount in extracted_checks:
+            # Format as clear debit transaction
+            processed_lines.append(f"{date} Check #{check_num} DEBIT ${amount}")
+
+    return '\n'.join(processed_lines)
+
+
+def build_corrections_prompt(corrections: List[Dict]) -> str:
+    """Build a prompt section for learned corrections."""
+    if not corrections:
+        return ""
+
+    correction_rules = []
+    for c in corrections:
+        pattern = c.get('description_pattern', '')
+        correct_type = c.get('correct_type', '')
+        if pattern and correct_type:
+            correction_rules.append(f"- Transactions matching '{pattern}' should be classified as '{correct_type}'")
+
+    if not correction_rules:
+        return ""
+
+    return f"""
+
+LEARNED CORRECTIONS (IMPORTANT - Apply these rules with high priority):
+The following patterns have been manually corrected by users. Apply these classifications:
+{chr(10).join(correction_rules)}
+
+These corrections override the default classification rules when the description matches the pattern.
+"""
+
+
+def safe_float_amount(value) -> float:
+    """
+    Safely convert amount to float, handling commas and dollar signs.
+    Handles both numeric and string inputs with commas.
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        # Remove dollar signs, commas, and whitespace
+        cleaned = value.replace('$', '').replace(',', '').strip()
+        try:
+            return float(cleaned) if cleaned else 0.0
+        except ValueError:
+            return 0.0
+    return 0.0
+
+
+def normalize_pattern(description: str) -> str:
+    """Normalize description for pattern matching."""
+    # Remove dates
+    normalized = re.sub(r'\d{1,2}/\d{1,2}(/\d{2,4})?', '', description)
+    # Replace numbers with placeholder
+    normalized = re.sub(r'\d+', '#', normalized)
+    # Clean up whitespace
+    normalized = re.sub(r'\s+', ' ', normalized)
+    return normalized.strip()
+
+
+def apply_corrections(transactions: List[Dict], corrections: List[Dict]) -> List[Dict]:
+    """Apply learned corrections to transactions after extraction."""
+    if not corrections:
+        return transactions
+
+    # Build a lookup of patterns to correct types
+    correction_map = {}
+    for c in corrections:
+        pattern = c.get('description_pattern', '').lower()
+        correct_type = c.get('correct_type', '')
+        if pattern and correct_type:
+            correction_map[pattern] = correct_type
+
+    # Apply corrections
+    for txn in transactions:
+        desc = txn.get('description', '')
+        normalized = normalize_pattern(desc).lower()
+
+        # Check for matching patterns
+        for pattern, correct_type in correction_map.items():
+            # Check if pattern is contained in description
+            if pattern.lower() in normalized or normalized in pattern.lower():
+                if txn['type'] != correct_type:
+                    txn['type'] = correct_type
+                    txn['corrected_by_learning'] = True
+                break
+
+    return transactions
+
+
+# Pieces the tokenizer rarely merges: letter runs, short digit groups, single symbols
+_TOKEN_PIECE_RE = re.compile(r'[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]')
+# Letters per token inside a long word
+# Both are unmeasured guesses at the tokenizer; check them against the API with
+# benchmark_ai_format.py --check-estimate before tuning BANK_EXTRACTOR_CHUNK_TOKENS
+_LETTERS_PER_TOKEN = 6
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough Claude input token count (a heuristic, not the tokenizer). Statement text
+    is mostly dates, amounts and punctuation, which tokenize far finer than the ~4
+    characters per token of prose, so count pieces the tokenizer rarely merges
+    instead: a token per digit group of up to three, per symbol, and per word (plus
+    one for every further _LETTERS_PER_TOKEN letters).
+    """
+    pieces = _TOKEN_PIECE_RE.findall(text)
+    return len(pieces) + sum(len(piece) // _LETTERS_PER_TOKEN for piece in pieces if len(piece) > _LETTERS_PER_TOKEN)
+
+
+_WINDOW_AMOUNT_RE = re.compile(r'\d[\d,]*\.\d{2}|\.\d{2}')
+
+
+def _boundary_key(txn: Dict) -> Tuple:
+    return (txn.get("date", ""), txn.get("description", "").strip().lower(),
+            round(safe_float_amount(txn.get("amount", 0)), 2))
+
+
+def _window_transactions(transactions: List[Dict], window_amounts: Counter, from_end: bool) -> List[int]:
+    """
+    Indexes of the transactions at one edge of a chunk that can come from its overlap
+    window: walking in from that edge, those whose amount is still unclaimed among
+    the amounts printed in the window. Stops at the first one that is not.
+    """
+    available = Counter(window_amounts)
+    order = range(len(transactions) - 1, -1, -1) if from_end else range(len(transactions))
+    indexes = []
+    for i in order:
+        amount = round(safe_float_amount(transactions[i].get("amount", 0)), 2)
+        if available[amount] <= 0:
+            break
+        available[amount] -= 1
+        indexes.append(i)
+    return indexes
+
+
+def deduplicate_chunk_boundaries(chunk_transactions: List[List[Dict]], windows: List[str]) -> List[Dict]:
+    """
+    Merge per-chunk transactions, dropping the copies produced by overlapping chunks.
+    windows[i] is the text shared by the end of chunk i and the start of chunk i + 1.
+
+    Only transactions that can come from a window are compared: the tail of chunk i
+    and the head of chunk i + 1 whose amounts appear in it. They are matched as a
+    multiset on (date, description, amount), so a head row is dropped once per
+    matching tail row. Identical transactions anywhere else - the same purchase
+    twice on one day - are real and kept.
+    """
+    kept = [list(txns) for txns in chunk_transactions]
+    for i, window in enumerate(windows):
+        if i + 1 >= len(kept):
+            break
+        window_amounts = Counter(round(safe_float_amount(a), 2) for a in _WINDOW_AMOUNT_RE.findall(window))
+        if not window_amounts:
+            continue
+        tail = Counter(_boundary_key(kept[i][j]) for j in _window_transactions(kept[i], window_amounts, True))
+        drop = set()
+        for j in _window_transactions(kept[i + 1], window_amounts, False):
+            key = _boundary_key(kept[i + 1][j])
+            if tail[key] > 0:
+                tail[key] -= 1
+                drop.add(j)
+        if drop:
+            kept[i + 1] = [txn for j, txn in enumerate(kept[i + 1]) if j not in drop]
+    return [txn for txns in kept for txn in txns]
+
+
+class _TransactionStreamParser:
+    """
+    Incremental parser for the extraction JSON. Feed it text deltas as they stream
+    in; it finds the "transactions" array and returns each transaction object as
+    soon as its closing brace has arrived (via JSONDecoder.raw_decode), so
+    everything received before a dropped connection is still usable.
+
+    Fed a whole response at once it is also the single-pass recovery parser behind
+    scan_json_response: finish() skips malformed objects and reports where the
+    array was cut off.
+    """
+
+    _ARRAY_RE = re.compile(r'"transactions"\s*:\s*\[')
+
+    def __init__(self, array_start: Optional[int] = None):
+        self._buf = ''
+        self._pos: Optional[int] = array_start   # next unread index inside the array
+        self._done = False
+        self._decoder = json.JSONDecoder()
+        self.array_start = array_start
+        self.complete = False   # the array's closing ']' has been read
+        self.skipped = 0
+        self.transactions: List[Dict] = []
+
+    @property
+    def position(self) -> int:
+        """Index just past the last transaction read (or the array start)."""
+        return self._pos if self._pos is not None else 0
+
+    def feed(self, delta: str) -> List[Dict]:
+        """Append a text delta and return the transactions completed by it."""
+        self._buf += delta
+        new: List[Dict] = []
+        if self._done:
+            return new
+        if self._pos is None:
+            m = self._ARRAY_RE.search(self._buf)
+            if not m:
+                return new
+            self._pos = self.array_start = m.end()
+
+        buf = self._buf
+        while True:
+            i = self._pos
+            while i < len(buf) and buf[i] in ' \t\r\n,':
+                i += 1
+            if i >= len(buf):
+                break
+            if buf[i] != '{':
+                # ']' closes the array; anything else is not a transaction list we understand
+                self._done = True
+                self.complete = buf[i] == ']'
+                if self.complete:
+                    self._pos = i + 1
+                break
+            if buf.find('}', i) == -1:
+                break
+            try:
+                obj, end = self._decoder.raw_decode(buf, i)
+            except json.JSONDecodeError:
+                break  # object not complete yet
+            self._pos = end
+            if isinstance(obj, dict):
+                new.append(obj)
+
+        self.transactions.extend(new)
+        return new
+
+    def finish(self) -> Optional[int]:
+        """
+        Call once the whole response has been fed. Objects that are complete but not
+        valid JSON are skipped; returns the offset just past the last complete
+        transaction if the array was cut off, None if it was closed (or never found).
+        """
+        while not self._done and self._pos is not None:
+            end = self._object_end(self._pos)
+            if end is None:
+                break
+            self.skipped += 1
+            self._pos = end
+            self.feed('')
+        return None if self.complete or self.array_start is None else self.position
+
+    def _object_end(self, start: int) -> Optional[int]:
+        """Index past the '}' closing the object that starts at or after `start` (None if it never closes)."""
+        buf = self._buf
+        i = buf.find('{', start)
+        if i == -1:
+            return None
+        depth = 0
+        in_string = escaped = False
+        for j in range(i, len(buf)):
+            char = buf[j]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif char == '\\':
+                    escaped = True
+                elif char == '"':
+                    in_string = False
+            elif char == '"':
+                in_string = True
+            elif char == '{':
+                depth += 1
+            elif char == '}':
+                depth -= 1
+                if depth == 0:
+                    return j + 1
+        return None
+
+
+_SUMMARY_KEY_RE = re.compile(r'"statement_summary"\s*:\s*(?=\{)')
+
+
+def _strip_code_fence(result: str) -> str:
+    """Response text without surrounding whitespace and markdown code fences."""
+    result = result.strip()
+    if result.startswith('```json'):
+        result = result[7:]  # Remove ```json
+    elif result.startswith('```'):
+        result = result[3:]  # Remove ```
+    if result.endswith('```'):
+        result = result[:-3]  # Remove closing ```
+    return result.strip()
+
+
+def scan_json_response(result: str) -> Tuple[Dict, Optional[int]]:
+    """
+    Parse a JSON extraction response. Returns (data, truncated_at): truncated_at is
+    None for a complete response, otherwise the offset in `result` just past the
+    last complete transaction. It is diagnostic (logged, and written to the debug
+    log): continuation requests resume from the last transactions kept, which are
+    shown back to Claude as anchor rows (see continuation_content), not from an offset.
+
+    Valid JSON is one json.loads. Anything else (cut off at max_tokens, prose around
+    the JSON, a malformed object) is walked once by _TransactionStreamParser, which
+    keeps every complete transaction up to the cut.
+    """
+    text = _strip_code_fence(result)
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        data = None
+    if isinstance(data, dict):
+        return data, None
+    if isinstance(data, list):
+        return {"transactions": data}, None
+
+    # A bare array has no "transactions" key to look for
+    array_start = result.index('[') + 1 if text.startswith('[') else None
+    parser = _TransactionStreamParser(array_start)
+    parser.feed(result)
+    truncated_at = parser.finish()
+    if parser.skipped:
+        print(f"⚠️  Skipped {parser.skipped} malformed transaction object(s) in AI response", file=sys.stderr)
+
+    data = {"transactions": parser.transactions}
+    # The summary comes before the transactions; only look past them if the array closed
+    decoder = json.JSONDecoder()
+    regions = [(0, parser.array_start if parser.array_start is not None else len(result))]
+    if parser.complete:
+        regions.append((parser.position, len(result)))
+    for start, end in regions:
+        m = _SUMMARY_KEY_RE.search(result, start, end)
+        if m:
+            try:
+                summary, _ = decoder.raw_decode(result, m.end())
+            except json.JSONDecodeError:
+                continue
+            if isinstance(summary, dict):
+                data["statement_summary"] = summary
+                break
+    return data, truncated_at
+
+
+def parse_json_response(result: str) -> Dict:
+    """Parse a JSON extraction response, recovering what it can (see scan_json_response)."""
+    return scan_json_response(result)[0]
+
+
+def chunk_token_budget() -> int:
+    """Input tokens per AI request, as estimate_tokens counts them: BANK_EXTRACTOR_CHUNK_TOKENS (default 40000)."""
+    return max(1000, int(os.environ.get("BANK_EXTRACTOR_CHUNK_TOKENS") or 40000))
+
+
+def join_pages(page_texts: List[str]) -> Tuple[str, List[int]]:
+    """Non-empty pages joined by blank lines, and the line number each page starts on."""
+    pages = [t for t in page_texts if t]
+    starts = []
+    line = 0
+    for page in pages:
+        starts.append(line)
+        line += page.count('\n') + 2
+    return "\n\n".join(pages), starts
+
+
+def _section_header_type(line: str):
+    """'credit'/'debit' for a transaction section header line, None for a non-transaction one, False otherwise."""
+    stripped = line.strip()
+    if not stripped or len(stripped) > 60:
+        return False
+    for pattern, section_type, _ in _SECTION_HEADER_PATTERNS:
+        if pattern.match(stripped):
+            return section_type
+    return False
+
+
+def chunk_line_ranges(lines: List[str], max_tokens: int = 40000, overlap_lines: int = 5,
+                      page_starts: Optional[List[int]] = None) -> List[Tuple[int, int, Optional[str]]]:
+    """
+    Split lines into chunks that fit within max_tokens, as (start, end, header): a
+    [start, end) line range and the transaction section header (e.g. "DEBITS") in
+    force at its start, which the chunk repeats so Claude keeps the section context.
+
+    Each split is made at the latest good boundary in the second half of the chunk:
+    a page start, else a section header, else a blank line. Only when there is none
+    is a section cut mid-way; the next chunk then starts with the last overlap_lines
+    lines of this one, and lines[next_start:prev_end] is the overlap window the two
+    share. Token counts come from a prefix sum, so each chunk costs O(its lines).
+    """
+    n = len(lines)
+    cumulative = [0]
+    for line in lines:
+        cumulative.append(cumulative[-1] + estimate_tokens(line + '\n'))
+
+    # Boundary strength of splitting before line i, and the section header in force at line i
+    page_set = set(page_starts or [])
+    strength = [0] * (n + 1)
+    active: List[Optional[str]] = [None] * n
+    header = None
+    for i, line in enumerate(lines):
+        section_type = _section_header_type(line)
+        if i in page_set:
+            strength[i] = 3
+        elif section_type is not False:
+            strength[i] = 2
+        elif not line.strip():
+            strength[i] = 1
+        if section_type is not False:
+            header = line.strip() if section_type else None
+        active[i] = header
+
+    ranges = []
+    start = 0
+    while start < n:
+        # Repeat the header unless the chunk opens a section of its own
+        header = active[start - 1] if start > 0 and _section_header_type(lines[start]) is False else None
+        header_tokens = estimate_tokens(header + ' (continued)\n') if header else 0
+        limit = cumulative[start] + max(1, max_tokens - header_tokens)
+        end = max(start + 1, bisect.bisect_right(cumulative, limit, start) - 1)
+        if end >= n:
+            ranges.append((start, n, header))
+            break
+
+        split = end
+        floor = start + max(1, (end - start) // 2)
+        for level in (3, 2, 1):
+            candidate = next((i for i in range(end, floor - 1, -1) if strength[i] >= level), None)
+            if candidate is not None:
+                split = candidate
+                break
+        ranges.append((start, split, header))
+
+        # Only a split inside a section needs the overlap for context continuity
+        if strength[split] == 0 and split - start > overlap_lines:
+            start = split - overlap_lines
+        else:
+            start = split
+
+    return ranges
+
+
+def render_chunk(lines: List[str], start: int, end: int, header: Optional[str]) -> str:
+    """Chunk text for a chunk_line_ranges entry, led by the repeated section header."""
+    body = '\n'.join(lines[start:end])
+    return f"{header} (continued)\n{body}" if header else body
+
+
+def chunk_text(text: str, max_tokens: int = 40000, overlap_lines: int = 5) -> List[str]:
+    """
+    Split text into chunks that fit within token limit (see chunk_line_ranges).
+    """
+    lines = text.split('\n')
+    return [render_chunk(lines, *r) for r in chunk_line_ranges(lines, max_tokens, overlap_lines)]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# DETERMINISTIC EXTRACTION — SHARED CONSTANTS & HELPERS
+# ─────────────────────────────────────────────────────────────────────────────
+
+# Section marker keywords (Chase/JPMorgan embed *start*name in PDF text)
+_CREDIT_SECTION_MARKERS = {
+    'deposits and additions', 'deposits and credits',
+    'other credits', 'credits',
+}
+_DEBIT_SECTION_MARKERS = {
+    'atm debit withdrawal', 'atm & debit card withdrawal',
+    'atm and debit card withdrawal', 'electronic withdrawal',
+    'checks paid', 'fees section', 'fees', 'service charges',
+    'other withdrawals', 'withdrawals and debits', 'withdrawals', 'debits',
+}
+_NON_TXN_SECTION_MARKERS = {
+    'summary', 'post summary', 'message', 'daily ending balance',
+    'disclosure', 'atm and debit card summary', 'atm & debit card summary',
+}
+
+# Section header patterns for Strategy 2 (full-line section headers, no markers)
+# Each tuple: (compiled regex, section_type, section_name)
+# section_type = 'credit' | 'debit' | None (None = stop parsing, e.g. balance table)
+# section_name is a short slug used internally (e.g. 'checks' triggers check-row parsing)
+_SECTION_HEADER_PATTERNS = [
+    # Credits
+    (re.compile(r'^\s*DEPOSITS?\s+AND\s+ADDITIONS?\s*$', re.I), 'credit', 'deposits'),
+    (re.compile(r'^\s*DEPOSITS?\s+AND\s+CREDITS?\s*$', re.I), 'credit', 'deposits'),
+    (re.compile(r'^\s*DEPOSITS?\s+&\s+CREDITS?\s*$', re.I), 'credit', 'deposits'),
+    (re.compile(r'^\s*OTHER\s+CREDITS?\s*$', re.I), 'credit', 'credits'),
+    (re.compile(r'^\s*CREDITS?\s*$', re.I), 'credit', 'credits'),
+    (re.compile(r'^\s*DEPOSITS?\s*$', re.I), 'credit', 'deposits'),
+    # Debits — ATM/debit card (matches both "Withdrawals" and "Transactions" variants)
+    (re.compile(r'^\s*ATM\s*[&AND]+\s*DEBIT\s+CARD\s+(WITHDRAWALS?|TRANSACTIONS?)\s*$', re.I), 'debit', 'atm'),
+    (re.compile(r'^\s*ELECTRONIC\s+WITHDRAWALS?\s*$', re.I), 'debit', 'electronic'),
+    # Checks — "Checks Paid" header and JPMorgan "Check Date" column-header both trigger check parsing
+    (re.compile(r'^\s*CHECKS?\s+PAID\s*$', re.I), 'debit', 'checks'),
+    (re.compile(r'^\s*CHECK\s+DATE\s*$', re.I), 'debit', 'checks'),
+    # Checks In Number Order (DATE CHECK_NO AMOUNT triplets per row — community banks)
+    (re.compile(r'^\s*CHECKS?\s+IN\s+NUMBER\s+ORDER\s*$', re.I), 'debit', 'checks_in_order'),
+    # ACH/wire payments (JPMorgan Classic "Payments & Transfers" section)
+    (re.compile(r'^\s*PAYMENTS?\s+[&AND]+\s+TRANSFERS?\s*$', re.I), 'debit', 'payments'),
+    # Fees
+    (re.compile(r'^\s*FEES?,\s*CHARGES?\s*[&AND]+\s*OTHER\s+WITHDRAWALS?\s*$', re.I), 'debit', 'fees'),
+    (re.compile(r'^\s*FEES?\s*$', re.I), 'debit', 'fees'),
+    (re.compile(r'^\s*SERVICE\s+CHARGES?\s*$', re.I), 'debit', 'fees'),
+    # Other debit sections
+    (re.compile(r'^\s*OTHER\s+WITHDRAWALS?\s*$', re.I), 'debit', 'withdrawals'),
+    (re.compile(r'^\s*WITHDRAWALS?\s+AND\s+DEBITS?\s*$', re.I), 'debit', 'withdrawals'),
+    (re.compile(r'^\s*DEBITS?\s+AND\s+WITHDRAWALS?\s*$', re.I), 'debit', 'withdrawals'),
+    (re.compile(r'^\s*DEBITS?\s*$', re.I), 'debit', 'debits'),
+    (re.compile(r'^\s*WITHDRAWALS?\s*$', re.I), 'debit', 'withdrawals'),
+    # Non-transaction sections — stop parsing until next real section
+    (re.compile(r'^\s*DAILY\s+ENDING\s+BALANCE\s*$', re.I), None, 'balance'),
+    (re.compile(r'^\s*DAILY\s+BALANCE\s+INFORMATION\s*$', re.I), None, 'balance'),
+    (re.compile(r'^\s*ACCOUNT\s+ACTIVITY\s+SUMMARY\s*$', re.I), None, 'summary'),
+]
+
+# Month name → number mapping (for reconstructing dates from *end* lines)
+_MONTH_NAMES = {
+    'january': 1, 'february': 2, 'march': 3, 'april': 4,
+    'may': 5, 'june': 6, 'july': 7, 'august': 8,
+    'september': 9, 'october': 10, 'november': 11, 'december': 12,
+}
+
+# Skip *start* and *end* marker lines
+_MARKER_LINE_RE = re.compile(r'^\s*\*(start|end)\*', re.I)
+
+# Transaction line: starts with MM/DD or M/D, ends with optional $ and decimal amount.
+# Accepts trailing '-' on amounts (e.g. "177.03-", ".38-") used by community banks for debits.
+# Uses [\d,]* (zero or more) before decimal to handle sub-$1 amounts like ".38".
+_TXN_LINE_RE = re.compile(r'^(\d{1,2}/\d{1,2})\s+(.+?)\s+\$?([\d,]*\.\d{2})-?\s*$')
+
+# Embedded transaction in *end* marker lines — date is partial (/DD, month consumed by marker)
+# e.g. "*end*deposit0s and additio1ns /08 Deposit 1680055706 878.00"
+_END_EMBEDDED_TXN_RE = re.compile(r'\s/(\d{1,2})\s+(.+?)\s+\$?([\d,]+\.\d{2})\s*$')
+
+# Check transaction format used in Chase "Checks Paid" section
+# e.g. "148 ^ 01/20 $125.00"  →  CHECK_NO ^ DATE AMOUNT
+# Also handles MM/DD/YY and MM/DD/YYYY date formats (e.g. "3301 01/02/25 1,000.00")
+_CHECK_TXN_RE = re.compile(r'^(\d+)\s+\^?\s*(\d{1,2}/\d{1,2}(?:/\d{2,4})?)\s+\$?([\d,]+\.\d{2})\s*$')
+
+# Multi-column check table pattern (JPMorgan/Chase compact "Checks Paid" table)
+# e.g. "1068 11/24 450.00 1072 11/17 1,600.00 1077 11/19 2,558.83"
+# Each column: CHECK_NO MM/DD[/YY] AMOUNT
+_MULTI_CHECK_COL_RE = re.compile(r'(\d{3,6})\s+(\d{1,2}/\d{1,2}(?:/\d{2,4})?)\s+([\d,]+\.\d{2})')
+
+# "Checks In Number Order" table pattern (community banks like Simply Business Checking)
+# e.g. " 1/02    5184        122.91  1/13    5194         35.73  1/21    5202        468.96"
+# Each column: MM/DD CHECK_NO AMOUNT (check number may have trailing *)
+_DATE_CHECK_AMOUNT_RE = re.compile(r'(\d{1,2}/\d{1,2})\s+(\d{4,6}\*?)\s+([\d,]+\.\d{2})')
+
+# Date word pattern (M/D or MM/DD without year)
+_DATE_WORD_RE = re.compile(r'^\d{1,2}/\d{1,2}$')
+
+# Amount word pattern
+_AMOUNT_WORD_RE = re.compile(r'^[\d,]+\.\d{2}$')
+
+
+def _det_parse_amount(s: str) -> float:
+    """Parse amount string to float, stripping commas and dollar signs."""
+    return float(s.replace(',', '').replace('$', '').strip())
+
+
+def _det_parse_date(date_str: str, year: int) -> Optional[str]:
+    """Parse MM/DD, MM/DD/YY, or MM/DD/YYYY to YYYY-MM-DD string."""
+    for fmt in ['%m/%d/%Y', '%m/%d/%y', '%m/%d']:
+        try:
+            dt = datetime.strptime(date_str.strip(), fmt)
+            if fmt == '%m/%d':
+                dt = dt.replace(year=year)
+            return dt.strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    return None
+
+
+def _detect_year(text: str) -> int:
+    """
+    Extract the statement year from PDF text.
+    Prioritises years embedded in slash-separated dates (M/D/YYYY or M/D/YY) because
+    bank PDFs often contain distracting 4-digit numbers such as ZIP+4 codes (e.g.
+    '43218-2051') that would otherwise be mistaken for a year.
+    """
+    counts: Dict[str, int] = {}
+
+    # 1st priority: 4-digit years inside slash dates (01/30/2026, 1/1/2026)
+    for y in re.findall(r'\b\d{1,2}/\d{1,2}/(20\d{2})\b', text):
+        counts[y] = counts.get(y, 0) + 1
+    if counts:
+        return int(max(counts, key=counts.get))
+
+    # 2nd priority: 2-digit years inside slash dates (1/30/26) → prefix with 20
+    for y in re.findall(r'\b\d{1,2}/\d{1,2}/(\d{2})\b', text):
+        full = str(2000 + int(y))
+        counts[full] = counts.get(full, 0) + 1
+    if counts:
+        return int(max(counts, key=counts.get))
+
+    # 3rd priority: standalone 4-digit years not preceded or followed by another digit
+    # (avoids matching ZIP+4 extensions like '-2051' → the lookbehind excludes '-')
+    for y in re.findall(r'(?<![/\-\d])\b(20\d{2})\b(?![/\-\d])', text):
+        counts[y] = counts.get(y, 0) + 1
+    if counts:
+        return int(max(counts, key=counts.get))
+
+    return datetime.now().year
+
+
+# ─── Strategy 1: *start*/*end* section markers (Chase / JPMorgan) ────────────
+
+def _extract_by_section_markers(doc: StatementDocument) -> Tuple[List[Dict], bool]:
+    """
+    Strategy 1: Chase/JPMorgan PDFs embed *start*section-name and *end*section-name
+    tags directly in the extracted text. These reliably identify credit vs debit sections.
+
+    Also handles:
+    - Transactions embedded in *end* marker lines (date's month is consumed by the marker
+      text, leaving only /DD — reconstructed using the statement's primary month).
+    - Chase "Checks Paid" section format: "CHECK_NO ^ DATE AMOUNT"
+    """
+    transactions: List[Dict] = []
+    try:
+        if not doc.page_count:
+            return [], False
+
+        # Quick check — only proceed if *start* markers are present
+        has_markers = any(
+            '*start*' in doc.page_text(page_num).lower()
+            for page_num in range(min(3, doc.page_count))
+        )
+        if not has_markers:
+            return [], False
+
+        first_text = doc.page_text(0)
+        statement_year = doc.detect_year(first_text)
+
+        # Detect the statement's primary month for reconstructing partial dates
+        month_match = re.search(
+            r'\b(January|February|March|April|May|June|July|August|'
+            r'September|October|November|December)\b', first_text, re.I
+        )
+        statement_month = (
+            _MONTH_NAMES[month_match.group(1).lower()] if month_match
+            else datetime.now().month
+        )
+
+        current_section_type: Optional[str] = None
+        current_section_name: str = ''
+
+        for page_num in range(doc.page_count):
+            text = doc.page_text(page_num)
+            if not text:
+                continue
+
+            for line in text.split('\n'):
+                line = line.strip()
+                if not line:
+                    continue
+
+                # Handle *start*/*end* marker lines
+                if _MARKER_LINE_RE.match(line):
+                    if line.lower().startswith('*start*'):
+                        marker = line[7:].lower().strip()
+                        if any(kw in marker for kw in _CREDIT_SECTION_MARKERS):
+                            current_section_type = 'credit'
+                            current_section_name = marker
+                        elif any(kw in marker for kw in _DEBIT_SECTION_MARKERS):
+                            current_section_type = 'debit'
+                            current_section_name = marker
+                        elif any(kw in marker for kw in _NON_TXN_SECTION_MARKERS):
+                            current_section_type = None
+                            current_section_name = ''
+
+                    elif line.lower().startswith('*end*') and current_section_type is not None:
+                        # Some *end* lines have a transaction embedded whose month
+                        # was consumed by the marker text, leaving only /DD.
+                        # e.g. "*end*deposit0s and additio1ns /08 Deposit 1680055706 878.00"
+                        m = _END_EMBEDDED_TXN_RE.search(line)
+                        if m:
+                            day_str, description, amount_str = m.groups()
+                            date_str = f"{statement_month:02d}/{day_str}"
+                            parsed_date = _det_parse_date(date_str, statement_year)
+                            if parsed_date:
+                                try:
+                                    transactions.append({
+                                        'date': parsed_date,
+                                        'description': description.strip(),
+                                        'amount': round(_det_parse_amount(amount_str), 2),
+                                        'type': current_section_type,
+                                    })
+                                except ValueError:
+                                    pass
+                    continue  # skip marker lines (already handled above)
+
+                if current_section_type is None:
+                    continue
+
+                # Chase Checks Paid section uses a different row format:
+                # "CHECK_NO ^ DATE AMOUNT"  (no leading date)
+                if 'checks' in current_section_name:
+                    m = _CHECK_TXN_RE.match(line)
+                    if m:
+                        check_num, date_str, amount_str = m.groups()
+                        parsed_date = _det_parse_date(date_str, statement_year)
+                        if parsed_date:
+                            try:
+                                transactions.append({
+                                    'date': parsed_date,
+                                    'description': f'Check #{check_num}',
+                                    'amount': round(_det_parse_amount(amount_str), 2),
+                                    'type': 'debit',
+                                })
+                            except ValueError:
+                                pass
+                        continue
+
+                # Standard transaction line: MM/DD Description... AMOUNT
+                m = _TXN_LINE_RE.match(line)
+                if not m:
+                    continue
+
+                date_str, description, amount_str = m.groups()
+                parsed_date = _det_parse_date(date_str, statement_year)
+                if not parsed_date:
+                    continue
+                try:
+                    amount = _det_parse_amount(amount_str)
+                except ValueError:
+                    continue
+
+                transactions.append({
+                    'date': parsed_date,
+                    'description': description.strip(),
+                    'amount': round(amount, 2),
+                    'type': current_section_type,
+                })
+
+        return transactions, len(transactions) >= 2
+
+    except Exception as e:
+        print(f"Strategy 1 (section markers) failed: {e}", file=sys.stderr)
+        return [], False
+
+
+# ─── Strategy 2: Section header keywords (generic) ───────────────────────────
+
+def _extract_by_section_headers(doc: StatementDocument) -> Tuple[List[Dict], bool]:
+    """
+    Strategy 2: For banks that use plain section headers (no *start* markers).
+    Handles JPMorgan Classic Business Checking which:
+    - Shows multiple section names at the top of continuation pages (TOC-style),
+      e.g. both "Deposits & Credits" AND "Checks Paid" appear before the credit
+      transactions continue — only the FIRST header seen before any transaction
+      on a page is treated as the active section.
+    - Uses "Check Date" as a column header to signal the start of the checks table.
+    - Uses check-row format: CHECK_NO DATE AMOUNT (no leading date, no ^ symbol).
+    - Has a "Daily Ending Balance" section whose rows must not be parsed as transactions.
+    Also filters out daily balance rows where the description itself contains a date.
+    """
+    transactions: List[Dict] = []
+    try:
+        if not doc.page_count:
+            return [], False
+
+        first_text = doc.page_text(0)
+        statement_year = doc.detect_year(first_text)
+        current_section_type: Optional[str] = None
+        current_section_name: str = ''
+
+        for page_num in range(doc.page_count):
+            text = doc.page_text(page_num)
+            if not text:
+                continue
+
+            # Per-page pending buffer: section headers seen before the first
+            # transaction on this page are buffered. On continuation pages,
+            # multiple section names appear as a table of contents at the top;
+            # only the FIRST (= the section that continues from the prior page)
+            # is applied when the first transaction line is encountered.
+            pending_sections: List[Tuple[Optional[str], str]] = []
+            page_has_transactions: bool = False
+
+            for line in text.split('\n'):
+                line = line.strip()
+                if not line:
+                    continue
+
+                if _MARKER_LINE_RE.match(line):
+                    continue
+
+                # ── Section header detection ──────────────────────────────
+                section_matched = False
+                for pattern, section_type, section_name in _SECTION_HEADER_PATTERNS:
+                    if pattern.match(line):
+                        if not page_has_transactions:
+                            # Pre-transaction phase: buffer (only first will be used)
+                            pending_sections.append((section_type, section_name))
+                        else:
+                            # Post-transaction phase: real section transition
+                            current_section_type = section_type
+                            current_section_name = section_name
+                        section_matched = True
+                        break
+                if section_matched:
+                    continue
+
+                # Nothing to do if no section context yet
+                if current_section_type is None and not pending_sections:
+                    continue
+
+                # Determine the effective section for pre-transaction rows
+                if not page_has_transactions and pending_sections:
+                    eff_type, eff_name = pending_sections[0]
+                else:
+                    eff_type, eff_name = current_section_type, current_section_name
+
+                if eff_type is None:
+                    continue  # in a non-transaction section (e.g. balance table)
+
+                # ── Multi-column check table (JPMorgan compact "Checks Paid") ──
+                # Handles rows like: "1068 11/24 450.00 1072 11/17 1,600.00 1077 11/19 2,558.83"
+                # These appear at the bottom of a deposits page with no section transition,
+                # so we detect them by pattern (2+ CHECK_NO MM/DD AMOUNT groups per line).
+                multi_check_cols = _MULTI_CHECK_COL_RE.findall(line)
+                if len(multi_check_cols) >= 2:
+                    for check_num, date_str, amount_str in multi_check_cols:
+                        parsed_date = _det_parse_date(date_str, statement_year)
+                        if parsed_date:
+                            try:
+                                transactions.append({
+                                    'date': parsed_date,
+                                    'description': f'Check #{check_num}',
+                                    'amount': round(_det_parse_amount(amount_str), 2),
+                                    'type': 'debit',
+                                })
+                            except ValueError:
+                                pass
+                    page_has_transactions = True
+                    continue
+
+                # ── Checks In Number Order (DATE CHECK_NO AMOUNT triplets) ──
+                # Community bank format: each row has 3 columns of DATE CHECK_NO AMOUNT.
+                # e.g. " 1/02  5184  122.91  1/13  5194  35.73  1/21  5202  468.96"
+                if 'checks_in_order' in eff_name:
+                    date_check_matches = _DATE_CHECK_AMOUNT_RE.findall(line)
+                    if date_check_matches:
+                        for date_str, check_num, amount_str in date_check_matches:
+                            parsed_date = _det_parse_date(date_str, statement_year)
+                            if parsed_date:
+                                try:
+                                    if not page_has_transactions and pending_sections:
+                                        current_section_type, current_section_name = pending_sections[0]
+                                    transactions.append({
+                                        'date': parsed_date,
+                                        'description': f'Check #{check_num.rstrip("*")}',
+                                        'amount': round(_det_parse_amount(amount_str), 2),
+                                        'type': 'debit',
+                                    })
+                                except ValueError:
+                                    pass
+                        page_has_transactions = True
+                    continue  # Skip standard parsing for this section
+
+                # ── Check-row format: CHECK_NO [^] DATE AMOUNT ────────────
+                # Used when the effective section is checks (before or after
+                # first transaction, e.g. after "Check Date" column header).
+                if 'checks' in eff_name:
+                    m = _CHECK_TXN_RE.match(line)
+                    if m:
+                        check_num, date_str, amount_str = m.groups()
+                        parsed_date = _det_parse_date(date_str, statement_year)
+                        if parsed_date:
+                            try:
+                                # Apply pending section on first transaction of page
+                                if not page_has_transactions and pending_sections:
+                                    current_section_type, current_section_name = pending_sections[0]
+                                    page_has_transactions = True
+                                transactions.append({
+                                    'date': parsed_date,
+                                    'description': f'Check #{check_num}',
+                                    'amount': round(_det_parse_amount(amount_str), 2),
+                                    'type': 'debit',
+                                })
+                            except ValueError:
+                                pass
+                        continue
+
+                # ── Standard transaction line: MM/DD Description AMOUNT ───
+                m = _TXN_LINE_RE.match(line)
+                if not m:
+                    continue
+
+                date_str, description, amount_str = m.groups()
+                parsed_date = _det_parse_date(date_str, statement_year)
+                if not parsed_date:
+                    continue
+
+                # Skip daily-ending-balance rows: their "description" field
+                # is actually more date+amount pairs, e.g.:
+                #   "3,067.85 01/05 8,372.05 01/06"      (positive balances)
+                #   "(1,951.14) 01/08 427.80 01/14"      (parenthesized negatives)
+                # Real transaction descriptions start with text ("Card Purchase ...",
+                # "ACH Transfer ..."), not with a bare or parenthesized amount.
+                if re.match(r'^\s*(\([\d,]+\.\d{2}\)|[\d,]+\.\d{2})(?=\s|$)', description):
+                    continue
+
+                # Apply pending section on first real transaction of this page
+                if not page_has_transactions and pending_sections:
+                    current_section_type, current_section_name = pending_sections[0]
+                    eff_type = current_section_type
+                page_has_transactions = True
+
+                if eff_type is None:
+                    continue
+
+                try:
+                    amount = _det_parse_amount(amount_str)
+                except ValueError:
+                    continue
+
+                transactions.append({
+                    'date': parsed_date,
+                    'description': description.strip(),
+                    'amount': round(amount, 2),
+                    'type': eff_type,
+                })
+
+        return transactions, len(transactions) >= 2
+
+    except Exception as e:
+        print(f"Strategy 2 (section headers) failed: {e}", file=sys.stderr)
+        return [], False
+
+
+# ─── Strategy 3: Column-position based (Wells Fargo / column-table style) ────
+
+def _extract_by_column_position(doc: StatementDocument) -> Tuple[List[Dict], bool]:
+    """
+    Strategy 3: For statements with separate Credits and Debits columns (Wells Fargo
+    style). Uses pdfplumber word-level x-coordinates to identify which column each
+    transaction amount falls in.
+    """
+    CREDIT_COL_WORDS = {'credits', 'deposits', 'deposits/'}
+    DEBIT_COL_WORDS = {'debits', 'withdrawals', 'withdrawals/'}
+    BALANCE_COL_WORDS = {'balance'}
+    COL_TOLERANCE = 45  # ±45 points tolerance for column matching
+
+    transactions: List[Dict] = []
+    credits_x: Optional[float] = None
+    debits_x: Optional[float] = None
+    balance_x: Optional[float] = None
+    statement_year = datetime.now().year
+
+    try:
+        if not doc.page_count:
+            return [], False
+
+        first_text = doc.page_text(0)
+        statement_year = doc.detect_year(first_text)
+
+        for page_num in range(doc.page_count):
+            words = doc.page_words(page_num)
+            if not words:
+                continue
+
+            # Group words into rows by approximate y-position (within 3pt)
+            rows_by_y: Dict[int, List[Dict]] = defaultdict(list)
+            for w in words:
+                rows_by_y[round(w['top'] / 3) * 3].append(w)
+
+            # Look for header row containing BOTH a credit and a debit column label
+            for row_key in sorted(rows_by_y):
+                row_words = rows_by_y[row_key]
+                row_texts = {w['text'].lower() for w in row_words}
+                if (row_texts & CREDIT_COL_WORDS) and (row_texts & DEBIT_COL_WORDS):
+                    # Found the column header row — record x-centers
+                    for w in row_words:
+                        t = w['text'].lower()
+                        cx = (w['x0'] + w['x1']) / 2
+                        if t in CREDIT_COL_WORDS:
+                            credits_x = cx
+                        elif t in DEBIT_COL_WORDS:
+                            debits_x = cx
+                        elif t in BALANCE_COL_WORDS:
+                            balance_x = cx
+                    break  # use first matching row per page
+
+            if credits_x is None or debits_x is None:
+                continue  # no usable column info on this page yet
+
+            # Parse transaction rows
+            for row_key in sorted(rows_by_y):
+                row_words = rows_by_y[row_key]
+                if not row_words:
+                    continue
+
+                # Row must start with a date word (M/D or MM/DD)
+                first_word = min(row_words, key=lambda w: w['x0'])
+                if not _DATE_WORD_RE.match(first_word['text']):
+                    continue
+
+                # Split words into amounts vs description words
+                amount_words = [w for w in row_words if _AMOUNT_WORD_RE.match(w['text'])]
+                desc_words = [
+                    w for w in row_words
+                    if not _AMOUNT_WORD_RE.match(w['text']) and w != first_word
+                ]
+
+                # Classify each amount by column x-position
+                credit_amounts = []
+                debit_amounts = []
+                for w in amount_words:
+                    cx = (w['x0'] + w['x1']) / 2
+                    if abs(cx - credits_x) <= COL_TOLERANCE:
+                        credit_amounts.append(w['text'])
+                    elif abs(cx - debits_x) <= COL_TOLERANCE:
+                        debit_amounts.append(w['text'])
+                    # balance column amounts are intentionally ignored
+
+                if credit_amounts and not debit_amounts:
+                    txn_type = 'credit'
+                    amount_str = credit_amounts[0]
+                elif debit_amounts and not credit_amounts:
+                    txn_type = 'debit'
+                    amount_str = debit_amounts[0]
+                else:
+                    continue  # ambiguous or no classifiable amount
+
+                parsed_date = _det_parse_date(first_word['text'], statement_year)
+                if not parsed_date:
+                    continue
+                try:
+                    amount = _det_parse_amount(amount_str)
+                except ValueError:
+                    continue
+                if amount <= 0:
+                    continue
+
+                description = ' '.join(
+                    w['text'] for w in sorted(desc_words, key=lambda w: w['x0'])
+                ).strip()
+                if not description:
+                    continue
+
+                transactions.append({
+                    'date': parsed_date,
+                    'description': description,
+                    'amount': round(amount, 2),
+                    'type': txn_type,
+                })
+
+        return transactions, len(transactions) >= 2
+
+    except Exception as e:
+        print(f"Strategy 3 (column position) failed: {e}", file=sys.stderr)
+        return [], False
+
+
+# ─── Strategy 4: PDF table structure (original fallback) ─────────────────────
+
+def _extract_by_table_structure(doc: StatementDocument) -> Tuple[List[Dict], bool]:
+    """
+    Strategy 4: Original table-based extraction using pdfplumber.extract_tables().
+    Rarely succeeds for real bank statements but kept as final fallback.
+    """
+    try:
+        transactions: List[Dict] = []
+
+        for page_num in range(doc.page_count):
+            tables = doc.page_tables(page_num)
+            if not tables:
+                continue
+
+            for table in tables:
+                if not table or len(table) < 2:
+                    continue
+
+                headers = [str(h).lower() if h else '' for h in table[0]]
+                date_col = desc_col = debit_col = credit_col = balance_col = None
+
+                for i, header in enumerate(headers):
+                    if 'date' in header:
+                        date_col = i
+                    elif 'description' in header or 'transaction' in header:
+                        desc_col = i
+                    elif 'debit' in header or 'withdrawal' in header or ('payment' in header and 'out' in header):
+                        debit_col = i
+                    elif 'credit' in header or 'deposit' in header or ('payment' in header and 'in' in header):
+                        credit_col = i
+                    elif 'balance' in header:
+                        balance_col = i
+
+                if debit_col is None or credit_col is None:
+                    continue
+
+                for row in table[1:]:
+                    if not row or len(row) <= max(debit_col, credit_col):
+                        continue
+
+                    date_val = row[date_col] if date_col is not None and date_col < len(row) else None
+                    desc_val = row[desc_col] if desc_col is not None and desc_col < len(row) else ''
+                    debit_val = row[debit_col] if debit_col < len(row) else None
+                    credit_val = row[credit_col] if credit_col < len(row) else None
+                    balance_val = row[balance_col] if balance_col is not None and balance_col < len(row) else None
+
+                    if not date_val or not desc_val:
+                        continue
+
+                    amount = None
+                    txn_type = None
+
+                    if debit_val and str(debit_val).strip() not in ['-', '', 'None']:
+                        try:
+                            amount = abs(float(str(debit_val).replace('$', '').replace(',', '').replace('(', '').replace(')', '').strip()))
+                            txn_type = 'debit'
+                        except ValueError:
+                            pass
+
+                    if amount is None and credit_val and str(credit_val).strip() not in ['-', '', 'None']:
+                        try:
+                            amount = abs(float(str(credit_val).replace('$', '').replace(',', '').replace('(', '').replace(')', '').strip()))
+                            txn_type = 'credit'
+                        except ValueError:
+                            pass
+
+                    if amount is None or txn_type is None:
+                        continue
+
+                    parsed_date = None
+                    for fmt in ['%m/%d/%Y', '%m/%d/%y', '%Y-%m-%d', '%m-%d-%Y', '%m-%d-%y', '%m/%d', '%d/%m/%Y']:
+                        try:
+                            parsed_date = datetime.strptime(str(date_val).strip(), fmt)
+                            if fmt == '%m/%d':
+                                parsed_date = parsed_date.replace(year=datetime.now().year)
+                            break
+                        except ValueError:
+                            continue
+
+                    if not parsed_date:
+                        continue
+
+                    transaction: Dict = {
+                        'date': parsed_date.strftime('%Y-%m-%d'),
+                        'description': str(desc_val).strip(),
+                        'amount': round(amount, 2),
+                        'type': txn_type,
+                    }
+
+                    if balance_val and str(balance_val).strip() not in ['-', '', 'None']:
+                        try:
+                            transaction['ending_balance'] = float(
+                                str(balance_val).replace('$', '').replace(',', '').replace('(', '').replace(')', '').strip()
+                            )
+                        except ValueError:
+                            pass
+
+                    transactions.append(transaction)
+
+        return transactions, len(transactions) > 0
+
+    except Exception as e:
+        print(f"Strategy 4 (table structure) failed: {e}", file=sys.stderr)
+        return [], False
+
+
+# ─── Strategy 5: U.S. Bank ────────────────────────────────────────────────────
+
+# Section header → (transaction_type, section_slug)
+# transaction_type: 'credit' | 'debit' | 'checks' | None (stop parsing)
+_USBANK_SECTION_HEADERS = {
+    'other deposits':                    ('credit',  'deposits'),
+    'other deposits (continued)':        ('credit',  'deposits'),
+    'card withdrawals':                  ('debit',   'card'),
+    'other withdrawals':                 ('debit',   'withdrawals'),
+    'other withdrawals (continued)':     ('debit',   'withdrawals'),
+    'checks presented conventionally':   ('checks',  'checks'),
+    'balance summary':                   (None,      'balance'),
+    'analysis service charge detail':    (None,      'analysis'),
+}
+
+# Transaction line: "Oct 3 Description ... Amount" or "Oct 3 Description ... Amount-"
+# \s* between month and day handles "Nov12" (no space) and "Nov 3" (space) — pdfplumber
+# drops the space for 2-digit days due to column alignment in the PDF.
+# \$?\s* handles both "5,000.00" and "$ 5,000.00" (U.S. Bank puts $ before first entry per section)
+# Captures: month_abbr, day, description, amount_str, minus_sign
+_USBANK_TXN_RE = re.compile(
+    r'^(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s*(\d{1,2})\s+(.+?)\s+\$?\s*([\d,]+\.\d{2})(-?)\s*$',
+    re.I,
+)
+
+# Multi-column check row: "CheckNo Month Day RefNum Amount [CheckNo Month Day RefNum Amount ...]"
+# e.g. "1236 Oct 3 9213379221 612.50 1262 Oct 22 8613180667 690.00"
+# \s* between month and day for same pdfplumber spacing issue (e.g. "Nov14" vs "Nov 5")
+# Groups: check_num, month_abbr, day, amount_str
+_USBANK_CHECK_COL_RE = re.compile(
+    r'(\d+\*?)\s+(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s*(\d{1,2})\s+\d+\s+([\d,]+\.\d{2})',
+    re.I,
+)
+
+
+def _det_parse_usbank_date(month_abbr: str, day: str, year: int) -> Optional[str]:
+    """Parse U.S. Bank date tokens ('Oct', '3', 2025) → '2025-10-03'."""
+    try:
+        dt = datetime.strptime(f"{month_abbr} {int(day):02d} {year}", "%b %d %Y")
+        return dt.strftime('%Y-%m-%d')
+    except ValueError:
+        return None
+
+
+def _extract_usbank(doc: StatementDocument) -> Tuple[List[Dict], bool]:
+    """
+    Strategy 5: U.S. Bank statement format (Business & Consumer Checking).
+
+    Characteristics:
+    - Section headers: 'Other Deposits', 'Card Withdrawals', 'Other Withdrawals',
+      'Checks Presented Conventionally' (each on its own line, mixed case)
+    - Date format: 'Oct 3' / 'Oct 27'  (3-letter month + 1-2 digit day)
+    - Debit amounts end with '-': '1,071.45-'
+    - Check rows are multi-column pairs: CheckNo Month Day RefNum Amount
+    """
+    transactions: List[Dict] = []
+    try:
+        if not doc.page_count:
+            return [], False
+
+        first_text = doc.page_text(0)
+
+        # Quick guard: only activate for U.S. Bank PDFs
+        first_lower = first_text.lower()
+        if 'u.s. bank' not in first_lower and 'usbank.com' not in first_lower:
+            return [], False
+
+        statement_year = doc.detect_year(first_text)
+        current_section_type: Optional[str] = None  # 'credit' | 'debit' | 'checks' | None
+        current_section_name: str = ''
+
+        for page_num in range(doc.page_count):
+            text = doc.page_text(page_num)
+            if not text:
+                continue
+
+            for line in text.split('\n'):
+                line = line.strip()
+                if not line:
+                    continue
+
+                # ── Section header detection ──────────────────────────────
+                line_lower = line.lower()
+                if line_lower in _USBANK_SECTION_HEADERS:
+                    current_section_type, current_section_name = _USBANK_SECTION_HEADERS[line_lower]
+                    continue
+
+                if current_section_type is None:
+                    continue  # not in a parseable section yet
+
+                # ── Check section: multi-column rows ──────────────────────
+                if current_section_name == 'checks':
+                    matches = _USBANK_CHECK_COL_RE.findall(line)
+                    if matches:
+                        for check_num, month, day, amount_str in matches:
+                            parsed_date = _det_parse_usbank_date(month, day, statement_year)
+                            if parsed_date:
+                                try:
+                                    transactions.append({
+                                        'date': parsed_date,
+                                        'description': f'Check #{check_num.rstrip("*")}',
+                                        'amount': round(_det_parse_amount(amount_str), 2),
+                                        'type': 'debit',
+                                    })
+                                except ValueError:
+                                    pass
+                    continue  # skip non-check-row lines in checks section
+
+                # ── Standard transaction line: Mon D Description Amount[-] ─
+                m = _USBANK_TXN_RE.match(line)
+                if not m:
+                    continue
+
+                month, day, description, amount_str, _minus = m.groups()
+                parsed_date = _det_parse_usbank_date(month, day, statement_year)
+                if not parsed_date:
+                    continue
+
+                try:
+                    amount = _det_parse_amount(amount_str)
+                except ValueError:
+                    continue
+
+                transactions.append({
+                    'date': parsed_date,
+                    'description': description.strip(),
+                    'amount': round(amount, 2),
+                    'type': current_section_type,
+                })
+
+        return transactions, len(transactions) >= 2
+
+    except Exception as e:
+        print(f"Strategy 5 (U.S. Bank) failed: {e}", file=sys.stderr)
+        return [], False
+
+
+# ─── Strategy 6: FirstLight Federal Credit Union (FLFCU) ─────────────────────
+
+# Transaction line: "MM/DD/YYYY Description [-Amount] Balance"
+# Negative amount → debit; positive → credit.
+_FLFCU_TXN_RE = re.compile(
+    r'^(\d{2}/\d{2}/\d{4})\s+(.+?)\s+(-?[\d,]+\.\d{2})\s+([\d,]+\.\d{2})\s*$'
+)
+
+# Section keywords that signal end of transaction data (summary sections)
+_FLFCU_STOP_KEYWORDS = frozenset({
+    'checks cleared at a glance',
+    'atm / checkcard activity at a glance',
+    'summary of check fees',
+})
+
+
+def _extract_flfcu(doc: StatementDocument) -> Tuple[List[Dict], bool]:
+    """
+    Strategy 6: FirstLight Federal Credit Union (FLFCU) member account statement.
+
+    Characteristics:
+    - Identifier: 'MemberAccountStatement' (no spaces in pdfplumber) + 'flfcu' / 'firstlightfcu'
+    - Sections: SHARE SAVINGS (skipped) and CHECKING (captured)
+      * Only CHECKING transactions are included — Share Savings are internal transfers
+        that inflate totals and don't belong in MCA analysis
+    - Transaction format: MM/DD/YYYY Description Amount Balance
+      * Negative amount → debit; positive → credit
+    - Continuation lines (CO:, ACHTraceNumber:, OnUsDraft, etc.) are automatically
+      skipped because they don't start with MM/DD/YYYY
+    - Summary sections (Checks Cleared, ATM Activity) stop parsing
+    """
+    transactions: List[Dict] = []
+    try:
+        if not doc.page_count:
+            return [], False
+
+        first_lower = doc.page_text(0).lower().replace(' ', '')
+
+        # Guard: only activate for FLFCU statements
+        if 'memberaccountstatement' not in first_lower:
+            return [], False
+        if 'flfcu' not in first_lower and 'firstlightfcu' not in first_lower:
+            return [], False
+
+        stop_parsing = False
+        in_checking = False  # Only collect transactions from CHECKING section
+        for page_num in range(doc.page_count):
+            if stop_parsing:
+                break
+            text = doc.page_text(page_num)
+            if not text:
+                continue
+
+            for line in text.split('\n'):
+                stripped = line.strip()
+                if not stripped:
+                    continue
+
+                # Stop at summary sections
+                if stripped.lower() in _FLFCU_STOP_KEYWORDS:
+                    stop_parsing = True
+                    break
+
+                # Track account section — only parse CHECKING, skip SHARE SAVINGS
+                if stripped == 'CHECKING':
+                    in_checking = True
+                    continue
+                if stripped == 'SHARE SAVINGS':
+                    in_checking = False
+                    continue
+
+                if not in_checking:
+                    continue
+
+                m = _FLFCU_TXN_RE.match(stripped)
+                if not m:
+                    continue
+
+                date_str, description, amount_str, balance_str = m.groups()
+
+                parsed_date = _det_parse_date(date_str, 0)
+                if not parsed_date:
+                    continue
+
+                try:
+                    amount = _det_parse_amount(amount_str)
+                    balance = _det_parse_amount(balance_str)
+                except ValueError:
+                    continue
+
+                is_debit = amount < 0
+                transactions.append({
+                    'date': parsed_date,
+                    'description': description.strip(),
+                    'amount': round(abs(amount), 2),
+                    'type': 'debit' if is_debit else 'credit',
+                    'ending_balance': round(balance, 2),
+                })
+
+        return transactions, len(transactions) >= 2
+
+    except Exception as e:
+        print(f"Strategy 6 (FLFCU) failed: {e}", file=sys.stderr)
+        return [], False
+
+
+# ─── Strategy 7: Huntington National Bank ─────────────────────────────────────
+#
+# Statement layout (pdfplumber text):
+#   Identifier  : "THE HUNTINGTON NATIONAL BANK" or "Huntington Unlimited" on page 1
+#
+#   Sections (credit):
+#     "Deposits (+) Account:..."        → two-col: MM/DD AMOUNT SERIAL TYPE
+#     "Other Credits (+) Account:..."   → single-col: MM/DD AMOUNT DESCRIPTION
+#     "Electronic Deposits ..."         → single-col (if separate section)
+#     "Wire Transfer Credits ..."       → single-col (if separate section)
+#
+#   Sections (debit):
+#     "Checks(-) Account:..."           → two-col: MM/DD AMOUNT CHECK#[*]
+#     "Other Debits (-) Account:..."    → single-col: MM/DD AMOUNT DESCRIPTION
+#     "Electronic Withdrawals ..."      → single-col (if separate section)
+#     "Service ChargeDetail Account:..."→ single-col: MM/DD AMOUNT DESCRIPTION
+#
+#   Stop sections:
+#     "Balance Activity Account:..."    → daily balance table, stop
+#     "Service ChargeSummary ..."       → summary only, stop
+
+# Matches each entry in a two-column Deposits or Checks row.
+# Deposits can have serial number OR just a type label (e.g. "Brch/ATM"):
+#   MM/DD  AMOUNT  [SERIAL]  [TYPE]   ← serial is optional
+# Checks always have a check number:
+#   MM/DD  AMOUNT  CHECK#[*]
+# We capture just date + amount; the ref token (serial/check) is grabbed separately.
+_HUNTINGTON_ENTRY_RE = re.compile(
+    r'(\d{2}/\d{2})\s+([\d,]+\.\d{2})'
+)
+# Separate regex to grab the optional serial/check number right after the amount
+_HUNTINGTON_REF_RE = re.compile(
+    r'(\d{2}/\d{2})\s+([\d,]+\.\d{2})\s+(\d+\*?)'
+)
+
+# Matches a single-column transaction line:
+#   MM/DD  AMOUNT  DESCRIPTION...
+_HUNTINGTON_SINGLE_RE = re.compile(
+    r'^(\d{2}/\d{2})\s+([\d,]+\.\d{2})\s+(.+)$'
+)
+
+# Section header regexes matched against the START of each stripped line
+_HUNTINGTON_CREDIT_TWO_COL_RE = re.compile(r'^Deposits\s*\(\+\)', re.I)
+_HUNTINGTON_CREDIT_ONE_COL_RE = re.compile(
+    r'^(?:Other\s*Credits?\s*\(\+\)|Electronic\s*Deposits?|Wire\s*Transfer\s*Credits?)', re.I)
+_HUNTINGTON_DEBIT_TWO_COL_RE  = re.compile(r'^Checks\s*\(', re.I)
+_HUNTINGTON_DEBIT_ONE_COL_RE  = re.compile(
+    r'^(?:Other\s*Debits?\s*\(-\)|Electronic\s*Withdrawals?|Service\s*Charge\s*Detail)', re.I)
+_HUNTINGTON_STOP_RE           = re.compile(
+    r'^(?:Balance\s*Activity|Service\s*Charge\s*Summary)', re.I)
+_HUNTINGTON_HEADER_ROW_RE     = re.compile(r'^Date\s+Amount', re.I)
+_HUNTINGTON_FOOTNOTE_RE       = re.compile(
+    r'^\(\*\)|\bInvestments are\b|\bThe Huntington National\b|'
+    r'\bStatementPeriod\b|\bDocusign\b', re.I)
+# Lines in the "Waives and Discounts (+)" column of Service Charge Detail —
+# these are fee waivers/credits, NOT debits.  Skip them when parsing debit sections.
+_HUNTINGTON_WAIVER_RE         = re.compile(r'WAIVER|DISCOUNT|GRACE', re.I)
+
+
+def _extract_huntington(doc: StatementDocument) -> Tuple[List[Dict], bool]:
+    """
+    Strategy 7: Huntington National Bank statement parser.
+
+    Two-column sections (Deposits, Checks): use findall to capture every
+    MM/DD AMOUNT SERIAL entry on a line (1 or 2 per line).
+    Single-column sections (Other Credits/Debits, Service Charges): each line
+    starting with MM/DD is one transaction; continuation lines are skipped.
+    """
+    transactions: List[Dict] = []
+    try:
+        if not doc.page_count:
+            return [], False
+
+        first_text = doc.page_text(0)
+        first_squished = first_text.upper().replace(' ', '')
+
+        # Guard: only activate for Huntington statements
+        if ('HUNTINGTONNATIONALBANK' not in first_squished and
+                'HUNTINGTONUNLIMITED' not in first_squished and
+                'HUNTINGTONBUSINESS' not in first_squished):
+            return [], False
+
+        statement_year = doc.detect_year(first_text)
+        current_type: Optional[str] = None   # 'credit' or 'debit'
+        is_two_col: bool = False              # True for Deposits / Checks sections
+        stop_parsing: bool = False
+        # Track waived (date, amount) pairs so we can remove the matching charge
+        waived_pairs: List[Tuple] = []
+
+        for page_num in range(doc.page_count):
+            if stop_parsing:
+                break
+            text = doc.page_text(page_num)
+            if not text:
+                continue
+
+            for line in text.split('\n'):
+                stripped = line.strip()
+                if not stripped:
+                    continue
+
+                # ── Stop sections ──────────────────────────────────────
+                if _HUNTINGTON_STOP_RE.match(stripped):
+                    stop_parsing = True
+                    break
+
+                # ── Section header detection ────────────────────────────
+                if _HUNTINGTON_CREDIT_TWO_COL_RE.match(stripped):
+                    current_type = 'credit'
+                    is_two_col = True
+                    continue
+                if _HUNTINGTON_CREDIT_ONE_COL_RE.match(stripped):
+                    current_type = 'credit'
+                    is_two_col = False
+                    continue
+                if _HUNTINGTON_DEBIT_TWO_COL_RE.match(stripped):
+                    current_type = 'debit'
+                    is_two_col = True
+                    continue
+                if _HUNTINGTON_DEBIT_ONE_COL_RE.match(stripped):
+                    current_type = 'debit'
+                    is_two_col = False
+                    continue
+
+                if current_type is None:
+                    continue
+
+                # ── Skip header / footnote rows ─────────────────────────
+                if _HUNTINGTON_HEADER_ROW_RE.match(stripped):
+                    continue
+                if _HUNTINGTON_FOOTNOTE_RE.search(stripped):
+                    continue
+
+                # ── Parse transaction lines ─────────────────────────────
+                if is_two_col:
+                    # Deposits: MM/DD AMOUNT [SERIAL] [TYPE]  (serial optional for Brch/ATM)
+                    # Checks:   MM/DD AMOUNT CHECK#[*]
+                    # Build a ref map (date+amount → check#) for check descriptions
+                    refs = {(d, a): r for d, a, r in _HUNTINGTON_REF_RE.findall(stripped)}
+                    entries = _HUNTINGTON_ENTRY_RE.findall(stripped)
+                    for date_str, amount_str in entries:
+                        parsed_date = _det_parse_date(date_str, statement_year)
+                        if not parsed_date:
+                            continue
+                        try:
+                            amount = round(_det_parse_amount(amount_str), 2)
+                        except ValueError:
+                            continue
+                        ref = refs.get((date_str, amount_str), '')
+                        if current_type == 'debit':
+                            desc = f"Check #{ref.rstrip('*')}" if ref else 'Check'
+                        else:
+                            desc = 'Deposit'
+                        transactions.append({
+                            'date': parsed_date,
+                            'description': desc,
+                            'amount': amount,
+                            'type': current_type,
+                        })
+                else:
+                    # Single-column: MM/DD AMOUNT DESCRIPTION
+                    # Continuation lines (timestamps, extra text) skip automatically
+                    m = _HUNTINGTON_SINGLE_RE.match(stripped)
+                    if not m:
+                        continue
+                    date_str, amount_str, description = m.groups()
+                    # Skip "Waives and Discounts (+)" lines that pdfplumber merges
+                    # into the same column as "Service Charge (-)" entries.
+                    # Also record the (date, amount) so we can cancel the
+                    # corresponding charge entry (both net to $0 per bank totals).
+                    if current_type == 'debit' and _HUNTINGTON_WAIVER_RE.search(description):
+                        waived_date = _det_parse_date(date_str, statement_year)
+                        if waived_date:
+                            try:
+                                waived_pairs.append((waived_date, round(_det_parse_amount(amount_str), 2)))
+                            except ValueError:
+                                pass
+                        continue
+                    parsed_date = _det_parse_date(date_str, statement_year)
+                    if not parsed_date:
+                        continue
+                    try:
+                        amount = round(_det_parse_amount(amount_str), 2)
+                    except ValueError:
+                        continue
+                    transactions.append({
+                        'date': parsed_date,
+                        'description': description.strip(),
+                        'amount': amount,
+                        'type': current_type,
+                    })
+
+        # Remove debit entries that were cancelled by fee waivers.
+        # The bank's statement totals already net waivers out, so both
+        # the original charge and its waiver should be excluded.
+        for waived_date, waived_amount in waived_pairs:
+            for i, t in enumerate(transactions):
+                if (t['type'] == 'debit' and
+                        t['date'] == waived_date and
+                        t['amount'] == waived_amount):
+                    transactions.pop(i)
+                    break  # only remove one matching charge per waiver
+
+        return transactions, len(transactions) >= 2
+
+    except Exception as e:
+        print(f"Strategy 7 (Huntington) failed: {e}", file=sys.stderr)
+        return [], False
+
+
+# ─── Strategy 8: CNBank (Community Bank NA) ──────────────────────────────────
+
+_CNBANK_GUARD_RE = re.compile(r'cnbank\.com|CNBusiness|CN\s*Bank\b', re.I)
+# Transaction line: MM/DD/YYYY  description  [-]$amount  $balance
+_CNBANK_TXN_RE   = re.compile(
+    r'^(\d{2}/\d{2}/\d{4})\s+(.+?)\s+(-?\$[\d,]+\.\d{2})\s+\$[\d,]+\.\d{2}\s*$'
+)
+# Stop before the compact Checks Paid summary — checks are already in the main list
+_CNBANK_STOP_RE  = re.compile(r'^\s*Checks?\s+Paid\s*$', re.I)
+# Lines to skip entirely
+_CNBANK_SKIP_RE  = re.compile(
+    r'^\s*(Date\s+Description|Beginning\s+Balance|Page:\s*\d|Statement\s+Date:|'
+    r'Primary\s+Account:|Account\s+Details|Account\s+Beginning|Routing\s+Number|'
+    r'Summary\s+of\s+Account|Customer\s+Call\s+Center|\(\d{3}\)|CNBank\.com)',
+    re.I,
+)
+
+
+def _det_parse_cnbank_date(date_str: str) -> Optional[str]:
+    """Parse MM/DD/YYYY (CNBank full-year format) to YYYY-MM-DD."""
+    try:
+        return datetime.strptime(date_str.strip(), '%m/%d/%Y').strftime('%Y-%m-%d')
+    except ValueError:
+        return None
+
+
+def _extract_cnbank(doc: StatementDocument) -> Tuple[List[Dict], bool]:
+    """
+    Strategy 8: CNBank / Community Bank NA statement parser.
+
+    Format (single chronological list, no separate debit/credit sections):
+      Date       Description                           Withdrawal    Deposit    Balance
+      MM/DD/YYYY Withdrawal Internet Transfer to ...   -$10,000.00             $202,364.95
+                 Continuation line                                              ← append to desc
+      MM/DD/YYYY Electronic Deposit TOPCO ASSOCIATES   -            $162,638.64 $365,003.59
+
+    Amount sign: -$xxx = debit, $xxx (positive) = credit.
+    Stop at "Checks Paid" — that section is a summary of checks already listed inline.
+    """
+    transactions: List[Dict] = []
+    try:
+        if not doc.page_count:
+            return [], False
+
+        first_text = doc.page_text(0)
+        if not _CNBANK_GUARD_RE.search(first_text):
+            return [], False
+
+        current_txn: Optional[Dict] = None
+
+        def _flush():
+            if current_txn:
+                transactions.append(dict(current_txn))
+
+        stop = False
+        for page_num in range(doc.page_count):
+            if stop:
+                break
+            text = doc.page_text(page_num)
+            if not text:
+                continue
+
+            for line in text.split('\n'):
+                stripped = line.strip()
+                if not stripped:
+                    continue
+
+                # Stop at Checks Paid summary (already captured inline)
+                if _CNBANK_STOP_RE.match(stripped):
+                    _flush()
+                    current_txn = None
+                    stop = True
+                    break
+
+                # Skip header / boilerplate lines
+                if _CNBANK_SKIP_RE.match(stripped):
+                    continue
+
+                # Try to match a full transaction line
+                m = _CNBANK_TXN_RE.match(stripped)
+                if m:
+                    _flush()
+                    date_str, description, amount_str = m.groups()
+                    parsed_date = _det_parse_cnbank_date(date_str)
+                    if not parsed_date:
+                        current_txn = None
+                        continue
+                    # Amount sign determines debit vs credit
+                    is_debit = amount_str.startswith('-')
+                    clean_amount = amount_str.lstrip('-').lstrip('$').replace(',', '')
+                    try:
+                        amount = round(float(clean_amount), 2)
+                    except ValueError:
+                        current_txn = None
+                        continue
+                    current_txn = {
+                        'date': parsed_date,
+                        'description': description.strip(),
+                        'amount': amount,
+                        'type': 'debit' if is_debit else 'credit',
+                    }
+                else:
+                    # Continuation line — append to description
+                    if current_txn:
+                        current_txn['description'] += ' ' + stripped
+
+        _flush()
+
+        # ── Net out rejected check pairs ─────────────────────────────────────
+        # CNBank lists a returned check twice:
+        #   debit:  Check-Inclearings 25374  -$9,828.00   (check initially cleared)
+        #   credit: Check-Inclearings 25374 (Rejected)    (check returned / bounced)
+        # The bank's own summary nets both to zero and excludes them from
+        # Deposits and Withdrawals totals.  Remove both so our totals match the PDF.
+        _CNBANK_REJECTED_RE = re.compile(
+            r'Check-Inclearings\s+(\S+)\s+\(Rejected\)', re.I
+        )
+        rejected_indices = []
+        original_indices = []
+        for idx, txn in enumerate(transactions):
+            m = _CNBANK_REJECTED_RE.search(txn['description'])
+            if m:
+                check_num = m.group(1)
+                rejected_indices.append((idx, check_num, txn['amount']))
+
+        for rej_idx, check_num, amount in rejected_indices:
+            # Find the matching original debit — same check number, same amount
+            for orig_idx, txn in enumerate(transactions):
+                if (orig_idx != rej_idx
+                        and txn['type'] == 'debit'
+                        and txn['amount'] == amount
+                        and f'Check-Inclearings {check_num}' in txn['description']
+                        and '(Rejected)' not in txn['description']
+                        and orig_idx not in original_indices):
+                    original_indices.append(orig_idx)
+                    break
+
+        # Remove both rejected credit and its matching original debit
+        remove = set([r[0] for r in rejected_indices] + original_indices)
+        if remove:
+            print(
+                f"  CNBank: netted out {len(remove)} rejected-check transactions "
+                f"({len(rejected_indices)} pair(s))",
+                file=sys.stderr,
+            )
+            transactions = [t for i, t in enumerate(transactions) if i not in remove]
+
+        return transactions, len(transactions) >= 2
+
+    except Exception as e:
+        print(f"Strategy 8 (CNBank) failed: {e}", file=sys.stderr)
+        return [], False
+
+
+# ─── Strategy 9: BOKF / Bank of Texas ────────────────────────────────────────
+
+_BOKF_GUARD_RE   = re.compile(r'bankoftexas\.com|BOKF,?\s*NA|Bank\s+of\s+Texas', re.I)
+_BOKF_TXN_RE     = re.compile(r'^(\d{1,2}-\d{1,2})\s+(.+?)\s+([\d,]+\.\d{2})\s*$')
+_BOKF_STOP_RE    = re.compile(r'^\s*DAILY\s+ACCOUNT\s+BALANCE\s*$', re.I)
+_BOKF_SKIP_RE    = re.compile(
+    r'^\s*(Date\s+Amount|CHECKS?\s+\(|\*+\s*No\s+Checks\s*\*+|No\s+Checks|SERVICE\s+FEE)\s*',
+    re.I,
+)
+# Barcode artifact lines at the BOKF page footer: all uppercase letters, no spaces, 15+ chars
+_BOKF_BARCODE_RE  = re.compile(r'^[A-Z]{15,}$')
+# The long account/routing summary line that ends the transaction area on each page
+# e.g. "014 000008098135377 000000004955427 11302025 ..."
+_BOKF_PAGE_END_RE = re.compile(r'^\d{3}\s+\d{12}')
+# Legal/boilerplate footer text that follows the barcodes — treat as page-end signal
+_BOKF_LEGAL_RE    = re.compile(
+    r'FOR\s+ACCOUNT\s+BALANCING|IMPORTANT\s+INFORMATION|ADDRESS\s+CHANGES|'
+    r'ELECTRONIC\s+TRANSFER\s+RIGHTS|CHANGE\s+OF\s+ADDRESS|'
+    r'BALANCING\s+YOUR\s+ACCOUNT',
+    re.I,
+)
+_BOKF_SECTION_MAP = [
+    (re.compile(r'^\s*DEPOSITS?\s*$',    re.I), 'credit'),
+    (re.compile(r'^\s*WITHDRAWALS?\s*$', re.I), 'debit'),
+    (re.compile(r'^\s*CHECKS?\s*$',      re.I), 'debit'),
+]
+
+
+def _det_parse_bokf_date(date_str: str, year: int) -> Optional[str]:
+    """Parse MM-DD (BOKF dash-separated format) to YYYY-MM-DD."""
+    try:
+        dt = datetime.strptime(date_str.strip(), '%m-%d').replace(year=year)
+        return dt.strftime('%Y-%m-%d')
+    except ValueError:
+        return None
+
+
+def _extract_bokf(doc: StatementDocument) -> Tuple[List[Dict], bool]:
+    """
+    Strategy 8: BOKF / Bank of Texas statement parser.
+
+    Format (all sections use MM-DD date, not MM/DD):
+      DEPOSITS              ← section header
+      Date Amount           ← column header (skip)
+      11-21 INCOMING FED WIRE CR     300,000.00
+            001095                              ← continuation: append to description
+            HENRY DAVID BECKHAM JR
+      WITHDRAWALS
+      11-21 TRANSFER TO CHECKING 8097132939  300,000.00
+      11-21 WIRE TRSFR IN FEE                    15.00
+      DAILY ACCOUNT BALANCE                   ← stop
+    """
+    transactions: List[Dict] = []
+    try:
+        if not doc.page_count:
+            return [], False
+
+        first_text = doc.page_text(0)
+
+        # Guard: only activate for BOKF / Bank of Texas statements
+        if not _BOKF_GUARD_RE.search(first_text):
+            return [], False
+
+        # Detect year: _detect_year looks for MM/DD/YYYY but BOKF uses MM-DD-YY,
+        # so also try the statement period line "11-01-25 to 11-30-25"
+        statement_year = doc.detect_year(first_text)
+        if not statement_year:
+            m = re.search(r'\d{1,2}-\d{1,2}-(\d{2,4})', first_text)
+            if m:
+                y = int(m.group(1))
+                statement_year = 2000 + y if y < 100 else y
+
+        current_type: Optional[str] = None
+        current_txn: Optional[Dict] = None   # buffered pending transaction
+
+        def _flush():
+            if current_txn:
+                transactions.append(dict(current_txn))
+
+        stop = False
+        for page_num in range(doc.page_count):
+            if stop:
+                break
+            text = doc.page_text(page_num)
+            if not text:
+                continue
+
+            page_in_txn_area = False  # flips True once first section header seen on page
+            for line in text.split('\n'):
+                stripped = line.strip()
+                if not stripped:
+                    continue
+
+                # Stop at the daily balance table — no more transactions below
+                if _BOKF_STOP_RE.match(stripped):
+                    _flush()
+                    current_txn = None
+                    stop = True
+                    break
+
+                # Page-footer signals: flush pending transaction and leave transaction
+                # area; everything after these lines is boilerplate or a new page
+                if _BOKF_PAGE_END_RE.match(stripped) or _BOKF_LEGAL_RE.search(stripped):
+                    _flush()
+                    current_txn = None
+                    page_in_txn_area = False
+                    continue
+
+                # Barcode artifact lines — always skip
+                if _BOKF_BARCODE_RE.match(stripped):
+                    continue
+
+                # Section header detection
+                section_matched = False
+                for pat, stype in _BOKF_SECTION_MAP:
+                    if pat.match(stripped):
+                        _flush()
+                        current_txn = None
+                        current_type = stype
+                        page_in_txn_area = True
+                        section_matched = True
+                        break
+                if section_matched:
+                    continue
+
+                # Skip column headers and noise
+                if _BOKF_SKIP_RE.match(stripped):
+                    continue
+
+                # Only process lines while inside a transaction area on this page
+                if not page_in_txn_area or current_type is None:
+                    continue
+
+                # Try to match a full transaction line: MM-DD DESCRIPTION AMOUNT
+                m = _BOKF_TXN_RE.match(stripped)
+                if m:
+                    _flush()
+                    date_str, description, amount_str = m.groups()
+                    parsed_date = _det_parse_bokf_date(date_str, statement_year)
+                    if not parsed_date:
+                        current_txn = None
+                        continue
+                    try:
+                        amount = round(_det_parse_amount(amount_str), 2)
+                    except ValueError:
+                        current_txn = None
+                        continue
+                    current_txn = {
+                        'date': parsed_date,
+                        'description': description.strip(),
+                        'amount': amount,
+                        'type': current_type,
+                    }
+                else:
+                    # Continuation line — append extra description detail
+                    if current_txn:
+                        current_txn['description'] += ' ' + stripped
+
+        _flush()
+
+        return transactions, len(transactions) >= 1
+
+    except Exception as e:
+        print(f"Strategy 8 (BOKF) failed: {e}", file=sys.stderr)
+        return [], False
+
+
+# ─── Strategy 10: Michigan First Credit Union ─────────────────────────────────
+
+_MFCU_GUARD_RE = re.compile(r'MichiganFirst\.com', re.I)
+_MFCU_TXN_RE   = re.compile(
+    r'^(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+(\d{1,2})\s+'
+    r'(.+?)\s+(-?[\d,]+\.\d{2})\s+([\d,]+\.\d{2})\s*$',
+    re.I,
+)
+_MFCU_STOP_RE  = re.compile(r'^\s*ATM\s+WITHDRAWALS\s+AND\s+OTHER\s+CHARGES', re.I)
+_MFCU_SKIP_RE  = re.compile(
+    r'^\s*(Balance\s+Forward|Ending\s+Balance|---\s*Continued|'
+    r'Date\s+Activity|CHECKING\s+ACCOUNTS|SAVINGS\s+ACCOUNTS|'
+    r'MichiganFirst\.com|Member\s+(?:No\.?|Number)|Account\s+(?:No\.?|Number)|'
+    r'Statement\s+Period|Page\s+\d+\s+of\s+\d+|'
+    r'Additions?\s+Subtractions?\s+Balance)',
+    re.I,
+)
+_MFCU_MONTHS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12,
+}
+
+
+def _det_parse_mfcu_date(month_str: str, day_str: str, year: int) -> Optional[str]:
+    """Parse (3-letter month abbr, DD, YYYY) → YYYY-MM-DD."""
+    try:
+        month = _MFCU_MONTHS.get(month_str.lower()[:3])
+        if not month:
+            return None
+        return datetime(year, month, int(day_str)).strftime('%Y-%m-%d')
+    except (ValueError, TypeError):
+        return None
+
+
+def _extract_michiganfirst(doc: StatementDocument) -> Tuple[List[Dict], bool]:
+    """
+    Strategy 10: Michigan First Credit Union statement parser.
+
+    Format (single chronological list spanning CHECKING + SAVINGS sections):
+      Date  Activity                         Additions  Subtractions  Balance
+      Nov 01 Balance Forward                                            469.06
+      Nov 01 Withdrawal Bill payment                       20.00       449.06
+      Nov 04 Deposit Payroll Direct Deposit    750.00                1,199.06
+      ...
+      Nov 30 Ending Balance                                           1,000.00
+      ATM WITHDRAWALS AND OTHER CHARGES   ← stop here (summary section, page 10+)
+
+    pdfplumber merges columns; sign on amount indicates direction:
+      debit  (Subtraction) → negative: "-20.00"
+      credit (Addition)    → positive: "750.00"
+    The last token is always the running balance.
+    """
+    transactions: List[Dict] = []
+    try:
+        if not doc.page_count:
+            return [], False
+
+        first_text = doc.page_text(0)
+        if not _MFCU_GUARD_RE.search(first_text):
+            return [], False
+
+        # Detect statement year: "Nov 01, 2025 thru Nov 30, 2025"
+        statement_year = doc.detect_year(first_text)
+        if not statement_year:
+            ym = re.search(
+                r'(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+\d{1,2},\s+(\d{4})',
+                first_text, re.I,
+            )
+            if ym:
+                statement_year = int(ym.group(1))
+        if not statement_year:
+            statement_year = datetime.now().year
+
+        current_txn: Optional[Dict] = None
+
+        def _flush():
+            if current_txn:
+                transactions.append(dict(current_txn))
+
+        stop = False
+        for page_num in range(doc.page_count):
+            if stop:
+                break
+            text = doc.page_text(page_num)
+            if not text:
+                continue
+
+            for line in text.split('\n'):
+                stripped = line.strip()
+                if not stripped:
+                    continue
+
+                # Stop at ATM summary section (page 10+)
+                if _MFCU_STOP_RE.match(stripped):
+                    _flush()
+                    current_txn = None
+                    stop = True
+                    break
+
+                # Skip headers, markers, Balance Forward / Ending Balance lines
+                if _MFCU_SKIP_RE.match(stripped):
+                    continue
+
+                # Try to match: Month DD Description amount balance
+                m = _MFCU_TXN_RE.match(stripped)
+                if m:
+                    _flush()
+                    month_str, day_str, description, amount_str, _balance = m.groups()
+                    parsed_date = _det_parse_mfcu_date(month_str, day_str, statement_year)
+                    if not parsed_date:
+                        current_txn = None
+                        continue
+                    is_debit = amount_str.startswith('-')
+                    clean_amount = amount_str.lstrip('-').replace(',', '')
+                    try:
+                        amount = round(float(clean_amount), 2)
+                    except ValueError:
+                        current_txn = None
+                        continue
+                    current_txn = {
+                        'date': parsed_date,
+                        'description': description.strip(),
+                        'amount': amount,
+                        'type': 'debit' if is_debit else 'credit',
+                    }
+                else:
+                    # Continuation line — append to current transaction description
+                    if current_txn:
+                        current_txn['description'] += ' ' + stripped
+
+        _flush()
+
+        return transactions, len(transactions) >= 2
+
+    except Exception as e:
+        print(f"Strategy 10 (MichiganFirst) failed: {e}", file=sys.stderr)
+        return [], False
+
+
+# ─── Strategy 11: M&T Bank ────────────────────────────────────────────────────
+
+_MTB_GUARD_RE     = re.compile(r'M&T\s+TAILORED|M&T\s+BUSINESS\s+CHECKING', re.I)
+_MTB_DATE_RE      = re.compile(r'^\d{2}/\d{2}/\d{4}$')
+_MTB_AMT_RE       = re.compile(r'^\$?[\d,]+\.\d{2}$')
+_MTB_STOP_RE      = re.compile(
+    r'NUMBER\s+OF\s+CHECKS\s+PAID|NUMBER\s+OF\s+DEPOSITS|'
+    r'AMOUNT\s+OF\s+CHECKS|EFFECTIVE\s+JANUARY',
+    re.I,
+)
+_MTB_SKIP_RE      = re.compile(
+    r'FOR\s+INQUIRIES|PAGE\s+\d+\s+OF|COMMERCIAL\s+PA|'
+    r'POSTING\s+DATE|TRANSACTION\s+DESC|DEPOSITS\s+&\s+OTHER|'
+    r'WITHDRAWALS\s+&|DAILY\s+BALANCE|ACCOUNT\s+ACTIVITY|'
+    r'ACCOUNT\s+TYPE|ACCOUNT\s+NUMBER|STATEMENT\s+PERIOD|'
+    r'BEGINNING\s+BALANCE|ENDING\s+BALANCE|'
+    r'60\s+PUBLIC\s+SQUARE|WILKES-BARRE|'
+    r'LESS\s+CHECKS|LESS\s+SERVICE',
+    re.I,
+)
+# Diagonal "Capybara Capital" watermark words that appear on every page at
+# fixed y-positions between transaction lines.
+_MTB_WATERMARK_RE = re.compile(r'^(Capybara|Capital|bara)$', re.I)
+
+# Column x1 (right-edge) boundaries — consistent across all pages
+_MTB_DATE_X0_MAX = 75    # date words:   x0 < 75  (dates at x0=28)
+_MTB_CREDIT_X1   = (340, 410)   # credit amounts: x1 ≈ 399
+_MTB_DEBIT_X1    = (430, 500)   # debit amounts:  x1 ≈ 485
+_MTB_BAL_X1_MIN  = 510          # balance:        x1 ≈ 572  (skip for txns)
+
+
+def _det_parse_mtb_date(text: str) -> Optional[str]:
+    """Parse MM/DD/YYYY → YYYY-MM-DD."""
+    try:
+        return datetime.strptime(text.strip(), '%m/%d/%Y').strftime('%Y-%m-%d')
+    except ValueError:
+        return None
+
+
+def _extract_mtbank(doc: StatementDocument) -> Tuple[List[Dict], bool]:
+    """
+    Strategy 11: M&T Bank / M&T Tailored Business Checking parser.
+
+    Format (single chronological list, one row per transaction):
+      DATE       DESCRIPTION                       CREDIT(+)  DEBIT(-)   BALANCE
+      10/01/2025 DEPOSIT                            3,240.00
+      10/01/2025 FEDEX501764217  800-4633339                   19.30
+      10/01/2025 CHECK NUMBER 1881                            705.00  49,008.94
+                 AUTOZONE 1001128 N COURTLAND ST...           ← continuation line
+
+    Uses PyMuPDF (fitz) for clean word extraction with x/y coordinates.
+    The PDF carries a diagonal "Capybara Capital" watermark that pdfplumber
+    embeds into amounts ($19.3a0) and descriptions; fitz separates it to
+    fixed inter-line y-positions — detected as lines containing only
+    Capybara/Capital/bara words with no date and no amount.
+    """
+    transactions: List[Dict] = []
+    try:
+        if not doc.fitz_page_count:
+            return [], False
+
+        # Guard check from first page text
+        first_text = doc.fitz_page_text(0)
+        if not _MTB_GUARD_RE.search(first_text):
+            return [], False
+
+        current_txn: Optional[Dict] = None
+
+        def _flush():
+            if current_txn and current_txn.get('amount') is not None and current_txn.get('type'):
+                transactions.append(dict(current_txn))
+
+        stop = False
+        for pg_num in range(doc.fitz_page_count):
+            if stop:
+                break
+
+            # Returns (x0, y0, x1, y1, text, block_no, line_no, word_no)
+            raw_words = doc.fitz_page_words(pg_num)
+            if not raw_words:
+                continue
+
+            # Drop watermark artifacts at negative / out-of-page coordinates
+            words = [w for w in raw_words if w[0] >= 0 and w[1] >= 0 and w[2] <= 600]
+
+            # Group words into visual lines by y0-coordinate (tolerance 1.5 pt)
+            lines: Dict[float, List] = {}
+            for w in words:
+                y0 = w[1]
+                matched = False
+                for k in list(lines.keys()):
+                    if abs(k - y0) <= 1.5:
+                        lines[k].append(w)
+                        matched = True
+                        break
+                if not matched:
+                    lines[y0] = [w]
+
+            for y_key in sorted(lines.keys()):
+                line_words = sorted(lines[y_key], key=lambda w: w[0])
+                line_text  = ' '.join(w[4] for w in line_words)
+
+                # Stop at checks-paid or pricing-notice section
+                if _MTB_STOP_RE.search(line_text):
+                    _flush()
+                    current_txn = None
+                    stop = True
+                    break
+
+                # Skip header / footer / summary boilerplate
+                if _MTB_SKIP_RE.search(line_text):
+                    continue
+
+                # Skip watermark-only lines (Capybara/Capital isolated between txns)
+                if all(_MTB_WATERMARK_RE.match(w[4]) for w in line_words):
+                    continue
+
+                # ── Classify words by column position ────────────────────────
+                date_words   = [w for w in line_words
+                                if w[0] < _MTB_DATE_X0_MAX and _MTB_DATE_RE.match(w[4])]
+                credit_words = [w for w in line_words
+                                if _MTB_CREDIT_X1[0] <= w[2] <= _MTB_CREDIT_X1[1]
+                                and _MTB_AMT_RE.match(w[4])]
+                debit_words  = [w for w in line_words
+                                if _MTB_DEBIT_X1[0] <= w[2] <= _MTB_DEBIT_X1[1]
+                                and _MTB_AMT_RE.match(w[4])]
+                bal_words    = [w for w in line_words if w[2] >= _MTB_BAL_X1_MIN]
+
+                # Description = words after date column, before debit column,
+                # excluding classified amount/balance words and watermark fragments
+                classified = set(id(w) for w in date_words + credit_words + debit_words + bal_words)
+                desc_words  = [w for w in line_words
+                               if id(w) not in classified
+                               and w[0] > 68       # after date column right edge
+                               and w[0] < 430      # before debit column left edge
+                               and not _MTB_WATERMARK_RE.match(w[4])]
+                desc = ' '.join(w[4] for w in desc_words).strip()
+
+                if date_words:
+                    _flush()
+                    parsed_date = _det_parse_mtb_date(date_words[0][4])
+                    if not parsed_date:
+                        current_txn = None
+                        continue
+
+                    amount   = None
+                    txn_type = None
+                    if credit_words:
+                        try:
+                            amount   = round(float(credit_words[0][4].lstrip('$').replace(',', '')), 2)
+                            txn_type = 'credit'
+                        except ValueError:
+                            pass
+                    elif debit_words:
+                        try:
+                            amount   = round(float(debit_words[0][4].lstrip('$').replace(',', '')), 2)
+                            txn_type = 'debit'
+                        except ValueError:
+                            pass
+
+                    current_txn = {
+                        'date':        parsed_date,
+                        'description': desc,
+                        'amount':      amount,
+                        'type':        txn_type,
+                    }
+
+                elif current_txn is not None:
+                    # Continuation or amount-only line for the current transaction
+                    if current_txn.get('amount') is None:
+                        # Transaction is still waiting for its amount
+                        if credit_words:
+                            try:
+                                current_txn['amount'] = round(float(credit_words[0][4].lstrip('$').replace(',', '')), 2)
+                                current_txn['type']   = 'credit'
+                            except ValueError:
+                                pass
+                        elif debit_words:
+                            try:
+                                current_txn['amount'] = round(float(debit_words[0][4].lstrip('$').replace(',', '')), 2)
+                                current_txn['type']   = 'debit'
+                            except ValueError:
+                                pass
+                    # Append extra description text from this continuation line
+                    if desc:
+                        current_txn['description'] = (current_txn.get('description', '') + ' ' + desc).strip()
+
+        _flush()
+
+        return transactions, len(transactions) >= 2
+
+    except Exception as e:
+        print(f"Strategy 11 (M&T Bank) failed: {e}", file=sys.stderr)
+        return [], False
+
+
+# ─── Truist Business Checking ─────────────────────────────────────────────────
+
+_TRUIST_GUARD_RE = re.compile(
+    r'TRUIST\s+(?:DYNAMIC|SIMPLE)\s+BUSINESS|Truist\.com',
+    re.I,
+)
+# Transaction line: MM/DD  DESCRIPTION ... AMOUNT
+_TRUIST_TXN_RE = re.compile(
+    r'^(\d{1,2}/\d{1,2})\s+(.+)\s+([\d,]+\.\d{2})\s*$'
+)
+# Check table entries: MM/DD CHECK# AMOUNT (1–3 per row)
+_TRUIST_CHECK_RE = re.compile(
+    r'(\d{1,2}/\d{1,2})\s+(\d+)\s+([\d,]+\.\d{2})'
+)
+_TRUIST_SECTION_CHECK_RE  = re.compile(r'^\s*Checks\s*$', re.I)
+# pdfplumber compresses spaces → "Other withdrawals" → "Otherwithdrawals"
+_TRUIST_SECTION_DEBIT_RE  = re.compile(r'Other\s*withdrawals', re.I)
+_TRUIST_SECTION_CREDIT_RE = re.compile(r'Deposits[,\s].*credits', re.I)
+# Stop on Total… lines and the *indicates footnote that precedes "Total checks"
+_TRUIST_STOP_RE = re.compile(
+    r'^(?:Total\s*(?:checks|other|deposits)|\*indicates)',
+    re.I,
+)
+_TRUIST_SKIP_RE = re.compile(
+    r'^(?:DATE\s+(?:CHECK|DESCRIPTION)|Page\s*\d+\s*of|§\s*PAGE|'
+    r'continued$|\d{6,}$|Your\s+(?:previous|new)\s+balance|'
+    r'Total\s*checking|Account\s*summary|Summary\s+of|'
+    r'ACCOUNT\s*NAME|TRUIST\s+(?:DYNAMIC|SIMPLE))',
+    re.I,
+)
+
+
+def _det_parse_truist_date(date_str: str, year: int) -> Optional[str]:
+    """Parse MM/DD with statement year → YYYY-MM-DD."""
+    try:
+        return datetime.strptime(f'{date_str.strip()}/{year}', '%m/%d/%Y').strftime('%Y-%m-%d')
+    except ValueError:
+        return None
+
+
+def _extract_truist_business(doc: StatementDocument) -> Tuple[List[Dict], bool]:
+    """
+    Strategy 13: Truist Business Checking (Dynamic & Simple, consolidated).
+
+    Format:
+      Date:    MM/DD (no year — inferred from statement period on page 1)
+      Sections (pdfplumber collapses spaces):
+        'Checks'                                  → debit check table (3 cols per row)
+        'Otherwithdrawals,debitsandservicecharges' → debit section
+        'Deposits,creditsandinterest'              → credit section
+        'Totalchecks / Totalother / Totaldeposits' → stop
+      Checks:  3-column rows: MM/DD CHECK# AMOUNT  (asterisk lines between rows = skip)
+      Credits/Debits: MM/DD  DESCRIPTION  AMOUNT (amount always on first line)
+      Multi-account: all accounts on one statement are captured uniformly.
+
+    Guard: page 1 must contain 'TRUIST DYNAMIC|SIMPLE BUSINESS' or 'Truist.com'.
+    """
+    transactions: List[Dict] = []
+    try:
+        if not doc.page_count:
+            return [], False
+
+        first_text = doc.page_text(0)
+        if not _TRUIST_GUARD_RE.search(first_text):
+            return [], False
+
+        # Extract statement year from "as of MM/DD/YYYY" or "/YYYY"
+        year_m = re.search(r'(?:as\s+of|For)\s+\d{1,2}/\d{1,2}/(\d{4})', first_text, re.I)
+        if not year_m:
+            year_m = re.search(r'/(\d{4})\b', first_text)
+        stmt_year = int(year_m.group(1)) if year_m else datetime.now().year
+
+        section_type: Optional[str] = None   # 'credit' | 'debit' | 'check' | None
+        pending: Optional[Dict] = None
+
+        def _flush() -> None:
+            nonlocal pending
+            if pending and pending.get('amount') is not None:
+                transactions.append(dict(pending))
+            pending = None
+
+        for page_num in range(doc.page_count):
+            text = doc.page_text(page_num)
+            for raw_line in text.split('\n'):
+                line = raw_line.strip()
+                # Skip blank lines and lone asterisks (check-table sequence markers)
+                if not line or line == '*':
+                    continue
+
+                # ── Section stops ────────────────────────────────────────
+                if _TRUIST_STOP_RE.match(line):
+                    _flush()
+                    section_type = None
+                    continue
+
+                # ── Section transitions ──────────────────────────────────
+                if _TRUIST_SECTION_CHECK_RE.match(line):
+                    _flush()
+                    section_type = 'check'
+                    continue
+                if _TRUIST_SECTION_DEBIT_RE.search(line):
+                    _flush()
+                    section_type = 'debit'
+                    continue
+                if _TRUIST_SECTION_CREDIT_RE.search(line):
+                    _flush()
+                    section_type = 'credit'
+                    continue
+
+                if section_type is None:
+                    continue
+
+                # Skip header/footer/boilerplate
+                if _TRUIST_SKIP_RE.match(line):
+                    continue
+
+                # ── Check section (3-column table) ───────────────────────
+                if section_type == 'check':
+                    for date_str, check_num, amount_str in _TRUIST_CHECK_RE.findall(line):
+                        parsed_date = _det_parse_truist_date(date_str, stmt_year)
+                        if parsed_date:
+                            try:
+                                transactions.append({
+                                    'date':        parsed_date,
+                                    'description': f'Check #{check_num}',
+                                    'amount':      round(float(amount_str.replace(',', '')), 2),
+                                    'type':        'debit',
+                                })
+                            except ValueError:
+                                pass
+                    continue
+
+                # ── Credit / Debit section ───────────────────────────────
+                m = _TRUIST_TXN_RE.match(line)
+                if m:
+                    _flush()
+                    parsed_date = _det_parse_truist_date(m.group(1), stmt_year)
+                    if not parsed_date:
+                        continue
+                    try:
+                        amount = round(float(m.group(3).replace(',', '')), 2)
+                    except ValueError:
+                        continue
+                    pending = {
+                        'date':        parsed_date,
+                        'description': m.group(2).strip(),
+                        'amount':      amount,
+                        'type':        section_type,
+                    }
+                # Continuation lines (payment IDs, ACH details) silently ignored
+
+        _flush()
+
+        return transactions, len(transactions) >= 2
+
+    except Exception as e:
+        print(f"Strategy 13 (Truist Business) failed: {e}", file=sys.stderr)
+        return [], False
+
+
+# ─── Bank of America Business Advantage ───────────────────────────────────────
+
+_BOFA_GUARD_RE = re.compile(
+    r'bankofamerica\.com',
+    re.I,
+)
+# Full transaction line: MM/DD/YY  DESCRIPTION  [-]AMOUNT
+# Greedy description group backtracks to find the last decimal amount on the line.
+_BOFA_TXN_RE = re.compile(
+    r'^(\d{2}/\d{2}/\d{2})\s+(.+)\s+(-?[\d,]+\.\d{2})\s*$'
+)
+# Check-section two-column rows: DATE CHECK# -AMOUNT (one or two pairs per line)
+_BOFA_CHECK_ROW_RE = re.compile(
+    r'(\d{2}/\d{2}/\d{2})\s+(\d+)\s+(-[\d,]+\.\d{2})'
+)
+_BOFA_SECTION_CREDIT_RE = re.compile(
+    r'^\s*Deposits\s+and\s+other\s+credits\b', re.I
+)
+_BOFA_SECTION_DEBIT_RE = re.compile(
+    r'^\s*Withdrawals\s+and\s+other\s+debits\b', re.I
+)
+_BOFA_SECTION_CHECK_RE = re.compile(r'^\s*Checks\s*$', re.I)
+_BOFA_SECTION_STOP_RE  = re.compile(
+    r'^\s*(Service\s+fees|Daily\s+ledger|Check\s+images)', re.I
+)
+# Lines that are never transactions (headers, totals, page labels, promo text)
+_BOFA_SKIP_RE = re.compile(
+    r'^(Date\s+|Total\s+|Page\s+\d|continued\s+on|Your\s+checking|'
+    r'IMPORTANT\s+INFORMATION|BUSINESS\s+ADVANTAGE|As\s+of\s+\d)',
+    re.I,
+)
+
+
+def _det_parse_bofa_date(date_str: str) -> Optional[str]:
+    """Parse MM/DD/YY (2-digit year) → YYYY-MM-DD."""
+    try:
+        return datetime.strptime(date_str.strip(), '%m/%d/%y').strftime('%Y-%m-%d')
+    except ValueError:
+        return None
+
+
+def _extract_bofa_business(doc: StatementDocument) -> Tuple[List[Dict], bool]:
+    """
+    Strategy 12: Bank of America Business Advantage checking.
+
+    Format:
+      Date:    MM/DD/YY (2-digit year)
+      Credits: positive amounts in "Deposits and other credits" section
+      Debits:  negative amounts (leading -) in "Withdrawals and other debits" section
+      Checks:  two-column table (DATE CHECK# -AMOUNT pairs per row) in "Checks" section
+      Stop:    "Service fees", "Daily ledger balances", "Check images"
+
+    Multi-line ACH descriptions are intentionally not appended — the first line
+    already contains a clean description and continuation lines may include
+    promotional text injected mid-section by BoA.
+
+    Guard: page 1 must contain 'bankofamerica.com'.
+    """
+    transactions: List[Dict] = []
+    try:
+        if not doc.page_count:
+            return [], False
+
+        first_text = doc.page_text(0)
+        if not _BOFA_GUARD_RE.search(first_text):
+            return [], False
+
+        section_type: Optional[str] = None   # 'credit' | 'debit' | 'check' | None
+        pending: Optional[Dict] = None
+
+        def _flush() -> None:
+            nonlocal pending
+            if pending and pending.get('amount') is not None:
+                transactions.append(dict(pending))
+            pending = None
+
+        for page_num in range(doc.page_count):
+            text = doc.page_text(page_num)
+            for raw_line in text.split('\n'):
+                line = raw_line.strip()
+                if not line:
+                    continue
+
+                # ── Section transitions ──────────────────────────────────
+                if _BOFA_SECTION_STOP_RE.match(line):
+                    _flush()
+                    section_type = None
+                    continue
+                if _BOFA_SECTION_CREDIT_RE.match(line):
+                    _flush()
+                    section_type = 'credit'
+                    continue
+                if _BOFA_SECTION_DEBIT_RE.match(line):
+                    _flush()
+                    section_type = 'debit'
+                    continue
+                if _BOFA_SECTION_CHECK_RE.match(line):
+                    _flush()
+                    section_type = 'check'
+                    continue
+
+                if section_type is None:
+                    continue
+
+                # Skip non-transaction lines (headers, totals, page numbers)
+                if _BOFA_SKIP_RE.match(line):
+                    continue
+
+                # ── Check section: two-column DATE CHECK# AMOUNT rows ────
+                if section_type == 'check':
+                    for date_str, check_num, amount_str in _BOFA_CHECK_ROW_RE.findall(line):
+                        parsed_date = _det_parse_bofa_date(date_str)
+                        if parsed_date:
+                            try:
+                                transactions.append({
+                                    'date':        parsed_date,
+                                    'description': f'Check #{check_num}',
+                                    'amount':      round(abs(float(amount_str.replace(',', ''))), 2),
+                                    'type':        'debit',
+                                })
+                            except ValueError:
+                                pass
+                    continue
+
+                # ── Credit / Debit sections ──────────────────────────────
+                m = _BOFA_TXN_RE.match(line)
+                if m:
+                    _flush()
+                    parsed_date = _det_parse_bofa_date(m.group(1))
+                    if not parsed_date:
+                        continue
+                    try:
+                        raw_amount = float(m.group(3).replace(',', ''))
+                    except ValueError:
+                        continue
+                    pending = {
+                        'date':        parsed_date,
+                        'description': m.group(2).strip(),
+                        'amount':      round(abs(raw_amount), 2),
+                        'type':        section_type,
+                    }
+                # Continuation lines (ACH detail, promo text) are silently
+                # ignored — the first line already has a clean description.
+
+        _flush()
+
+        return transactions, len(transactions) >= 2
+
+    except Exception as e:
+        print(f"Strategy 12 (BofA Business) failed: {e}", file=sys.stderr)
+        return [], False
+
+
+# ── Firstrust Bank ──────────────────────────────────────────────────────────
+_FIRSTRUST_GUARD_RE = re.compile(r'Transaction\s+Detail', re.I)
+_FIRSTRUST_GUARD2_RE = re.compile(
+    r'Date\s+Description\s+Deposits\s+Withdrawals\s+Balance', re.I
+)
+_FIRSTRUST_TXN_RE = re.compile(
+    r'^(\d{2}/\d{2})\s+(.+?)\s+\$([\d,]+\.\d{2})(-?)\s+\$([\d,]+\.\d{2})\s*$'
+)
+_FIRSTRUST_YEAR_RE = re.compile(
+    r'Statement\s+Period:\s*\d{2}/\d{2}/(\d{4})', re.I
+)
+# 24-char uppercase barcode prefix OR spaced letter barcode (A XX XX ... K pattern)
+_FIRSTRUST_BARCODE_RE = re.compile(
+    r'^(?:[A-Z]{10,}|A(?:\s[A-Z]{2})+\s+K)\s+'
+)
+_FIRSTRUST_SKIP_RE = re.compile(
+    r'^(?:Date\s+Description|Transaction\s+Detail|Statement\s+'
+    r'|Page\s+\d|Beginning\s+Balance|Account\s+Type|Account\s+Number'
+    r'|Balance\s+Summary|Account\s+Summary|\+\s+Deposits|[-]\s+Withdrawals'
+    r'|Ending\s+Balance|Service\s+Charges|Interest\s+for|Interest\s+Paid'
+    r'|Interest\s+Rate|Annual\s+Percentage|Summary\s+of\s+Accounts'
+    r'|RELATIONSHIP\s+BUSINESS)',
+    re.I,
+)
+# Lines that begin with a date but are NOT real transactions (e.g. "10/31 Ending Balance")
+_FIRSTRUST_DATE_SKIP_RE = re.compile(
+    r'^\d{2}/\d{2}\s+(?:Beginning|Ending)\s+Balance', re.I
+)
+# Section headers that mark the end of the transaction listing
+_FIRSTRUST_STOP_RE = re.compile(
+    r'^(?:Checks\s+Posted|CHECK\s+IMAGES|Overdraft[/\s])', re.I
+)
+
+
+def _extract_firstrust(doc: StatementDocument) -> Tuple[List[Dict], bool]:
+    """
+    Strategy 13: Firstrust Bank business checking.
+
+    Format:
+      Date:        MM/DD (year pulled from "Statement Period: MM/DD/YYYY" header)
+      Withdrawals: $xxx.xx-  (trailing dash in Withdrawals column)
+      Deposits:    $xxx.xx   (no dash in Deposits column)
+      Balance:     $xxx.xx   (rightmost column)
+      Multi-line:  continuation lines follow without a date prefix
+      Barcodes:    some lines have a 24-char uppercase block before the transaction
+
+    Guard: first content page must contain "Transaction Detail" AND
+           "Date Description Deposits Withdrawals Balance" AND
+           at least one $xxx.xx- withdrawal.
+    """
+    transactions: List[Dict] = []
+    try:
+        if not doc.page_count:
+            return [], False
+
+        # Collect first content page text for guard checks
+        first_text = ''
+        for page_num in range(min(3, doc.page_count)):
+            t = doc.page_text(page_num)
+            if t.strip():
+                first_text += t
+                break
+
+        if not _FIRSTRUST_GUARD_RE.search(first_text):
+            return [], False
+        if not _FIRSTRUST_GUARD2_RE.search(first_text):
+            return [], False
+        if not re.search(r'\$[\d,]+\.\d{2}-', first_text):
+            return [], False
+
+        # Extract statement year from header
+        year_m = _FIRSTRUST_YEAR_RE.search(first_text)
+        stmt_year = int(year_m.group(1)) if year_m else datetime.now().year
+
+        pending: Optional[Dict] = None
+
+        def _flush() -> None:
+            nonlocal pending
+            if pending and pending.get('amount') is not None:
+                transactions.append(dict(pending))
+            pending = None
+
+        for page_num in range(doc.page_count):
+            text = doc.page_text(page_num)
+            for raw_line in text.split('\n'):
+                line = raw_line.strip()
+                if not line:
+                    continue
+
+                # Strip barcode prefix
+                line = _FIRSTRUST_BARCODE_RE.sub('', line).strip()
+                if not line:
+                    continue
+
+                # Skip page footer numbers e.g. "00005531 0016163 0001-0007 ..."
+                if re.match(r'^\d{5,}\s+\d{7}', line):
+                    continue
+
+                # Stop processing at check images / overdraft summary section
+                if _FIRSTRUST_STOP_RE.match(line):
+                    _flush()
+                    break
+
+                # Skip header/summary/footer lines
+                if _FIRSTRUST_SKIP_RE.match(line):
+                    _flush()
+                    continue
+
+                # Skip date-prefixed non-transaction lines (Beginning/Ending Balance)
+                if _FIRSTRUST_DATE_SKIP_RE.match(line):
+                    continue
+
+                # Try matching a transaction line: MM/DD DESC $AMOUNT[-] $BALANCE
+                m = _FIRSTRUST_TXN_RE.match(line)
+                if m:
+                    _flush()
+                    month_day, desc, amount_str, minus, _balance = m.groups()
+                    # Skip the "Beginning Balance" pseudo-row
+                    if 'beginning balance' in desc.lower():
+                        continue
+                    try:
+                        parsed_date = datetime.strptime(
+                            f'{month_day}/{stmt_year}', '%m/%d/%Y'
+                        ).strftime('%Y-%m-%d')
+                        amount = round(float(amount_str.replace(',', '')), 2)
+                    except ValueError:
+                        continue
+                    pending = {
+                        'date':        parsed_date,
+                        'description': desc.strip(),
+                        'amount':      amount,
+                        'type':        'debit' if minus == '-' else 'credit',
+                    }
+                elif pending is not None:
+                    # Continuation line — append to description if it looks useful
+                    if not re.match(r'^[\d\s.]+$', line) and len(line) > 2:
+                        pending['description'] += ' ' + line
+
+        _flush()
+
+        return transactions, len(transactions) >= 2
+
+    except Exception as e:
+        print(f'Strategy 13 (Firstrust Bank) failed: {e}', file=sys.stderr)
+        return [], False
+
+
+# ── Citizens Bank ──────────────────────────────────────────────────────────────
+def _extract_citizens_bank(doc: StatementDocument) -> Tuple[List[Dict], bool]:
+    """
+    Strategy 14: Citizens Bank Analysis Business Checking.
+
+    Guard: 'citizensbank.com' must appear in the document.
+
+    Three transaction sections (in order):
+      Checks           – debit; "CheckNum Amount MM/DD" pairs, up to 2 per line
+      Debits**         – debit; "MM/DD Amount Description" with multi-line descs
+        ATM/Purchases  – sub-section label (still debits, just skip)
+        OtherDebits    – sub-section label (still debits, just skip)
+      Deposits&Credits – credit; "MM/DD Amount Description" with multi-line descs
+      DailyBalance     – balance table; stop parsing here
+    """
+
+    GUARD         = 'citizensbank.com'
+    TXN_RE        = re.compile(r'^\s*(\d{2}/\d{2})\s+([\d,]*\.\d{2})\s+(.*)')   # [\d,]* allows .02
+    CHECK_RE      = re.compile(r'(\d+)\s+([\d,]+\.\d{2})\s+(\d{2}/\d{2})')
+    SUMMARY_AMT   = re.compile(r'^[\+\-=]\s*[\d,]*\.\d{2}')   # +/- total lines
+
+    SKIP_RE = re.compile(
+        r'^('
+        r'Date\s+Amount\s+Description'
+        r'|Check#\s+Amount\s+Date'
+        r'|ATM/Purchases'
+        r'|OtherDebits'
+        r'|\*{2}May\s*include'
+        r'|PleaseSee'
+        r'|Page\s+\d+\s+of'
+        r'|Analysis\s+Business\s+Checking\s+for'
+        r'|Images\s*for\s*Account'
+        r'|Total(?:Checks|Debits|Deposits|Credits)'
+        r'|PreviousBalance|CurrentBalance|BalanceCalculation'
+        r'|YournextstatementperiodwillendOn'
+        r'|Yournextstatementperiodwillend'
+        r')',
+        re.IGNORECASE,
+    )
+
+    try:
+        full_text = '\n'.join(doc.page_texts())
+
+        if GUARD not in full_text:
+            return [], False
+
+        # Extract statement year from header
+        yr_m = re.search(r'(?:Beginning|through)\s+\w+\s+\d+,\s+(\d{4})', full_text)
+        year = yr_m.group(1) if yr_m else str(datetime.today().year)
+
+        def parse_date(mmdd: str) -> str:
+            try:
+                return datetime.strptime(f"{mmdd}/{year}", "%m/%d/%Y").strftime("%Y-%m-%d")
+            except Exception:
+                return f"{year}-{mmdd[:2]}-{mmdd[3:]}"
+
+        transactions: List[Dict] = []
+        section = None   # 'checks' | 'debits' | 'credits' | None
+        pending = None
+
+        def flush():
+            nonlocal pending
+            if pending:
+                transactions.append(pending)
+                pending = None
+
+        for line in full_text.splitlines():
+            s = line.strip()
+
+            # ── Section transitions ───────────────────────────────────────────
+            if s.startswith('DailyBalance') or re.match(r'Daily\s+Balance', s):
+                flush()
+                break
+
+            if s.startswith('Deposits') and ('&Credit' in s or 'Continued' in s):
+                flush()
+                section = 'credits'
+                continue
+
+            if s.startswith('Debits'):
+                flush()
+                section = 'debits'
+                continue
+
+            if s.startswith('Checks') and not TXN_RE.match(line):
+                flush()
+                section = 'checks'
+                continue
+
+            if section is None:
+                continue
+
+            # ── Skip noise ────────────────────────────────────────────────────
+            if not s or SUMMARY_AMT.match(s) or SKIP_RE.match(s):
+                continue
+
+            # ── Parse transactions ────────────────────────────────────────────
+            if section == 'checks':
+                for check_num, amt_str, date_str in CHECK_RE.findall(s):
+                    transactions.append({
+                        'date':        parse_date(date_str),
+                        'description': f'Check #{check_num}',
+                        'amount':      float(amt_str.replace(',', '')),
+                        'type':        'debit',
+                    })
+                continue
+
+            txn_type = 'debit' if section == 'debits' else 'credit'
+            m = TXN_RE.match(line)
+            if m:
+                flush()
+                pending = {
+                    'date':        parse_date(m.group(1)),
+                    'description': m.group(3).strip(),
+                    'amount':      float(m.group(2).replace(',', '')),
+                    'type':        txn_type,
+                }
+            elif pending and s:
+                # Continuation of previous transaction's description
+                pending['description'] += ' ' + s
+
+        flush()
+        return transactions, len(transactions) >= 2
+
+    except Exception as e:
+        print(f'Strategy 14 (Citizens Bank) failed: {e}', file=sys.stderr)
+        return [], False
+
+
+# ─── Guard router ─────────────────────────────────────────────────────────────
+#
+# Every bank guard is evaluated once over a short probe of the statement, so only
+# the parser(s) whose guard fires are run. Each guard is searched on its own: in
+# one alternation, a guard whose match overlaps another's would never fire. Each
+# strategy keeps its own guard check; the router is only a pre-filter and may
+# over-match, never under-match. Guards in _ROUTER_DOCUMENT_GUARDS are searched
+# over every page, as their strategy's own check is (the Citizens Bank footer can
+# land on any page); page texts are memoized, so this costs nothing the later
+# strategies would not pay anyway.
+
+_ROUTER_GUARD_PATTERNS: List[Tuple[str, str]] = [
+    ('cnbank',           _CNBANK_GUARD_RE.pattern),
+    ('bokf',             _BOKF_GUARD_RE.pattern),
+    ('mfcu',             _MFCU_GUARD_RE.pattern),
+    ('mtb',              _MTB_GUARD_RE.pattern),
+    # Huntington/FLFCU guards compare whitespace-stripped text (see _router_probe)
+    ('huntington',       r'HUNTINGTON(?:NATIONALBANK|UNLIMITED|BUSINESS)'),
+    ('usbank',           r'u\.s\. bank|usbank\.com'),
+    ('flfcu_member',     r'memberaccountstatement'),
+    ('flfcu_name',       r'flfcu|firstlightfcu'),
+    ('truist',           _TRUIST_GUARD_RE.pattern),
+    ('bofa',             _BOFA_GUARD_RE.pattern),
+    ('firstrust_detail', _FIRSTRUST_GUARD_RE.pattern),
+    ('firstrust_header', _FIRSTRUST_GUARD2_RE.pattern),
+    ('citizens',         r'citizensbank\.com'),
+]
+_ROUTER_GUARD_RES = [(name, re.compile(pattern, re.I)) for name, pattern in _ROUTER_GUARD_PATTERNS]
+_ROUTER_DOCUMENT_GUARDS = {'citizens'}
+
+# Bank-specific strategies in cascade order with the guard groups that must all fire
+_BANK_STRATEGIES = [
+    (_extract_cnbank,           "CNBank",          ('cnbank',)),
+    (_extract_bokf,             "BOKF",            ('bokf',)),
+    (_extract_michiganfirst,    "MichiganFirst",   ('mfcu',)),
+    (_extract_mtbank,           "M&T Bank",        ('mtb',)),
+    (_extract_huntington,       "Huntington",      ('huntington',)),
+    (_extract_usbank,           "U.S. Bank",       ('usbank',)),
+    (_extract_flfcu,            "FirstLight FCU",  ('flfcu_member', 'flfcu_name')),
+    (_extract_truist_business,  "Truist Business", ('truist',)),
+    (_extract_bofa_business,    "BofA Business",   ('bofa',)),
+    (_extract_firstrust,        "Firstrust",       ('firstrust_detail', 'firstrust_header')),
+    (_extract_citizens_bank,    "Citizens Bank",   ('citizens',)),
+]
+
+# Generic strategies (no guard) tried in order when no bank parser succeeds
+_GENERIC_STRATEGIES = [
+    (_extract_by_section_markers,  "section markers"),
+    (_extract_by_section_headers,  "section headers"),
+    (_extract_by_column_position,  "column position"),
+    (_extract_by_table_structure,  "table structure"),
+]
+
+
+def _router_probe(doc: StatementDocument) -> str:
+    """
+    Build the text the bank guards are evaluated against: page 1 and the first
+    non-empty page (pdfplumber), page 1 as PyMuPDF sees it (M&T), and a
+    whitespace-stripped copy for the guards that compare squished text.
+    """
+    parts: List[str] = []
+    for page_num in range(min(3, doc.page_count)):
+        text = doc.page_text(page_num)
+        if page_num == 0 or text.strip():
+            parts.append(text)
+        if text.strip():
+            break
+    if doc.fitz_page_count:
+        parts.append(doc.fitz_page_text(0))
+    probe = '\n'.join(parts)
+    return probe + '\n' + re.sub(r'[ \t]+', '', probe)
+
+
+def route_bank_strategies(doc: StatementDocument) -> List[Tuple]:
+    """Return the (strategy_fn, label) pairs whose bank guards fire, in cascade order."""
+    probe = _router_probe(doc)
+    document = None
+    fired = set()
+    for name, guard_re in _ROUTER_GUARD_RES:
+        if name in _ROUTER_DOCUMENT_GUARDS:
+            if document is None:
+                document = '\n'.join(doc.page_texts())
+            text = document
+        else:
+            text = probe
+        if guard_re.search(text):
+            fired.add(name)
+    return [
+        (strategy_fn, label)
+        for strategy_fn, label, groups in _BANK_STRATEGIES
+        if all(g in fired for g in groups)
+    ]
+
+
+# ─── Orchestrator ─────────────────────────────────────────────────────────────
+
+def extract_transactions_deterministic(doc: StatementDocument,
+                                       partials: Optional[Dict[str, List[Dict]]] = None
+                                       ) -> Tuple[List[Dict], bool, Optional[str]]:
+    """
+    Extract transactions deterministically using cascading strategies:
+      Bank-specific (guarded, routed by route_bank_strategies so only parsers
+      whose guard fires on the first page are run):
+      1. CNBank / Community Bank NA      (MM/DD/YYYY, single chronological list)
+      2. BOKF / Bank of Texas            (MM-DD date format, DEPOSITS/WITHDRAWALS sections)
+      3. Michigan First Credit Union     (Mon DD date, signed amount + balance columns)
+      4. M&T Bank                        (MM/DD/YYYY, fitz coordinate-based, 3-column)
+      5. Huntington National Bank        (Deposits/Checks two-col + Other Credits/Debits)
+      6. U.S. Bank format               (Other Deposits / Card Withdrawals sections)
+      7. FirstLight FCU                  (MemberAccountStatement / FLFCU format)
+      8. Truist / BofA / Firstrust / Citizens Bank
+      Generic (no guard, try in order when no bank parser succeeds):
+      9.  *start*/*end* section markers  (Chase / JPMorgan)
+     10. Section header keywords         (generic section-based banks)
+     11. Column-position based           (Wells Fargo and similar)
+     12. PDF table structure             (rarely succeeds, original fallback)
+
+    Returns (transactions_list, success_flag, strategy_label). When a partials dict
+    is given, transactions from strategies that ran but did not succeed are
+    recorded in it by label (used by hybrid mode).
+    """
+    routed = route_bank_strategies(doc)
+    if routed:
+        print(f"Bank guard matched: {', '.join(label for _, label in routed)}", file=sys.stderr)
+
+    for strategy_fn, label in routed + _GENERIC_STRATEGIES:
+        txns, ok = strategy_fn(doc)
+        if ok:
+            print(f"✓ Deterministic extraction successful ({label}): {len(txns)} transactions", file=sys.stderr)
+            return txns, True, label
+        if partials is not None and txns:
+            partials[label] = txns
+
+    return [], False, None
+
+
+def _extract_statement_summary(pdf_text: str) -> Dict:
+    """
+    Parse beginning balance, ending balance, and (if stated) average daily balance
+    directly from the raw PDF text using labeled-line patterns.
+
+    Handles both positive amounts and parenthesized negatives, e.g.:
+        Beginning Balance   3,587.23
+        Ending Balance      2,472.00
+        Average Daily Bal   (1,234.56)   ← negative, shown in parens
+    """
+    result: Dict[str, float] = {}
+
+    # Label → field mapping (checked in order; first match per field wins)
+    label_patterns = [
+        (re.compile(r'(?:beginning|previous|prior|opening)\s+balance', re.I), 'beginning_balance'),
+        (re.compile(r'(?:ending|closing|new)\s+balance', re.I), 'ending_balance'),
+        (re.compile(r'average\s+(?:daily\s+)?balance', re.I), 'average_daily_balance'),
+    ]
+
+    # Amount: optional sign/paren, optional $, digits/commas, decimal places
+    amount_re = re.compile(r'(-?\$?|\$?-?)(\()?\s*([\d,]+\.\d{2})\s*(\))?')
+
+    for line in pdf_text.split('\n'):
+        line = line.strip()
+        for label_re, field in label_patterns:
+            if field in result:
+                continue  # already found this field
+            lm = label_re.search(line)
+            if not lm:
+                continue
+            # Search for an amount *after* the label text
+            am = amount_re.search(line, lm.end())
+            if not am:
+                continue
+            sign_prefix, open_paren, amount_str, close_paren = am.groups()
+            try:
+                amount = float(amount_str.replace(',', ''))
+                if '-' in (sign_prefix or '') or (open_paren == '(' and close_paren == ')'):
+                    amount = -amount
+                result[field] = amount
+            except ValueError:
+                pass
+
+    # ── CNBank / Community Bank NA summary row ───────────────────────────────
+    # The account summary line has the form:
+    #   ****0558  $212,364.95  $2,075,861.24  $0.00  $2,185,818.64  $2.50  $102,405.05
+    # Column order: acct#  beginning  deposits  interest  withdrawals  fees  ending
+    # We extract the first dollar amount as beginning balance (if not already found)
+    # and the last dollar amount as ending balance (if not already found).
+    if 'beginning_balance' not in result or 'ending_balance' not in result:
+        _cnbank_row_re = re.compile(r'^\*{4}\d+\s+', re.I)
+        _dollar_re = re.compile(r'\$([\d,]+\.\d{2})')
+        for line in pdf_text.split('\n'):
+            line = line.strip()
+            if not _cnbank_row_re.match(line):
+                continue
+            amounts = [float(m.replace(',', '')) for m in _dollar_re.findall(line)]
+            if len(amounts) >= 2:
+                if 'beginning_balance' not in result:
+                    result['beginning_balance'] = amounts[0]
+                if 'ending_balance' not in result:
+                    result['ending_balance'] = amounts[-1]
+                break
+
+    return result
+
+
+def _compute_adb_from_transactions(transactions: List[Dict], beginning_balance: float) -> Optional[float]:
+    """
+    Reconstruct end-of-day balances for every calendar day in the statement period,
+    then return the simple average (average daily balance).
+
+    Starts from beginning_balance, applies credits (+) and debits (-) in date order.
+    Carries the previous day's balance forward on days with no transactions.
+    """
+    if not transactions:
+        return None
+
+    by_date: Dict[str, List[Dict]] = defaultdict(list)
+    for t in transactions:
+        d = t.get('date')
+        if d:
+            by_date[d].append(t)
+
+    if not by_date:
+        return None
+
+    dates = sorted(by_date.keys())
+    try:
+        start = datetime.strptime(dates[0], '%Y-%m-%d')
+        end = datetime.strptime(dates[-1], '%Y-%m-%d')
+    except ValueError:
+        return None
+
+    daily_balances: List[float] = []
+    balance = beginning_balance
+    current = start
+
+    while current <= end:
+        date_str = current.strftime('%Y-%m-%d')
+        for t in by_date.get(date_str, []):
+            if t.get('type') == 'credit':
+                balance += float(t.get('amount', 0))
+            elif t.get('type') == 'debit':
+                balance -= float(t.get('amount', 0))
+        daily_balances.append(balance)
+        current += timedelta(days=1)
+
+    if not daily_balances:
+        return None
+
+    return round(sum(daily_balances) / len(daily_balances), 2)
+
+
+def validate_statement_summary(statement_summary: Dict, transactions: List[Dict], debug_log: str) -> Dict:
+    """
+    Validate the statement_summary balances to catch extraction errors.
+
+    Common issues:
+    1. Beginning balance extracted with wrong sign
+    2. Ending balance doesn't match last transaction's ending_balance
+
+    Returns corrected statement_summary or original if validation passes.
+    """
+    if not statement_summary:
+        return statement_summary
+
+    beginning_balance = statement_summary.get("beginning_balance")
+    ending_balance = statement_summary.get("ending_balance")
+
+    # Skip validation if we don't have balances to validate
+    if beginning_balance is None:
+        return statement_summary
+
+    # Validation 1: Check if ending balance matches last transaction's ending_balance
+    if ending_balance is not None and transactions:
+        # Find last transaction with ending_balance
+        last_txn_balance = None
+        for txn in reversed(transactions):
+            if "ending_balance" in txn and txn["ending_balance"] is not None:
+                last_txn_balance = txn["ending_balance"]
+                break
+
+        if last_txn_balance is not None:
+            # If signs don't match, there might be an error
+            if (ending_balance < 0) != (last_txn_balance < 0):
+                with open(debug_log, 'a') as f:
+                    f.write("\n⚠️  WARNING: Ending balance sign mismatch!\n")
+                    f.write(f"  Statement summary ending: ${ending_balance:.2f}\n")
+                    f.write(f"  Last transaction ending: ${last_txn_balance:.2f}\n")
+
+    # Validation 2: Calculate expected ending balance from beginning + credits - debits
+    credits_total = sum(t["amount"] for t in transactions if t.get("type") == "credit")
+    debits_total = sum(t["amount"] for t in transactions if t.get("type") == "debit")
+    calculated_ending = beginning_balance + credits_total - debits_total
+
+    with open(debug_log, 'a') as f:
+        f.write("\n=== STATEMENT SUMMARY VALIDATION ===\n")
+        f.write(f"Beginning Balance: ${beginning_balance:.2f}\n")
+        f.write(f"Total Credits: ${credits_total:.2f}\n")
+        f.write(f"Total Debits: ${debits_total:.2f}\n")
+        f.write(f"Calculated Ending: ${calculated_ending:.2f}\n")
+        if ending_balance is not None:
+            f.write(f"Stated Ending: ${ending_balance:.2f}\n")
+            difference = abs(calculated_ending - ending_balance)
+            f.write(f"Difference: ${difference:.2f}\n")
+
+            # If difference is significant and beginning balance sign is suspect, flag it
+            if difference > 100 and beginning_balance < 0:
+                f.write("\n⚠️  WARNING: Large discrepancy detected!\n")
+                f.write("   Beginning balance may have wrong sign (negative when should be positive)\n")
+                f.write(f"   Try flipping sign: ${-beginning_balance:.2f}\n")
+
+                # Recalculate with flipped sign
+                flipped_ending = -beginning_balance + credits_total - debits_total
+                flipped_difference = abs(flipped_ending - ending_balance) if ending_balance else None
+
+                if flipped_difference and flipped_difference < difference:
+                    f.write(f"   ✓ Flipped calculation is closer: ${flipped_ending:.2f}\n")
+                    f.write(f"   ✓ New difference: ${flipped_difference:.2f}\n")
+                    f.write("   → AUTO-CORRECTING beginning_balance sign\n")
+                    statement_summary["beginning_balance"] = -beginning_balance
+
+    return statement_summary
+
+
+# Optional cross-process limit on in-flight Claude requests. Batch mode installs a
+# multiprocessing semaphore here in every pool worker so one limit covers the batch.
+_AI_CONCURRENCY_LIMIT = None
+
+# Optional replacement for request_chunks(client, model, system, contents, output_format).
+# Message Batches mode installs one per statement to collect results from a batch job.
+_AI_REQUESTER = None
+
+
+@contextmanager
+def _ai_request_slot():
+    """Hold one slot of the shared AI concurrency limit (no-op when none is set)."""
+    if _AI_CONCURRENCY_LIMIT is None:
+        yield
+        return
+    _AI_CONCURRENCY_LIMIT.acquire()
+    try:
+        yield
+    finally:
+        _AI_CONCURRENCY_LIMIT.release()
+
+
+# ─── Shared Claude rate limiter and circuit breaker ──────────────────────────
+#
+# Every extractor process on the host (PHP queue workers, the socket server, batch
+# workers) shares one small JSON state file under an exclusive flock:
+#   next_at     earliest time the next request may start (honours retry-after)
+#   interval    pacing between request starts; doubled on each overload and
+#               eased by a fifth on each success
+#   failures    consecutive overload / rate-limit / 5xx responses
+#   open_until  circuit breaker: while in the future, requests fail fast
+# so that workers back off together instead of retrying in lockstep.
+
+_LIMITER_STEP = 0.25        # seconds: first pacing interval; below this pacing switches off
+_LIMITER_MAX_INTERVAL = 30.0
+_LIMITER_MAX_BACKOFF = 60.0
+_LOCAL_LIMITER_STATE: Dict = {}
+_LOCAL_LIMITER_LOCK = threading.Lock()
+_CLAUDE_ERROR_LABELS = {
+    "overloaded": "API Overloaded",
+    "rate_limited": "Rate limited",
+    "server_error": "API Error",
+    "connection": "Connection error",
+}
+
+
+class ClaudeUnavailableError(Exception):
+    """Claude has been overloaded for every worker on this host; the circuit is open."""
+
+
+def limiter_enabled() -> bool:
+    return os.environ.get("BANK_EXTRACTOR_LIMITER", "1") != "0"
+
+
+def _limiter_setting(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+@contextmanager
+def _claude_limiter_state():
+    """Locked read-modify-write of the shared limiter state (process-local if the file is unusable)."""
+    path = os.environ.get("BANK_EXTRACTOR_LIMITER_FILE") or os.path.join(
+        tempfile.gettempdir(), "bank_extractor_claude_limiter.json")
+    try:
+        f = os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT, 0o666), "r+")
+    except OSError as e:
+        if not _LOCAL_LIMITER_STATE.get("warned"):
+            print(f"⚠️  Shared rate limiter unavailable ({e}), pacing this process only", file=sys.stderr)
+            _LOCAL_LIMITER_STATE["warned"] = True
+        with _LOCAL_LIMITER_LOCK:
+            yield _LOCAL_LIMITER_STATE
+        return
+
+    with f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            try:
+                state = json.loads(f.read() or "{}")
+            except ValueError:
+                state = {}
+            before = dict(state)
+            yield state
+            if state != before:
+                f.seek(0)
+                f.truncate()
+                json.dump(state, f)
+                f.flush()
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def claude_limiter_acquire() -> None:
+    """
+    Wait for this request's start slot. Raises ClaudeUnavailableError while the
+    circuit is open.
+    """
+    if not limiter_enabled():
+        return
+    with _claude_limiter_state() as state:
+        now = time.time()
+        open_until = state.get("open_until", 0)
+        if open_until > now:
+            raise ClaudeUnavailableError(
+                f"Claude API overloaded; circuit open for another {open_until - now:.0f}s")
+        slot = max(now, state.get("next_at", 0))
+        state["next_at"] = slot + state.get("interval", 0)
+    if slot > now:
+        time.sleep(slot - now)
+
+
+def claude_limiter_success() -> None:
+    """A request went through: close the circuit and ease the pacing."""
+    if not limiter_enabled():
+        return
+    with _claude_limiter_state() as state:
+        if state.get("failures") or state.get("open_until"):
+            state["failures"] = 0
+            state["open_until"] = 0
+        if state.get("interval"):
+            interval = state["interval"] * 0.8
+            state["interval"] = interval if interval >= _LIMITER_STEP else 0
+
+
+def claude_limiter_overload(retry_after: Optional[float], attempt: int) -> float:
+    """
+    Record an overload / rate-limit / 5xx response and return how long the caller
+    should wait before retrying: the server's retry-after if given, otherwise a
+    jittered exponential backoff. Opens the circuit after
+    BANK_EXTRACTOR_CIRCUIT_THRESHOLD consecutive failures (default 5) for
+    BANK_EXTRACTOR_CIRCUIT_COOLDOWN seconds (default 60).
+    """
+    wait_time = retry_after if retry_after is not None else _backoff_seconds(attempt)
+    if not limiter_enabled():
+        return wait_time
+    with _claude_limiter_state() as state:
+        now = time.time()
+        failures = state.get("failures", 0) + 1
+        state["failures"] = failures
+        state["interval"] = min(_LIMITER_MAX_INTERVAL, max(_LIMITER_STEP, state.get("interval", 0) * 2))
+        if retry_after is not None:
+            # Everyone waits out the server's retry-after, not just this caller
+            state["next_at"] = max(state.get("next_at", 0), now + retry_after)
+        threshold = _limiter_setting("BANK_EXTRACTOR_CIRCUIT_THRESHOLD", 5)
+        if failures >= threshold and state.get("open_until", 0) <= now:
+            cooldown = _limiter_setting("BANK_EXTRACTOR_CIRCUIT_COOLDOWN", 60)
+            state["open_until"] = now + cooldown
+            print(f"🛑 Claude circuit open for {cooldown:.0f}s after {failures} consecutive overloads", file=sys.stderr)
+    return wait_time
+
+
+def _backoff_seconds(attempt: int) -> float:
+    """Exponential backoff with jitter, so workers that failed together retry apart."""
+    base = _limiter_setting("BANK_EXTRACTOR_RETRY_BASE_SECONDS", 2)
+    ceiling = min(_LIMITER_MAX_BACKOFF, base * (2 ** attempt))
+    return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+
+def _retry_after_seconds(error) -> Optional[float]:
+    """retry-after / retry-after-ms from an API error response, in seconds."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass  # HTTP-date form: fall back to our own backoff
+    return None
+
+
+def classify_claude_error(error) -> Optional[str]:
+    """
+    "overloaded", "rate_limited", "server_error" or "connection" for retryable API
+    errors (including error events mid-stream), None for everything else.
+    """
+    if isinstance(error, RateLimitError):
+        return "rate_limited"
+    if isinstance(error, OverloadedError):
+        return "overloaded"
+    if isinstance(error, APIStatusError):
+        body = error.body if isinstance(error.body, dict) else {}
+        detail = body.get("error") if isinstance(body.get("error"), dict) else body
+        if error.status_code == 529 or detail.get("type") == "overloaded_error":
+            return "overloaded"
+        if error.status_code >= 500 or detail.get("type") == "api_error":
+            return "server_error"
+        return None
+    if isinstance(error, APIConnectionError):  # includes APITimeoutError
+        return "connection"
+    return None
+
+
+# ─── Claude client ───────────────────────────────────────────────────────────
+
+_ANTHROPIC_CLIENTS: Dict[Tuple[str, Optional[str]], Anthropic] = {}
+_ANTHROPIC_CLIENTS_LOCK = threading.Lock()
+
+
+def api_base_url() -> Optional[str]:
+    """
+    Messages API endpoint override (BANK_EXTRACTOR_API_BASE_URL), e.g. a local
+    anthropic_stub_server.py for offline runs and benchmarks. Unset uses the SDK
+    default, which also honours ANTHROPIC_BASE_URL.
+    """
+    return os.environ.get("BANK_EXTRACTOR_API_BASE_URL") or None
+
+
+def get_anthropic_client(api_key: str) -> Anthropic:
+    """
+    Return a shared Anthropic client for this API key and endpoint. Reusing the client
+    keeps its HTTP connection pool alive across statements when running as a server.
+    """
+    base_url = api_base_url()
+    with _ANTHROPIC_CLIENTS_LOCK:
+        client = _ANTHROPIC_CLIENTS.get((api_key, base_url))
+        if client is None:
+            # Increase timeout to 20 minutes for large statements with 200+ transactions
+            # Retries are ours (call_claude_with_retry), paced by the shared limiter
+            client = Anthropic(api_key=api_key, base_url=base_url,
+                               timeout=1200.0, max_retries=0)  # 20 minutes in seconds
+            _ANTHROPIC_CLIENTS[(api_key, base_url)] = client
+        return client
+
+
+def streaming_enabled() -> bool:
+    """Stream Claude responses unless BANK_EXTRACTOR_STREAM=0."""
+    return os.environ.get("BANK_EXTRACTOR_STREAM", "1") != "0"
+
+
+def _request_input_tokens(system, messages: List[Dict]) -> int:
+    """Estimated input tokens of a request (system blocks or string, plus message text)."""
+    blocks = system if isinstance(system, list) else [{"text": system or ""}]
+    text = '\n'.join(block.get("text", "") for block in blocks)
+    for message in messages:
+        content = message.get("content", "")
+        parts = content if isinstance(content, list) else [{"text": content}]
+        text += '\n' + '\n'.join(part.get("text", "") for part in parts if isinstance(part, dict))
+    return estimate_tokens(text)
+
+
+def _create_message(client, model, max_tokens, temperature, system, messages, on_text=None, tool_params=None):
+    """
+    One Claude request. Without on_text this is a plain messages.create; with it the
+    response is streamed and every text delta (or, for a tool call, every partial
+    JSON delta of the tool input) is passed to on_text as it arrives.
+    If the stream dies after some text was received (a transport or API error, not
+    an error raised by on_text), the partial response is kept (stop_reason
+    "stream_interrupted") instead of being thrown away.
+    tool_params ({"tools", "tool_choice"}) are passed through to the request.
+    """
+    if on_text is None:
+        return client.messages.create(
+            model=model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            system=system,
+            messages=messages,
+            **(tool_params or {})
+        )
+
+    received: List[str] = []
+    stream = None
+    try:
+        with client.messages.stream(
+            model=model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            system=system,
+            messages=messages,
+            **(tool_params or {})
+        ) as stream:
+            if tool_params:
+                deltas = (event.delta.partial_json for event in stream
+                          if event.type == "content_block_delta" and event.delta.type == "input_json_delta")
+            else:
+                deltas = stream.text_stream
+            for delta in deltas:
+                received.append(delta)
+                on_text(delta)
+            return stream.get_final_message()
+    except (APIError, httpx.HTTPError) as e:
+        if not received:
+            raise
+        print(f"⚠️  Stream interrupted after {sum(len(d) for d in received)} chars, keeping partial response: {e}",
+              file=sys.stderr)
+        snapshot = getattr(stream, "current_message_snapshot", None) if stream is not None else None
+        # The request was billed in full; without a snapshot, estimate what it cost
+        usage = getattr(snapshot, "usage", None) or SimpleNamespace(
+            input_tokens=_request_input_tokens(system, messages), output_tokens=estimate_tokens(''.join(received)))
+        return SimpleNamespace(
+            content=[SimpleNamespace(type="text", text=''.join(received))],
+            usage=usage,
+            stop_reason="stream_interrupted",
+            model=model,
+        )
+
+
+# ─── AI response cache ───────────────────────────────────────────────────────
+#
+# Identical chunks recur across different PDFs (the same month re-uploaded inside a
+# combined file) and when a crashed batch is reprocessed. Complete responses are kept
+# on disk keyed by model, system prompt, messages and sampling parameters, so a repeat
+# request returns instantly and bills nothing.
+
+_RESPONSE_CACHE: Optional["_DiskLRUCache"] = None
+# Only complete answers are reused; an interrupted stream is never cached
+_RESPONSE_CACHE_STOP_REASONS = {"end_turn", "max_tokens", "stop_sequence", "tool_use"}
+
+
+def get_response_cache() -> Optional["_DiskLRUCache"]:
+    """
+    Claude response cache, configured from the environment:
+      BANK_EXTRACTOR_RESPONSE_CACHE=0         disable
+      BANK_EXTRACTOR_RESPONSE_CACHE_DIR       location (default storage/app/ai_response_cache)
+      BANK_EXTRACTOR_RESPONSE_CACHE_MAX_MB    size bound (default 256)
+      BANK_EXTRACTOR_RESPONSE_CACHE_TTL_HOURS entry lifetime (default 168)
+    """
+    global _RESPONSE_CACHE
+    if os.environ.get("BANK_EXTRACTOR_RESPONSE_CACHE", "1") == "0":
+        return None
+    if _RESPONSE_CACHE is None:
+        directory = os.environ.get("BANK_EXTRACTOR_RESPONSE_CACHE_DIR") or os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ai_response_cache")
+        max_mb = float(os.environ.get("BANK_EXTRACTOR_RESPONSE_CACHE_MAX_MB", "256"))
+        try:
+            _RESPONSE_CACHE = _DiskLRUCache(directory, int(max_mb * 1024 * 1024))
+        except OSError as e:
+            print(f"⚠️  Response cache disabled: {e}", file=sys.stderr)
+            return None
+    return _RESPONSE_CACHE
+
+
+def response_cache_ttl() -> float:
+    """Seconds a cached response stays valid."""
+    return float(os.environ.get("BANK_EXTRACTOR_RESPONSE_CACHE_TTL_HOURS", "168")) * 3600
+
+
+def response_cache_key(model: str, max_tokens: int, temperature: float, system, messages,
+                       tool_params: Optional[Dict] = None) -> str:
+    """sha256 over model, system-prompt hash, messages hash, sampling parameters and tools."""
+    def digest(value) -> str:
+        return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+    material = f"{model}|{digest(system)}|{digest(messages)}|{max_tokens}|{temperature}"
+    if tool_params:
+        material += f"|{digest(tool_params)}"
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+def _cached_response(entry: Dict) -> SimpleNamespace:
+    """A cached entry as a Messages API response that used (and bills) no tokens."""
+    return SimpleNamespace(
+        content=[SimpleNamespace(type="text", text=entry["text"])],
+        stop_reason=entry["stop_reason"],
+        model=entry["model"],
+        usage=SimpleNamespace(input_tokens=0, output_tokens=0,
+                              cache_creation_input_tokens=0, cache_read_input_tokens=0),
+        response_cache_hit=True,
+    )
+
+
+def call_claude_with_retry(client, model, max_tokens, temperature, system, messages, max_retries=5, allow_fallback=False,
+                           on_text=None, tool_params=None):
+    """
+    Call Claude API with exponential backoff retry logic, answering repeat requests
+    from the response cache. A cache hit is passed to on_text in one piece and
+    carries response_cache_hit=True and zero usage. A tool call is cached as the JSON
+    of its input.
+    """
+    cache = get_response_cache()
+    cache_key = response_cache_key(model, max_tokens, temperature, system, messages,
+                                   tool_params) if cache else None
+    if cache_key:
+        entry = cache.get(cache_key)
+        if entry is not None and time.time() - entry.get("stored_at", 0) < response_cache_ttl():
+            print(f"✓ Response cache hit ({cache_key[:12]})", file=sys.stderr)
+            if on_text is not None:
+                on_text(entry["text"])
+            return _cached_response(entry)
+
+    response = _call_claude_with_backoff(client, model, max_tokens, temperature, system, messages,
+                                         max_retries, allow_fallback, on_text, tool_params)
+
+    if cache_key and response.stop_reason in _RESPONSE_CACHE_STOP_REASONS:
+        try:
+            cache.put(cache_key, {
+                "stored_at": time.time(),
+                "model": getattr(response, "model", model),
+                "text": response_text(response),
+                "stop_reason": response.stop_reason,
+            })
+        except (OSError, TypeError, ValueError) as e:
+            print(f"⚠️  Could not write response cache: {e}", file=sys.stderr)
+    return response
+
+
+def _call_claude_with_backoff(client, model, max_tokens, temperature, system, messages, max_retries=5,
+                              allow_fallback=False, on_text=None, tool_params=None):
+    """
+    Call Claude API, retrying overloaded (529), rate-limited (429), 5xx and connection
+    errors. Waits honour retry-after and are coordinated across processes by the shared
+    limiter; once its circuit opens, ClaudeUnavailableError is raised straight away.
+    If allow_fallback=True and model is Haiku, will fallback to Sonnet after all retries fail.
+    on_text switches to a streamed request (see _create_message).
+    """
+    current_model = model
+
+    for attempt in range(max_retries):
+        claude_limiter_acquire()
+        try:
+            with _ai_request_slot():
+                response = _create_message(client, current_model, max_tokens, temperature,
+                                           system, messages, on_text=on_text, tool_params=tool_params)
+        except Exception as e:
+            kind = classify_claude_error(e)
+            if kind is None:
+                # For non-retryable errors, raise immediately
+                raise
+            if kind == "connection":
+                wait_time = _backoff_seconds(attempt)
+            else:
+                wait_time = claude_limiter_overload(_retry_after_seconds(e), attempt)
+
+            if attempt < max_retries - 1:
+                print(f"⚠️  {_CLAUDE_ERROR_LABELS[kind]} (attempt {attempt + 1}/{max_retries}), "
+                      f"retrying in {wait_time:.1f}s...", file=sys.stderr)
+                time.sleep(wait_time)
+                continue
+
+            # All retries exhausted - try fallback if enabled and model is Haiku
+            if allow_fallback and current_model == "claude-haiku-4-5":
+                print(f"❌ Haiku unavailable after {max_retries} attempts", file=sys.stderr)
+                print(f"🔄 Falling back to Sonnet 4.5 for this statement...", file=sys.stderr)
+                current_model = "claude-sonnet-4-5"
+                # One try on the fallback model
+                claude_limiter_acquire()
+                try:
+                    with _ai_request_slot():
+                        response = _create_message(client, current_model, max_tokens, temperature,
+                                                   system, messages, on_text=on_text, tool_params=tool_params)
+                except Exception as fallback_error:
+                    if classify_claude_error(fallback_error) not in (None, "connection"):
+                        claude_limiter_overload(_retry_after_seconds(fallback_error), attempt)
+                    print(f"❌ Sonnet fallback also failed: {str(fallback_error)}", file=sys.stderr)
+                    raise
+                print(f"✅ Fallback to Sonnet successful!", file=sys.stderr)
+                claude_limiter_success()
+                return response
+
+            print(f"❌ API still unavailable after {max_retries} attempts", file=sys.stderr)
+            raise
+
+        claude_limiter_success()
+        return response
+
+
+# ─── AI response formats ─────────────────────────────────────────────────────
+#
+# "json" is the original verbose schema. "compact" returns one pipe-delimited row
+# per transaction (no repeated keys, one-letter type), which cuts output tokens -
+# the slowest and most expensive part of every call - by ~45% on our samples.
+# "tool" has Claude call record_transactions with schema-checked arguments, so the
+# answer arrives already parsed and skips the JSON recovery in scan_json_response.
+# All parse back into the same {"statement_summary", "transactions"} dict.
+
+AI_OUTPUT_FORMATS = {
+    "json": """OUTPUT FORMAT - Return ONLY valid JSON:
+{
+  "statement_summary": {
+    "beginning_balance": 1234.56,
+    "ending_balance": 5678.90,
+    "average_daily_balance": 3456.78
+  },
+  "transactions": [
+    {"date": "YYYY-MM-DD", "description": "description text", "amount": 123.45, "type": "credit", "ending_balance": 1234.56}
+  ]
+}
+
+- amount: POSITIVE number only
+- type: exactly "credit" or "debit"
+- ending_balance: (OPTIONAL) Account balance after this transaction (can be negative)
+- statement_summary: (OPTIONAL) If the statement shows summary balances, include them here
+- statement_summary.beginning_balance: Opening/beginning/previous balance (can be negative)
+- statement_summary.ending_balance: Closing/ending/new balance (can be negative)
+- statement_summary.average_daily_balance: (OPTIONAL) Average daily balance for the statement period if explicitly mentioned in the statement (can be negative)
+""",
+    "compact": """OUTPUT FORMAT - Return ONLY pipe-delimited lines, no JSON, no markdown:
+SUMMARY|beginning_balance|ending_balance|average_daily_balance
+date|type|amount|ending_balance|description
+2025-01-02|C|1234.56|5678.90|DEPOSIT FROM ACME CORP
+2025-01-03|D|45.00||CHECKCARD 0102 AMAZON MKTPLACE
+
+- First line: SUMMARY row with the statement balances; leave a field empty if not shown (can be negative)
+- Second line: the header row exactly as above
+- Then ONE line per transaction, in statement order
+- date: YYYY-MM-DD
+- type: exactly C (credit) or D (debit)
+- amount: POSITIVE number only, no commas or dollar signs
+- ending_balance: (OPTIONAL) account balance after this transaction, empty if there is no balance column (can be negative)
+- description: last field, as printed on the statement (may contain any characters except newlines)
+""",
+    "tool": """OUTPUT FORMAT - Call the record_transactions tool exactly once with everything you extracted:
+- statement_summary: (OPTIONAL) the statement's beginning, ending and average daily balances if shown (can be negative)
+- transactions: EVERY transaction, in statement order
+- date: YYYY-MM-DD
+- amount: POSITIVE number only
+- type: exactly "credit" or "debit"
+- ending_balance: (OPTIONAL) Account balance after this transaction (can be negative)
+""",
+}
+
+_BALANCE_SCHEMA = {"type": ["number", "null"]}
+
+EXTRACTION_TOOL = {
+    "name": "record_transactions",
+    "description": "Record the balances and every transaction extracted from the bank statement text.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "statement_summary": {
+                "type": "object",
+                "properties": {
+                    "beginning_balance": _BALANCE_SCHEMA,
+                    "ending_balance": _BALANCE_SCHEMA,
+                    "average_daily_balance": _BALANCE_SCHEMA,
+                },
+            },
+            "transactions": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "date": {"type": "string", "description": "YYYY-MM-DD"},
+                        "description": {"type": "string"},
+                        "amount": {"type": "number", "minimum": 0},
+                        "type": {"type": "string", "enum": ["credit", "debit"]},
+                        "ending_balance": _BALANCE_SCHEMA,
+                    },
+                    "required": ["date", "description", "amount", "type"],
+                },
+            },
+        },
+        "required": ["transactions"],
+    },
+}
+
+_COMPACT_TYPES = {"C": "credit", "D": "debit", "CREDIT": "credit", "DEBIT": "debit"}
+_COMPACT_DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+
+def ai_output_format() -> str:
+    """BANK_EXTRACTOR_AI_FORMAT: "json" (default), "compact" or "tool"."""
+    fmt = os.environ.get("BANK_EXTRACTOR_AI_FORMAT", "json").lower()
+    return fmt if fmt in AI_OUTPUT_FORMATS else "json"
+
+
+def ai_tool_params(output_format: str) -> Optional[Dict]:
+    """tools/tool_choice request parameters forcing the extraction tool, for the "tool" format."""
+    if output_format != "tool":
+        return None
+    return {"tools": [EXTRACTION_TOOL], "tool_choice": {"type": "tool", "name": EXTRACTION_TOOL["name"]}}
+
+
+def response_text(response) -> str:
+    """
+    Text of a Messages API response; for a tool call, its input as JSON (the form
+    that is cached, logged and re-parsed by scan_ai_response).
+    """
+    for block in response.content:
+        if block.type == "tool_use":
+            return json.dumps(block.input)
+    return ''.join(block.text for block in response.content if block.type == "text")
+
+
+def response_tool_input(response) -> Optional[Dict]:
+    """The extraction tool's input from a response, None when it holds no tool call."""
+    for block in response.content:
+        if block.type == "tool_use" and isinstance(block.input, dict):
+            return block.input
+    return None
+
+
+def _compact_number(value: str) -> Optional[float]:
+    value = value.strip().replace('$', '').replace(',', '')
+    if not value:
+        return None
+    if value.startswith('(') and value.endswith(')'):
+        value = '-' + value[1:-1]
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def parse_compact_row(line: str) -> Optional[Dict]:
+    """One compact transaction row → transaction dict (None for header/summary/garbage)."""
+    fields = line.strip().split('|', 4)
+    if len(fields) < 5 or not _COMPACT_DATE_RE.match(fields[0].strip()):
+        return None
+    amount = _compact_number(fields[2])
+    if amount is None:
+        return None
+    txn = {
+        "date": fields[0].strip(),
+        "description": fields[4].strip(),
+        "amount": abs(amount),
+        "type": _COMPACT_TYPES.get(fields[1].strip().upper(), "debit"),
+    }
+    balance = _compact_number(fields[3])
+    if balance is not None:
+        txn["ending_balance"] = balance
+    return txn
+
+
+def parse_compact_response(result: str) -> Dict:
+    """Parse a compact (pipe-delimited) response into {"statement_summary", "transactions"}."""
+    data: Dict = {"transactions": []}
+    for line in result.split('\n'):
+        stripped = line.strip().strip('`')
+        if stripped.upper().startswith('SUMMARY|'):
+            fields = stripped.split('|')[1:4] + ['', '', '']
+            summary = {
+                key: _compact_number(value)
+                for key, value in zip(("beginning_balance", "ending_balance", "average_daily_balance"), fields)
+            }
+            if any(v is not None for v in summary.values()):
+                data["statement_summary"] = summary
+            continue
+        txn = parse_compact_row(stripped)
+        if txn is not None:
+            data["transactions"].append(txn)
+    return data
+
+
+def scan_ai_response(result: str, output_format: str, cut_off: bool = False) -> Tuple[Dict, Optional[int]]:
+    """
+    Parse a Claude response in the given output format: (data, truncated_at) as for
+    scan_json_response. The JSON of a record_transactions call (cached or from a
+    batch) is plain JSON and parses the same way. Compact rows carry no closing
+    marker, so truncation there is only known from the stop reason: for a response
+    that was cut_off, a last row without its newline may have lost part of its
+    description, so it is dropped and truncated_at is where it starts.
+    """
+    if output_format == "compact":
+        if cut_off:
+            truncated_at = result.rfind('\n') + 1
+            return parse_compact_response(result[:truncated_at]), truncated_at
+        return parse_compact_response(result), None
+    return scan_json_response(result)
+
+
+def parse_ai_response(result: str, output_format: str) -> Dict:
+    """Parse a Claude response in the given output format."""
+    return scan_ai_response(result, output_format)[0]
+
+
+class _CompactStreamParser:
+    """Streaming counterpart of parse_compact_response: emits each row once its newline arrives."""
+
+    def __init__(self):
+        self._pending = ''
+        self.transactions: List[Dict] = []
+
+    def feed(self, delta: str) -> List[Dict]:
+        self._pending += delta
+        *lines, self._pending = self._pending.split('\n')
+        new = [txn for txn in (parse_compact_row(line) for line in lines) if txn is not None]
+        self.transactions.extend(new)
+        return new
+
+
+def ai_chunk_concurrency(chunks: int) -> int:
+    """In-flight chunk requests per statement: BANK_EXTRACTOR_AI_CONCURRENCY (default 4)."""
+    limit = int(os.environ.get("BANK_EXTRACTOR_AI_CONCURRENCY") or 4)
+    return max(1, min(limit, chunks))
+
+
+def build_system_blocks(static_prompt: str, corrections_prompt: str) -> List[Dict]:
+    """
+    System prompt as cacheable blocks: the fixed extraction rules first (identical
+    for every chunk and statement), then the per-statement learned corrections as
+    a second segment, so changing corrections never invalidates the rules prefix.
+    """
+    blocks = [{"type": "text", "text": static_prompt, "cache_control": {"type": "ephemeral"}}]
+    if corrections_prompt and corrections_prompt.strip():
+        blocks.append({"type": "text", "text": corrections_prompt.strip(),
+                       "cache_control": {"type": "ephemeral"}})
+    return blocks
+
+
+def _usage_cache_tokens(usage) -> Tuple[int, int]:
+    """(cache_creation, cache_read) input tokens from an API usage object."""
+    return (getattr(usage, "cache_creation_input_tokens", None) or 0,
+            getattr(usage, "cache_read_input_tokens", None) or 0)
+
+
+def _validate_ai_transaction(txn) -> Optional[Dict]:
+    """Normalise one transaction from Claude, or None if it is not an object."""
+    if not isinstance(txn, dict):
+        return None
+    # Ensure required fields with defaults
+    # Use safe_float_amount to handle commas and dollar signs
+    transaction_dict = {
+        "date": txn.get("date", ""),
+        "description": txn.get("description", "Unknown"),
+        "amount": safe_float_amount(txn.get("amount", 0)),
+        "type": txn.get("type", "debit")  # Default to debit if missing
+    }
+
+    # Include ending_balance if available
+    if "ending_balance" in txn and txn["ending_balance"] is not None:
+        transaction_dict["ending_balance"] = safe_float_amount(txn["ending_balance"])
+
+    return transaction_dict
+
+
+def _request_chunk(client, model: str, system, content: str, output_format: str = "json") -> Dict:
+    """
+    Send one chunk of statement text to Claude and return a plain result dict:
+    {"text", "tool_input", "usage": {"input_tokens", "output_tokens", "cache_creation_tokens",
+    "cache_read_tokens"}, "stop_reason", "model"}. tool_input is the parsed
+    record_transactions call for the "tool" format (None otherwise).
+
+    When streaming is enabled the result also carries "streamed_transactions":
+    the transactions validated one by one as they arrived.
+    """
+    on_text = None
+    streamed: Optional[List[Dict]] = None
+    if streaming_enabled():
+        parser = _CompactStreamParser() if output_format == "compact" else _TransactionStreamParser()
+        streamed = []
+
+        def on_text(delta: str) -> None:
+            for txn in parser.feed(delta):
+                validated = _validate_ai_transaction(txn)
+                if validated is not None:
+                    streamed.append(validated)
+                    if len(streamed) % 50 == 0:
+                        print(f"  … {len(streamed)} transactions received", file=sys.stderr)
+
+    response = call_claude_with_retry(
+        client=client,
+        model=model,
+        max_tokens=32000,  # Increased from 16000 to handle statements with 200+ transactions
+        temperature=0,
+        system=system,
+        messages=[
+            {"role": "user", "content": content}
+        ],
+        allow_fallback=True,  # Allow fallback to Sonnet if Haiku fails
+        on_text=on_text,
+        tool_params=ai_tool_params(output_format)
+    )
+    return _chunk_result_from_message(response, model, streamed)
+
+
+def _chunk_result_from_message(response, model: str, streamed: Optional[List[Dict]] = None) -> Dict:
+    """Normalise a Messages API response (live or from a batch) into a chunk result."""
+    cache_creation, cache_read = _usage_cache_tokens(response.usage)
+    return {
+        "streamed_transactions": streamed or [],
+        "text": response_text(response),
+        "tool_input": response_tool_input(response),
+        "usage": {
+            "input_tokens": response.usage.input_tokens,
+            "output_tokens": response.usage.output_tokens,
+            "cache_creation_tokens": cache_creation,
+            "cache_read_tokens": cache_read,
+        },
+        "stop_reason": response.stop_reason,
+        "model": getattr(response, "model", model),
+        "response_cache_hit": getattr(response, "response_cache_hit", False),
+    }
+
+
+def request_chunks(client, model: str, system, contents: List[str], output_format: str = "json") -> List[Dict]:
+    """
+    Default AI requester: send one request per chunk, concurrently, and return the
+    _request_chunk results in chunk order.
+    """
+    if len(contents) == 1:
+        return [_request_chunk(client, model, system, contents[0], output_format)]
+
+    workers = ai_chunk_concurrency(len(contents))
+    print(f"AI: {len(contents)} chunks, {workers} in flight", file=sys.stderr)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_request_chunk, client, model, system, content, output_format)
+                   for content in contents]
+        return [future.result() for future in futures]
+
+
+def _chunk_transactions(chunk_data: Optional[Dict], chunk_result: Dict) -> List[Dict]:
+    """
+    Transactions for one chunk: the fully parsed response, unless the streamed
+    objects got further (a truncated or interrupted response the JSON recovery
+    could not fully rebuild).
+    """
+    parsed = chunk_data.get("transactions", []) if chunk_data else []
+    streamed = chunk_result.get("streamed_transactions")
+    if streamed and len(streamed) > len(parsed):
+        print(f"ℹ️  Using {len(streamed)} streamed transactions (parsed response had {len(parsed)})", file=sys.stderr)
+        return streamed
+    return parsed
+
+
+def _parse_chunk_result(chunk_result: Dict, output_format: str) -> Tuple[Optional[Dict], List[Dict]]:
+    """
+    (parsed response, transactions) for one chunk result. A response that was cut
+    off gets "truncated_at" (see scan_ai_response) set on the chunk result for the
+    logs; only its transactions, all complete, feed a continuation.
+    """
+    tool_input = chunk_result.get("tool_input")
+    if tool_input is not None:
+        # Tool input arrives already parsed and schema-checked by the API
+        chunk_data = {**tool_input, "transactions": tool_input.get("transactions") or []}
+    else:
+        chunk_data, truncated_at = scan_ai_response(chunk_result["text"], output_format, _is_truncated(chunk_result))
+        if truncated_at is not None:
+            chunk_result["truncated_at"] = truncated_at
+            print(f"⚠️  Response cut off at char {truncated_at} of {len(chunk_result['text'])} "
+                  f"({chunk_result['stop_reason']}), kept {len(chunk_data['transactions'])} complete transactions",
+                  file=sys.stderr)
+    return chunk_data, _chunk_transactions(chunk_data, chunk_result)
+
+
+# ─── Truncated response continuation ─────────────────────────────────────────
+#
+# A dense chunk can fill max_tokens before Claude reaches its last transaction. The
+# complete transactions are kept and a continuation request asks for the rest: it
+# shows the last ones received, has Claude echo the last one and carry on from
+# there, and the echo is dropped again when the two answers are merged. These
+# anchor rows are the resume point; the truncated_at offset of the cut-off answer
+# is only logged, since a new request cannot pick up from a character offset.
+
+_CONTINUATION_STOP_REASONS = {"max_tokens", "stream_interrupted"}
+# Transactions shown to Claude to locate where its previous answer stopped
+CONTINUATION_ANCHOR_ROWS = 3
+
+
+def max_continuations() -> int:
+    """Continuation rounds per chunk: BANK_EXTRACTOR_MAX_CONTINUATIONS (default 3, 0 disables)."""
+    return max(0, int(os.environ.get("BANK_EXTRACTOR_MAX_CONTINUATIONS") or 3))
+
+
+def _is_truncated(chunk_result: Dict) -> bool:
+    return chunk_result.get("stop_reason") in _CONTINUATION_STOP_REASONS
+
+
+def _anchor_row(txn: Dict, output_format: str) -> str:
+    """One received transaction written the way the output format writes it."""
+    if output_format == "compact":
+        balance = txn.get("ending_balance")
+        return '|'.join([
+            str(txn.get("date", "")), "C" if txn.get("type") == "credit" else "D",
+            f'{safe_float_amount(txn.get("amount", 0)):.2f}',
+            f'{safe_float_amount(balance):.2f}' if balance is not None else '', str(txn.get("description", "")),
+        ])
+    return json.dumps({k: txn[k] for k in ("date", "description", "amount", "type", "ending_balance") if k in txn})
+
+
+def continuation_content(content: str, received: List[Dict], output_format: str) -> str:
+    """The chunk's request content plus instructions to continue after `received`."""
+    anchors = '\n'.join(_anchor_row(txn, output_format) for txn in received[-CONTINUATION_ANCHOR_ROWS:])
+    return f"""{content}
+
+=== CONTINUATION ===
+Your previous answer for this statement text stopped at the output limit after {len(received)} transactions.
+It ended with these transactions (the last one is where it stopped):
+{anchors}
+
+Continue from there: first repeat that LAST transaction exactly, then list EVERY transaction that comes
+after it in the statement text, in statement order, in the same output format. Do not list any earlier
+transaction again. statement_summary may be omitted."""
+
+
+def _continuation_key(txn: Dict) -> Tuple:
+    return (str(txn.get("date", "")), txn.get("type"), round(safe_float_amount(txn.get("amount", 0)), 2),
+            ' '.join(str(txn.get("description", "")).lower().split()))
+
+
+def merge_continuation(received: List[Dict], more: List[Dict]) -> List[Dict]:
+    """
+    Append a continuation's transactions, dropping the rows it repeats from the end of
+    `received`: the shortest prefix of `more` (up to CONTINUATION_ANCHOR_ROWS) that
+    matches the tail of `received`, normally just the echoed last transaction.
+    Repeats anywhere else are real transactions and are kept.
+    """
+    tail = [_continuation_key(txn) for txn in received[-CONTINUATION_ANCHOR_ROWS:]]
+    head = [_continuation_key(txn) for txn in more[:CONTINUATION_ANCHOR_ROWS]]
+    for k in range(1, min(len(tail), len(head)) + 1):
+        if head[:k] == tail[-k:]:
+            return received + more[k:]
+    return received + more
+
+
+def continue_truncated_chunks(client, model: str, system, contents: List[str],
+                              parsed: List[Tuple[Optional[Dict], List[Dict]]], truncated: List[int],
+                              output_format: str, requester) -> Tuple[List[Dict], List[int]]:
+    """
+    Send continuation requests for the chunks at indexes `truncated` (whose latest
+    answer was cut off), merging what comes back into `parsed` in place, for up to
+    max_continuations() rounds. Returns (the continuation chunk results for usage
+    accounting, the indexes whose answer is still cut off).
+    """
+    pending = [i for i in truncated if parsed[i][1]]
+    results: List[Dict] = []
+    limit = max_continuations()
+    for round_number in range(1, limit + 1):
+        if not pending:
+            break
+        print(f"↪️  Continuing {len(pending)} truncated chunk(s) on {model} (round {round_number})", file=sys.stderr)
+        round_results = requester(client, model, system,
+                                  [continuation_content(contents[i], parsed[i][1], output_format) for i in pending],
+                                  output_format)
+        results.extend(round_results)
+        still_truncated = []
+        for i, chunk_result in zip(pending, round_results):
+            _, more = _parse_chunk_result(chunk_result, output_format)
+            merged = merge_continuation(parsed[i][1], more)
+            print(f"  chunk {i + 1}: +{len(merged) - len(parsed[i][1])} transactions", file=sys.stderr)
+            # Stop on a continuation that adds nothing, even if it was cut off too
+            if _is_truncated(chunk_result) and len(merged) > len(parsed[i][1]):
+                still_truncated.append(i)
+            parsed[i] = ({**(parsed[i][0] or {}), "transactions": merged}, merged)
+        pending = still_truncated
+    if pending and limit:
+        print(f"⚠️  {len(pending)} chunk(s) still truncated after {limit} continuation(s)", file=sys.stderr)
+    # Chunks cut off before their first transaction cannot be continued
+    return results, sorted(set(pending) | {i for i in truncated if not parsed[i][1]})
+
+
+# ─── Chunk reconciliation and model escalation ───────────────────────────────
+#
+# The default model is the cheap one. Each chunk's transactions are checked against
+# the balances printed on the statement; only chunks that do not add up are sent
+# again to the escalation model.
+
+RECONCILE_TOLERANCE = 0.02
+# A chunk with at least this many dated amount lines must yield transactions for
+# at least half of them
+RECONCILE_MIN_LINES = 5
+
+
+def chunk_escalation_model(model: str) -> Optional[str]:
+    """
+    Model that failing chunks are re-run on (BANK_EXTRACTOR_ESCALATION_MODEL, default
+    claude-sonnet-4-5; "none" disables). None unless it is priced above `model`.
+    """
+    escalation_model = os.environ.get("BANK_EXTRACTOR_ESCALATION_MODEL", "claude-sonnet-4-5").strip()
+    if not escalation_model or escalation_model.lower() in ("none", "0") or escalation_model == model:
+        return None
+    model_price = PRICING.get(model, {}).get("output", 0)
+    if PRICING.get(escalation_model, {}).get("output", float("inf")) <= model_price:
+        return None
+    return escalation_model
+
+
+def _summary_balance(summary: Optional[Dict], key: str) -> Optional[float]:
+    value = summary.get(key) if summary else None
+    if value is None or value == "":
+        return None
+    return safe_float_amount(value)
+
+
+def reconcile_chunk(transactions: List[Dict], content: str, beginning_balance: Optional[float] = None,
+                    ending_balance: Optional[float] = None) -> Optional[str]:
+    """
+    Check one chunk's transactions against the statement. Returns None when the chunk
+    reconciles (or has nothing to check against), otherwise why it failed:
+
+    - running balance: the signed amounts between two rows that carry an
+      ending_balance must account for the change in balance; beginning_balance
+      and ending_balance extend the chain to the statement's own balances
+    - coverage: a chunk with RECONCILE_MIN_LINES or more dated amount lines must
+      produce transactions for at least half of them
+    """
+    checked = mismatches = 0
+    balance = beginning_balance
+    delta = 0.0
+    for txn in transactions:
+        amount = safe_float_amount(txn.get("amount", 0))
+        delta += amount if txn.get("type") == "credit" else -amount
+        if txn.get("ending_balance") is None:
+            continue
+        row_balance = safe_float_amount(txn["ending_balance"])
+        if balance is not None:
+            checked += 1
+            if abs(balance + delta - row_balance) > RECONCILE_TOLERANCE:
+                mismatches += 1
+        balance, delta = row_balance, 0.0
+    if ending_balance is not None and balance is not None:
+        checked += 1
+        if abs(balance + delta - ending_balance) > RECONCILE_TOLERANCE:
+            mismatches += 1
+    if mismatches:
+        return f"{mismatches} of {checked} balance checks failed"
+
+    lines = sum(1 for line in content.split('\n')
+                if _HYBRID_DATE_RE.match(line) and _HYBRID_AMOUNT_RE.search(line))
+    if lines >= RECONCILE_MIN_LINES and len(transactions) < lines / 2:
+        return f"{len(transactions)} transactions for {lines} dated amount lines"
+    return None
+
+
+def escalate_chunks(client, escalation_model: str, system, contents: List[str],
+                    parsed: List[Tuple[Optional[Dict], List[Dict]]], statement_summary: Optional[Dict],
+                    output_format: str, requester, truncated: set) -> Tuple[List[int], List[Dict]]:
+    """
+    Reconcile every chunk and re-run the ones that fail on escalation_model (continuing
+    any answer that is cut off), replacing their entry in `parsed` and their membership
+    of `truncated` (indexes of chunks whose answer is cut off) in place. Returns
+    (1-based numbers of the chunks whose answer was replaced, the escalation chunk
+    results for usage accounting).
+    """
+    beginning = _summary_balance(statement_summary, "beginning_balance")
+    ending = _summary_balance(statement_summary, "ending_balance")
+    last = len(parsed) - 1
+
+    failing = []
+    for i, (_, chunk_txns) in enumerate(parsed):
+        reason = reconcile_chunk(chunk_txns, contents[i],
+                                 beginning if i == 0 else None, ending if i == last else None)
+        if reason:
+            print(f"⚠️  Chunk {i + 1}/{len(parsed)} failed reconciliation: {reason}", file=sys.stderr)
+            failing.append(i)
+    if not failing:
+        return [], []
+
+    print(f"🔼 Re-running {len(failing)} chunk(s) on {escalation_model}", file=sys.stderr)
+    escalation_results = requester(client, escalation_model, system, [contents[i] for i in failing], output_format)
+    replaced = []
+    for i, chunk_result in zip(failing, escalation_results):
+        chunk_data, chunk_txns = _parse_chunk_result(chunk_result, output_format)
+        # An empty answer from the larger model (e.g. an error or unparseable) is not used
+        if chunk_txns:
+            parsed[i] = (chunk_data, chunk_txns)
+            replaced.append((i, chunk_result))
+        else:
+            print(f"⚠️  Chunk {i + 1}: {escalation_model} returned no transactions, keeping the original answer",
+                  file=sys.stderr)
+
+    truncated.difference_update(i for i, _ in replaced)
+    cut_off = [i for i, chunk_result in replaced if _is_truncated(chunk_result)]
+    if cut_off:
+        continuation_results, still_cut_off = continue_truncated_chunks(
+            client, escalation_model, system, contents, parsed, cut_off, output_format, requester)
+        escalation_results = escalation_results + continuation_results
+        truncated.update(still_cut_off)
+    for i, _ in replaced:
+        if reconcile_chunk(parsed[i][1], contents[i],
+                           beginning if i == 0 else None, ending if i == last else None):
+            print(f"⚠️  Chunk {i + 1} still does not reconcile on {escalation_model}", file=sys.stderr)
+    return [i + 1 for i, _ in replaced], escalation_results
+
+
+def extract_transactions_with_ai(text: str, api_key: str, model: str, corrections: List[Dict] = None,
+                                 complete_statement: bool = True,
+                                 page_starts: Optional[List[int]] = None) -> Tuple[List[Dict], Dict, Dict]:
+    """
+    Extract transactions from statement text with Claude. page_starts (line numbers,
+    see join_pages) lets chunking split a long statement between pages.
+    """
+    client = get_anthropic_client(api_key)
+    current_year = datetime.now().year
+
+    # Track original model for potential fallback
+    original_model = model
+    fallback_attempted = False
+
+    # Build corrections section for prompt
+    corrections_prompt = build_corrections_prompt(corrections) if corrections else ""
+    output_format = ai_output_format()
+
+    prompt = f"""
+You are an expert bank statement parser. Extract ALL transactions accurately from ANY bank.
+
+CRITICAL EXTRACTION RULES:
+- Extract EVERY SINGLE transaction - do NOT skip any
+- INCLUDE DUPLICATES: If the same vendor appears multiple times, extract EACH occurrence separately
+- Same amount from same vendor on same day = STILL extract as separate transactions
+- Each date can have MULTIPLE transactions - extract ALL of them
+- Standardize dates to YYYY-MM-DD format (assume year {current_year} if not specified)
+- Do NOT deduplicate - the statement shows what actually happened
+- Do NOT include Beginning/Ending balance summary lines as transactions
+
+TABLE FORMAT HANDLING (VERY IMPORTANT):
+- Some statements show checks in MULTI-COLUMN TABLES (2 or 3 columns per row)
+- CAREFULLY read across EACH ROW - each column is a SEPARATE transaction
+- Example: "11/10 14381 12.92  11/17 14390 276.00  11/24 14400 496.00" = 3 SEPARATE checks
+- Do NOT skip checks just because they're in a compact table format
+- Extract EVERY check number you see, even if they appear side-by-side in tables
+
+AMOUNT PARSING - CRITICAL:
+- Amounts with commas (1,368.47) are COMPLETE amounts - do NOT extract only the first digit
+- When you see "1,368.47" the amount is ONE THOUSAND THREE HUNDRED SIXTY EIGHT dollars, NOT $1
+- ALWAYS capture the FULL amount including all digits after commas
+- Examples: "1,368.47" = 1368.47, "2,500.00" = 2500.00, "15,234.56" = 15234.56
+- Return amounts as plain numbers WITHOUT commas or dollar signs in the JSON
+
+🚨 CLASSIFICATION - READ FIRST 🚨
+
+STEP 1: Analyze the statement format
+- Does it have section headers? ("CREDITS", "DEBITS", "DEPOSITS", "WITHDRAWALS")
+- OR does it have a table with separate columns? (Debits column, Credits column)
+
+STEP 2: Classify based on structure ONLY
+
+IF SECTION-BASED (has section headers):
+- ALL transactions under "CREDITS" or "DEPOSITS" section → type: "credit"
+- ALL transactions under "DEBITS" or "WITHDRAWALS" section → type: "debit"
+
+IF COLUMN-BASED (table format):
+- Find the column headers: "Debits", "Withdrawals", "Credits", "Deposits"
+- For each transaction row, check which column has the dollar amount
+- Amount in Debits/Withdrawals column → type: "debit"
+- Amount in Credits/Deposits column → type: "credit"
+
+CRITICAL: Description text is IRRELEVANT. ONLY use section or column position.
+
+CARD PURCHASES & CHECKCARD TRANSACTIONS (EXTREMELY IMPORTANT):
+- Bank statements often contain MANY card purchase transactions spread across multiple pages
+- PURCHASE transactions format: "MM/DD/YY PURCHASE DDDD MERCHANT_NAME LOCATION -AMOUNT"
+  Example: "09/08/25 PURCHASE 0905 COMCAST / XFINITY 800-266-2278 MD -259.95"
+- CHECKCARD transactions format: "MM/DD/YY CHECKCARD DDDD MERCHANT_NAME LOCATION -AMOUNT"
+  Example: "09/22/25 CHECKCARD 0920 ADVANCE AUTO PARTS #269 HARRISONBURG VA -90.00"
+- These are ALWAYS DEBITS (money spent on purchases)
+- EXTRACT EVERY SINGLE ONE - do not skip any card purchases
+- Card purchases may appear in the middle of other transactions
+- Multiple card purchases on the same date to the same merchant = extract EACH separately
+- Even small amounts like $1.99, $5.00 must be extracted
+- Look for patterns: "PURCHASE 09", "CHECKCARD 09", "PURCHASE 0905", etc.
+
+Example (Section-Based):
+```
+CREDITS
+  12/01  Transaction A  100.00 → type: "credit"
+  12/02  Transaction B  200.00 → type: "credit"
+DEBITS
+  12/03  Transaction C  50.00 → type: "debit"
+```
+
+Example (Column-Based):
+```
+| Date  | Description    | Withdrawals | Deposits | Balance |
+| 12/01 | Transaction A  | -           | 100.00   | 1100.00 | → type: "credit"
+| 12/02 | Transaction B  | 50.00       | -        | 1050.00 | → type: "debit"
+```
+
+NEVER use description words to determine type. ONLY structure (section or column).
+
+BALANCE EXTRACTION (IMPORTANT FOR ACCURACY):
+- Many statements show a running balance or ending balance column
+- If the statement has a balance column, extract the balance value for EACH transaction
+- The balance shown is typically the account balance AFTER that transaction posted
+- If no balance column exists, omit the balance field (don't guess or calculate)
+- Balance format examples: "$1,234.56" → 1234.56, "($500.00)" → -500.00 (negative)
+- Negative balances are shown in parentheses: "(1,234.56)" = -1234.56
+
+STATEMENT SUMMARY EXTRACTION (CRITICAL - HIGHEST PRIORITY):
+This is the MOST IMPORTANT part of extraction - get these balances correct!
+
+WHERE TO LOOK:
+1. FIRST: Check the top of the first page for "Account Summary" or "Statement Summary" section
+2. SECOND: Check the bottom of the last page for summary totals
+3. THIRD: Look for clearly labeled summary lines anywhere in the statement
+
+WHAT TO EXTRACT:
+- "Beginning Balance", "Opening Balance", "Previous Balance", or "Starting Balance"
+- "Ending Balance", "Closing Balance", "New Balance", or "Current Balance"
+- These are SUMMARY LINES, NOT individual transactions
+- They are usually in a box, table, or clearly separated section
+
+FORMAT EXAMPLES:
+  "Beginning Balance: $1,234.56" → 1234.56 (positive)
+  "Previous Balance.............$1,234.56" → 1234.56 (positive)
+  "Opening Balance    ($1,234.56)" → -1234.56 (negative - parentheses mean negative)
+  "Starting Balance    $1,234.56 CR" → 1234.56 (positive - CR means credit/positive)
+  "Beginning Balance    $1,234.56 DR" → -1234.56 (negative - DR means debit/negative)
+
+SIGN VALIDATION (VERY IMPORTANT):
+- Parentheses () around a balance = NEGATIVE
+- No parentheses and positive number = POSITIVE
+- "CR" suffix = POSITIVE (credit balance)
+- "DR" suffix = NEGATIVE (debit balance)
+- Most checking accounts have POSITIVE beginning balances
+- If you see a balance without parentheses and no DR suffix, it is POSITIVE
+
+EXAMPLES OF CORRECT EXTRACTION:
+  "$5,000.00" → 5000.00 (positive)
+  "($500.00)" → -500.00 (negative - has parentheses)
+  "$2,000 CR" → 2000.00 (positive - CR means credit)
+  "$2,000 DR" → -2000.00 (negative - DR means debit)
+
+- Return these as separate fields in the output (not as transactions)
+
+"""
+    prompt += AI_OUTPUT_FORMATS[output_format]
+
+    # Static rules and learned corrections go out as separate prompt-cache segments
+    system_blocks = build_system_blocks(prompt, corrections_prompt)
+
+    # Debug: log input text length
+    debug_log = "/var/www/html/crmfinity_underwriting/crmfinity-ai/storage/logs/extraction_debug.log"
+
+    # Estimate tokens and check if we need to chunk
+    estimated_tokens = estimate_tokens(text)
+    # The context window takes far more, but output is capped at max_tokens: a
+    # larger chunk means a longer answer, so the budget bounds the answer length
+    # (answers that still get cut off are continued). The budget is in estimate_tokens
+    # units, which are not measured against the tokenizer
+    max_input_tokens = chunk_token_budget()
+
+    with open(debug_log, 'w') as f:
+        f.write(f"=== INPUT ===\n")
+        f.write(f"Text length: {len(text)} characters\n")
+        f.write(f"Estimated tokens: {estimated_tokens}\n")
+        f.write(f"Model: {model}\n")
+        f.write(f"Output format: {output_format}\n")
+        f.write(f"Chunking required: {estimated_tokens > max_input_tokens}\n\n")
+
+    # If text is too large, chunk it; every chunk becomes one request
+    overlap_windows: List[str] = []
+    if estimated_tokens > max_input_tokens:
+        lines = text.split('\n')
+        ranges = chunk_line_ranges(lines, max_tokens=max_input_tokens, page_starts=page_starts)
+        chunks = [render_chunk(lines, *r) for r in ranges]
+        # Text each chunk shares with the next, where duplicate transactions can come from
+        overlap_windows = ['\n'.join(lines[ranges[i + 1][0]:ranges[i][1]]) for i in range(len(ranges) - 1)]
+        with open(debug_log, 'a') as f:
+            f.write(f"=== CHUNKING ===\n")
+            f.write(f"Split into {len(chunks)} chunks\n")
+            for i, (chunk, (start, end, header)) in enumerate(zip(chunks, ranges)):
+                f.write(f"Chunk {i+1}: lines {start}-{end}, {len(chunk)} chars, ~{estimate_tokens(chunk)} tokens"
+                        f"{f', repeats {header!r}' if header else ''}\n")
+            f.write("\n")
+        contents = [f"Bank Statement Text (Part {i+1} of {len(chunks)}):\n\n{chunk}" for i, chunk in enumerate(chunks)]
+    else:
+        # Single request for small PDFs
+        contents = [f"Bank Statement Text:\n\n{text}"]
+
+    # Batch runs swap in a requester that collects results from a Message Batches job
+    requester = _AI_REQUESTER or request_chunks
+    chunk_results = requester(client, model, system_blocks, contents, output_format)
+
+    parsed = [_parse_chunk_result(chunk_result, output_format) for chunk_result in chunk_results]
+
+    # Answers cut off at max_tokens are continued rather than re-run
+    cut_off = [i for i, chunk_result in enumerate(chunk_results) if _is_truncated(chunk_result)]
+    continued = [i for i in cut_off if parsed[i][1]]
+    continuation_results: List[Dict] = []
+    truncated = set(cut_off)
+    if cut_off:
+        continuation_results, still_cut_off = continue_truncated_chunks(
+            client, model, system_blocks, contents, parsed, cut_off, output_format, requester)
+        truncated = set(still_cut_off)
+
+    # Statement summary from the first chunk that has one (usually the first chunk)
+    statement_summary = next((data["statement_summary"] for data, _ in parsed
+                              if data and "statement_summary" in data), None)
+
+    # Every response we paid for, with the model it was requested from
+    chunk_results = chunk_results + continuation_results
+    billed = [(model, chunk_result) for chunk_result in chunk_results]
+    escalation_model = chunk_escalation_model(model)
+    escalated: List[int] = []
+    if escalation_model:
+        # Statement balances only bound the chunks when the whole statement was sent
+        escalated, escalation_results = escalate_chunks(
+            client, escalation_model, system_blocks, contents, parsed,
+            statement_summary if complete_statement else None, output_format, requester, truncated)
+        billed.extend((escalation_model, chunk_result) for chunk_result in escalation_results)
+        chunk_results = chunk_results + escalation_results
+
+    usage = {
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "cache_creation_tokens": 0,
+        "cache_read_tokens": 0,
+        "total_tokens": 0,
+        "model": model
+    }
+    by_model: Dict[str, Dict] = {}
+    # The Message Batches share of by_model, billed at the batch discount
+    batch_by_model: Dict[str, Dict] = {}
+
+    for i, (request_model, chunk_result) in enumerate(billed):
+        result = chunk_result["text"]
+        chunk_usage = chunk_result["usage"]
+
+        # Accumulate usage stats, overall and per model
+        parts = [usage, by_model.setdefault(request_model, {
+            "prompt_tokens": 0, "completion_tokens": 0, "cache_creation_tokens": 0, "cache_read_tokens": 0})]
+        if chunk_result.get("batch"):
+            parts.append(batch_by_model.setdefault(request_model, {
+                "prompt_tokens": 0, "completion_tokens": 0, "cache_creation_tokens": 0, "cache_read_tokens": 0}))
+        for totals in parts:
+            totals["prompt_tokens"] += chunk_usage["input_tokens"]
+            totals["completion_tokens"] += chunk_usage["output_tokens"]
+            totals["cache_creation_tokens"] += chunk_usage["cache_creation_tokens"]
+            totals["cache_read_tokens"] += chunk_usage["cache_read_tokens"]
+        usage["total_tokens"] += (chunk_usage["input_tokens"] + chunk_usage["output_tokens"]
+                                  + chunk_usage["cache_creation_tokens"] + chunk_usage["cache_read_tokens"])
+
+        with open(debug_log, 'a') as f:
+            f.write(f"=== RESPONSE {i+1}/{len(billed)} ({request_model}) ===\n")
+            f.write(f"Response length: {len(result)} characters\n")
+            f.write(f"Stop reason: {chunk_result['stop_reason']}\n")
+            if chunk_result.get("truncated_at") is not None:
+                f.write(f"Truncated at char: {chunk_result['truncated_at']}\n")
+            f.write(f"Tokens - Input: {chunk_usage['input_tokens']}, Output: {chunk_usage['output_tokens']}, "
+                    f"Cache write: {chunk_usage['cache_creation_tokens']}, Cache read: {chunk_usage['cache_read_tokens']}\n\n")
+            if len(billed) == 1:
+                f.write(f"=== RAW CLAUDE RESPONSE (first 2000 chars) ===\n")
+                f.write(result[:2000])
+                f.write(f"\n\n=== END RAW RESPONSE ===\n\n")
+
+    if len(parsed) == 1:
+        # Debug: log what we got from Claude
+        chunk_data = parsed[0][0]
+        print(f"DEBUG: chunk_data type: {type(chunk_data)}", file=sys.stderr)
+        print(f"DEBUG: chunk_data keys: {chunk_data.keys() if chunk_data else 'None'}", file=sys.stderr)
+        if chunk_data and "transactions" in chunk_data:
+            print(f"DEBUG: transactions count from Claude: {len(chunk_data['transactions'])}", file=sys.stderr)
+        else:
+            print(f"DEBUG: No transactions key in chunk_data!", file=sys.stderr)
+
+    all_transactions = [txn for _, chunk_txns in parsed for txn in chunk_txns]
+    if len(parsed) > 1:
+        # Drop the copies of transactions read twice from the text overlapping chunks share
+        transactions = deduplicate_chunk_boundaries([chunk_txns for _, chunk_txns in parsed], overlap_windows)
+        with open(debug_log, 'a') as f:
+            f.write(f"=== CHUNK PROCESSING COMPLETE ===\n")
+            f.write(f"Total transactions extracted: {len(all_transactions)}\n")
+            f.write(f"After deduplication: {len(transactions)}\n")
+            f.write(f"Total tokens used: {usage['total_tokens']}\n\n")
+    else:
+        transactions = all_transactions
+
+    if escalation_model:
+        usage["escalated_chunks"] = escalated
+    if continuation_results:
+        usage["continued_chunks"] = [i + 1 for i in continued]
+        usage["continuations"] = len(continuation_results)
+    if truncated:
+        usage["truncated_chunks"] = sorted(i + 1 for i in truncated)
+    if len(by_model) > 1:
+        usage["by_model"] = by_model
+
+    # Message Batches results are billed at the batch discount; requests sent directly
+    # (batch entries that errored or expired, continuations) at full price
+    if batch_by_model:
+        usage["batch_by_model"] = batch_by_model
+        if all(r.get("batch") for r in chunk_results):
+            usage["batch"] = True
+    live = [r for r in chunk_results if not r.get("batch")]
+    if live and get_response_cache() is not None:
+        usage["response_cache_hits"] = sum(1 for r in live if r.get("response_cache_hit"))
+        usage["response_cache_misses"] = len(live) - usage["response_cache_hits"]
+
+    # Validate and clean transactions - ensure all required fields exist
+    validated = [v for v in (_validate_ai_transaction(txn) for txn in transactions) if v is not None]
+
+    # Debug log to see what was extracted
+    debug_log = "/var/www/html/crmfinity_underwriting/crmfinity-ai/storage/logs/extraction_debug.log"
+    with open(debug_log, 'a') as f:
+        f.write("=== OpenAI Extraction Results ===\n")
+        credits = [t for t in validated if t['type'] == 'credit']
+        debits = [t for t in validated if t['type'] == 'debit']
+        f.write(f"Total: {len(validated)} transactions\n")
+        f.write(f"Credits: {len(credits)}, Debits: {len(debits)}\n\n")
+        f.write("=== CREDITS ===\n")
+        for t in credits:
+            f.write(f"  {t['date']} | ${t['amount']:.2f} | {t['description'][:50]}\n")
+        f.write("\n=== DEBITS ===\n")
+        for t in debits:
+            f.write(f"  {t['date']} | ${t['amount']:.2f} | {t['description'][:50]}\n")
+        f.write(f"\nCredit Total: ${sum(t['amount'] for t in credits):.2f}\n")
+        f.write(f"Debit Total: ${sum(t['amount'] for t in debits):.2f}\n")
+
+    # Validate statement_summary balances
+    if statement_summary and validated:
+        statement_summary = validate_statement_summary(statement_summary, validated, debug_log)
+
+    return validated, usage, statement_summary
+
+
+def calculate_api_cost(usage: Dict) -> Dict:
+    model = usage.get("model", "claude-opus-4-6")
+    # Token counts billed at the batch discount, per model (all of them for a batch-only usage)
+    batch_parts = usage.get("batch_by_model") or ({model: usage} if usage.get("batch") else {})
+
+    # Chunks escalated to a larger model are billed at that model's prices
+    input_cost = output_cost = cache_write_cost = cache_read_cost = 0.0
+    breakdown = {}
+    for part_model, part in (usage.get("by_model") or {model: usage}).items():
+        pricing = PRICING.get(part_model, PRICING["claude-opus-4-6"])
+        batch_part = batch_parts.get(part_model) or {}
+
+        def tokens_cost(key: str, price: float) -> float:
+            batch_tokens = batch_part.get(key, 0)
+            return ((part.get(key, 0) - batch_tokens) + batch_tokens * MESSAGE_BATCH_DISCOUNT) / 1_000_000 * price
+
+        part_input = tokens_cost("prompt_tokens", pricing["input"])
+        part_output = tokens_cost("completion_tokens", pricing["output"])
+        part_cache = (tokens_cost("cache_creation_tokens", pricing["cache_write"]),
+                      tokens_cost("cache_read_tokens", pricing["cache_read"]))
+        input_cost += part_input
+        output_cost += part_output
+        cache_write_cost += part_cache[0]
+        cache_read_cost += part_cache[1]
+        breakdown[part_model] = {
+            "input_tokens": part["prompt_tokens"],
+            "output_tokens": part["completion_tokens"],
+            "total_cost": round(part_input + part_output + sum(part_cache), 4),
+        }
+    total_cost = input_cost + output_cost + cache_write_cost + cache_read_cost
+
+    cost = {
+        "input_tokens": usage["prompt_tokens"],
+        "output_tokens": usage["completion_tokens"],
+        "total_tokens": usage["total_tokens"],
+        "input_cost": round(input_cost, 4),
+        "output_cost": round(output_cost, 4),
+        "total_cost": round(total_cost, 4),
+        "model": model
+    }
+    # Prompt-cache accounting is only present on AI extractions
+    if "cache_creation_tokens" in usage or "cache_read_tokens" in usage:
+        cost.update({
+            "cache_creation_tokens": usage.get("cache_creation_tokens", 0),
+            "cache_read_tokens": usage.get("cache_read_tokens", 0),
+            "cache_write_cost": round(cache_write_cost, 4),
+            "cache_read_cost": round(cache_read_cost, 4),
+        })
+    if usage.get("batch"):
+        cost["batch"] = True
+    if usage.get("batch_by_model"):
+        cost["batch_tokens"] = sum(part["prompt_tokens"] + part["completion_tokens"]
+                                   for part in usage["batch_by_model"].values())
+    if usage.get("by_model"):
+        cost["by_model"] = breakdown
+    return cost
+
+
+def calculate_summary(transactions: List[Dict]) -> Dict:
+    credit_transactions = [t for t in transactions if t.get("type") == "credit"]
+    debit_transactions = [t for t in transactions if t.get("type") == "debit"]
+
+    credit_total = sum(safe_float_amount(t.get("amount", 0)) for t in credit_transactions)
+    debit_total = sum(safe_float_amount(t.get("amount", 0)) for t in debit_transactions)
+
+    return {
+        "credit_count": len(credit_transactions),
+        "debit_count": len(debit_transactions),
+        "credit_total": round(credit_total, 2),
+        "debit_total": round(debit_total, 2),
+        "net_balance": round(credit_total - debit_total, 2),
+        "total_transactions": len(transactions)
+    }
+
+
+# Known MCA lenders and their common transaction patterns
+MCA_LENDERS = {
+    "ondeck": {"name": "OnDeck Capital", "patterns": ["ondeck", "on deck"]},
+    "kabbage": {"name": "Kabbage", "patterns": ["kabbage"]},
+    "fundbox": {"name": "Fundbox", "patterns": ["fundbox"]},
+    "bluevine": {"name": "BlueVine", "patterns": ["bluevine", "blue vine"]},
+    "credibly": {"name": "Credibly", "patterns": ["credibly"]},
+    "rapid_finance": {"name": "Rapid Finance", "patterns": ["rapid finance", "rapidfinance"]},
+    "can_capital": {"name": "CAN Capital", "patterns": ["can capital", "cancapital"]},
+    "yellowstone": {"name": "Yellowstone Capital", "patterns": ["yellowstone"]},
+    "pearl_capital": {"name": "Pearl Capital", "patterns": ["pearl capital", "pearlcapital"]},
+    "square_capital": {"name": "Square Capital", "patterns": ["square capital", "sq capital"]},
+    "paypal_working": {"name": "PayPal Working Capital", "patterns": ["paypal working", "paypal wc"]},
+    "shopify_capital": {"name": "Shopify Capital", "patterns": ["shopify capital"]},
+    "clearco": {"name": "Clearco", "patterns": ["clearco", "clearbanc"]},
+    "merchant_cash": {"name": "Merchant Cash Advance", "patterns": ["merchant cash", "mca payment", "mca pmt"]},
+    "bizfi": {"name": "BizFi", "patterns": ["bizfi", "biz fi"]},
+    "forward_financing": {"name": "Forward Financing", "patterns": ["forward financing", "forwardfinancing"]},
+    "lendingtree": {"name": "LendingTree MCA", "patterns": ["lendingtree mca"]},
+    "fundkite": {"name": "Fundkite", "patterns": ["fundkite"]},
+    "libertas": {"name": "Libertas Funding", "patterns": ["libertas"]},
+    "national_funding": {"name": "National Funding", "patterns": ["national funding"]},
+    "kapitus": {"name": "Kapitus", "patterns": ["kapitus", "strategic funding"]},
+    "lendio": {"name": "Lendio", "patterns": ["lendio"]},
+    "fora_financial": {"name": "Fora Financial", "patterns": ["fora financial", "forafinancial"]},
+    "reliant_funding": {"name": "Reliant Funding", "patterns": ["reliant funding", "reliantfunding"]},
+    "greenbox": {"name": "Greenbox Capital", "patterns": ["greenbox"]},
+    "bizfund": {"name": "BizFund", "patterns": ["bizfund"]},
+    "behalf": {"name": "Behalf", "patterns": ["behalf inc", "behalf pay"]},
+    "payability": {"name": "Payability", "patterns": ["payability"]},
+    "newco_capital": {"name": "Newco Capital", "patterns": ["newco capital", "newcocapital"]},
+    "united_capital": {"name": "United Capital Source", "patterns": ["united capital source", "ucs funding"]},
+    "quickbridge": {"name": "QuickBridge", "patterns": ["quickbridge", "quick bridge"]},
+    "mantis_funding": {"name": "Mantis Funding", "patterns": ["mantis funding"]},
+    "cfgms": {"name": "CFGMS", "patterns": ["cfgms"]},
+    "credova": {"name": "Credova", "patterns": ["credova"]},
+    "liquidityaccess": {"name": "Liquidity Access", "patterns": ["liquidityaccess", "liquidity access"]},
+    "m2_equipment": {"name": "M2 Equipment Finance", "patterns": ["m2 equipment"]},
+}
+
+
+DEBT_COLLECTORS = {
+    "portfolio_recovery": {"name": "Portfolio Recovery Associates", "patterns": ["portfolio recovery", "pra group", "pra llc"]},
+    "midland_credit": {"name": "Midland Credit Management", "patterns": ["midland credit", "midland funding", "mcm llc", "encore capital"]},
+    "cavalry_portfolio": {"name": "Cavalry Portfolio Services", "patterns": ["cavalry portfolio", "cavalry spv", "cavalry spe"]},
+    "lvnv_funding": {"name": "LVNV Funding", "patterns": ["lvnv funding", "resurgent capital", "lvnv llc"]},
+    "unifund": {"name": "Unifund CCR", "patterns": ["unifund", "ccr partners"]},
+    "asset_acceptance": {"name": "Asset Acceptance", "patterns": ["asset acceptance"]},
+    "enhanced_recovery": {"name": "Enhanced Recovery Company", "patterns": ["enhanced recovery", "erc llc", " erc collections"]},
+    "convergent": {"name": "Convergent Outsourcing", "patterns": ["convergent outsourcing", "convergent collections"]},
+    "ic_system": {"name": "IC System", "patterns": ["ic system", "i.c. system"]},
+    "transworld": {"name": "Transworld Systems", "patterns": ["transworld systems", "transworld collections"]},
+    "ccs": {"name": "Credit Collection Services", "patterns": ["credit collection services", "ccs collections"]},
+    "jefferson_capital": {"name": "Jefferson Capital Systems", "patterns": ["jefferson capital"]},
+    "cach_llc": {"name": "CACH LLC", "patterns": ["cach llc", "cach collections"]},
+    "diversified": {"name": "Diversified Consultants", "patterns": ["diversified consultants", "dci collections"]},
+    "radius_global": {"name": "Radius Global Solutions", "patterns": ["radius global"]},
+    "national_recovery": {"name": "National Recovery Agency", "patterns": ["national recovery agency", "nra collections"]},
+    "alliance_one": {"name": "Alliance One Receivables", "patterns": ["alliance one receivables"]},
+    "global_credit": {"name": "Global Credit & Collection", "patterns": ["global credit & collection", "global credit and collection"]},
+    "oliphant": {"name": "Oliphant Financial", "patterns": ["oliphant financial"]},
+    "sunrise_credit": {"name": "Sunrise Credit Services", "patterns": ["sunrise credit services"]},
+    "credit_corp": {"name": "Credit Corp Solutions", "patterns": ["credit corp solutions"]},
+    "pinnacle_collections": {"name": "Pinnacle Collections", "patterns": ["pinnacle collections", "pinnacle recovery"]},
+    "nco_group": {"name": "NCO Group", "patterns": ["nco group", "nco financial"]},
+    "acs_inc": {"name": "ACS Recovery Services", "patterns": ["acs recovery"]},
+    "collection_center": {"name": "Collection Center Inc", "patterns": ["collection center inc"]},
+    "commonwealth_financial": {"name": "Commonwealth Financial", "patterns": ["commonwealth financial systems"]},
+    "accounts_receivable": {"name": "Accounts Receivable Management", "patterns": ["acct receivable mgmt", "arm collections"]},
+    "legal_collect": {"name": "Legal Collections", "patterns": ["legal collect", "attorneys collection"]},
+}
+
+
+def detect_debt_collectors(transactions: List[Dict]) -> Dict:
+    """
+    Detect debt collector payments in transactions.
+    Returns summary of detected collectors with payment frequency analysis.
+    """
+    collector_payments = {}
+
+    for txn in transactions:
+        if txn.get("type") != "debit":
+            continue
+
+        description = txn.get("description", "").lower()
+        amount = safe_float_amount(txn.get("amount", 0))
+        date = txn.get("date", "")
+
+        for collector_id, collector_info in DEBT_COLLECTORS.items():
+            for pattern in collector_info["patterns"]:
+                if pattern in description:
+                    if collector_id not in collector_payments:
+                        collector_payments[collector_id] = {
+                            "collector_name": collector_info["name"],
+                            "payments": [],
+                            "total_amount": 0,
+                            "payment_count": 0,
+                            "amounts": set(),
+                        }
+
+                    collector_payments[collector_id]["payments"].append({
+                        "date": date,
+                        "amount": amount,
+                        "description": txn.get("description", "")
+                    })
+                    collector_payments[collector_id]["total_amount"] += amount
+                    collector_payments[collector_id]["payment_count"] += 1
+                    collector_payments[collector_id]["amounts"].add(amount)
+
+                    txn["is_debt_collector"] = True
+                    txn["debt_collector_name"] = collector_info["name"]
+                    break
+
+    debt_summary = {
+        "total_collector_count": len(collector_payments),
+        "total_payments": sum(c["payment_count"] for c in collector_payments.values()),
+        "total_amount": round(sum(c["total_amount"] for c in collector_payments.values()), 2),
+        "collectors": []
+    }
+
+    for collector_id, data in collector_payments.items():
+        payments = sorted(data["payments"], key=lambda x: x["date"])
+        avg_amount = data["total_amount"] / data["payment_count"] if data["payment_count"] > 0 else 0
+
+        frequency = "unknown"
+        if len(payments) >= 2:
+            dates = []
+            for p in payments:
+                try:
+                    dates.append(datetime.strptime(p["date"], "%Y-%m-%d"))
+                except:
+                    pass
+            if len(dates) >= 2:
+                dates.sort()
+                intervals = [(dates[i+1] - dates[i]).days for i in range(len(dates)-1)]
+                avg_interval = sum(intervals) / len(intervals) if intervals else 0
+                if avg_interval <= 1.5:
+                    frequency = "daily"
+                elif avg_interval <= 3:
+                    frequency = "every_other_day"
+                elif avg_interval <= 5.5:
+                    frequency = "twice_weekly"
+                elif avg_interval <= 8:
+                    frequency = "weekly"
+                elif avg_interval <= 16:
+                    frequency = "bi_weekly"
+                elif avg_interval <= 35:
+                    frequency = "monthly"
+                else:
+                    frequency = "irregular"
+        elif len(payments) == 1:
+            frequency = "single_payment"
+
+        debt_summary["collectors"].append({
+            "collector_id": collector_id,
+            "collector_name": data["collector_name"],
+            "payment_count": data["payment_count"],
+            "total_amount": round(data["total_amount"], 2),
+            "average_payment": round(avg_amount, 2),
+            "unique_amounts": sorted([round(a, 2) for a in data["amounts"]]),
+            "frequency": frequency,
+            "frequency_label": {
+                "daily": "Daily", "every_other_day": "Every Other Day",
+                "twice_weekly": "Twice Weekly", "weekly": "Weekly",
+                "bi_weekly": "Bi-Weekly", "monthly": "Monthly",
+                "irregular": "Irregular", "single_payment": "Single Payment",
+                "unknown": "Unknown"
+            }.get(frequency, frequency),
+            "first_payment": payments[0] if payments else None,
+            "last_payment": payments[-1] if payments else None,
+            "payments": payments,
+        })
+
+    debt_summary["collectors"].sort(key=lambda x: x["total_amount"], reverse=True)
+    return debt_summary
+
+
+def detect_mca_payments(transactions: List[Dict]) -> Dict:
+    """
+    Detect MCA (Merchant Cash Advance) payments in transactions.
+    Returns summary of detected MCAs with payment frequency analysis.
+    """
+    mca_payments = {}  # Keyed by lender identifier
+
+    for txn in transactions:
+        if txn.get("type") != "debit":
+            continue
+
+        description = txn.get("description", "").lower()
+        amount = safe_float_amount(txn.get("amount", 0))
+        date = txn.get("date", "")
+
+        # Check against known MCA lenders
+        for lender_id, lender_info in MCA_LENDERS.items():
+            for pattern in lender_info["patterns"]:
+                if pattern in description:
+                    if lender_id not in mca_payments:
+                        mca_payments[lender_id] = {
+                            "lender_name": lender_info["name"],
+                            "payments": [],
+                            "total_amount": 0,
+                            "payment_count": 0,
+                            "amounts": set(),
+                        }
+
+                    mca_payments[lender_id]["payments"].append({
+                        "date": date,
+                        "amount": amount,
+                        "description": txn.get("description", "")
+                    })
+                    mca_payments[lender_id]["total_amount"] += amount
+                    mca_payments[lender_id]["payment_count"] += 1
+                    mca_payments[lender_id]["amounts"].add(amount)
+
+                    # Mark the transaction as MCA
+                    txn["is_mca_payment"] = True
+                    txn["mca_lender"] = lender_info["name"]
+                    break
+
+    # Calculate frequency and format results
+    mca_summary = {
+        "total_mca_count": len(mca_payments),
+        "total_mca_payments": sum(m["payment_count"] for m in mca_payments.values()),
+        "total_mca_amount": round(sum(m["total_amount"] for m in mca_payments.values()), 2),
+        "lenders": []
+    }
+
+    for lender_id, data in mca_payments.items():
+        payments = sorted(data["payments"], key=lambda x: x["date"])
+
+        # Calculate payment frequency
+        frequency = "unknown"
+        avg_amount = data["total_amount"] / data["payment_count"] if data["payment_count"] > 0 else 0
+
+        if len(payments) >= 2:
+            # Parse dates and calculate average days between payments
+            dates = []
+            for p in payments:
+                try:
+                    dates.append(datetime.strptime(p["date"], "%Y-%m-%d"))
+                except:
+                    pass
+
+            if len(dates) >= 2:
+                dates.sort()
+                intervals = [(dates[i+1] - dates[i]).days for i in range(len(dates)-1)]
+                avg_interval = sum(intervals) / len(intervals) if intervals else 0
+
+                # Determine frequency based on average interval
+                if avg_interval <= 1.5:
+                    frequency = "daily"
+                elif avg_interval <= 3:
+                    frequency = "every_other_day"
+                elif avg_interval <= 5.5:
+                    frequency = "twice_weekly"
+                elif avg_interval <= 8:
+                    frequency = "weekly"
+                elif avg_interval <= 16:
+                    frequency = "bi_weekly"
+                elif avg_interval <= 35:
+                    frequency = "monthly"
+                else:
+                    frequency = "irregular"
+        elif len(payments) == 1:
+            frequency = "single_payment"
+
+        # Convert amounts set to list for JSON serialization
+        unique_amounts = sorted(list(data["amounts"]))
+
+        lender_summary = {
+            "lender_id": lender_id,
+            "lender_name": data["lender_name"],
+            "payment_count": data["payment_count"],
+            "total_amount": round(data["total_amount"], 2),
+            "average_payment": round(avg_amount, 2),
+            "unique_amounts": [round(a, 2) for a in unique_amounts],
+            "frequency": frequency,
+            "frequency_label": {
+                "daily": "Daily",
+                "every_other_day": "Every Other Day",
+                "twice_weekly": "Twice Weekly",
+                "weekly": "Weekly",
+                "bi_weekly": "Bi-Weekly",
+                "monthly": "Monthly",
+                "irregular": "Irregular",
+                "single_payment": "Single Payment",
+                "unknown": "Unknown"
+            }.get(frequency, frequency),
+            "first_payment": payments[0] if payments else None,
+            "last_payment": payments[-1] if payments else None,
+        }
+
+        mca_summary["lenders"].append(lender_summary)
+
+    # Sort lenders by total amount (highest first)
+    mca_summary["lenders"].sort(key=lambda x: x["total_amount"], reverse=True)
+
+    return mca_summary
+
+
+# ─── Hybrid extraction (deterministic + AI for uncovered pages) ──────────────
+
+# A transaction-looking line: starts with a date (MM/DD, MM-DD, Mon DD) and carries an amount
+_HYBRID_DATE_RE = re.compile(
+    r'^\s*(?:\d{1,2}[/-]\d{1,2}(?:[/-]\d{2,4})?'
+    r'|(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.?\s+\d{1,2})\b',
+    re.I,
+)
+_HYBRID_AMOUNT_RE = re.compile(r'(?<![\d.])\d{1,3}(?:,\d{3})*\.\d{2}(?!\d)|(?<![\d.,])\d+\.\d{2}(?!\d)')
+
+# A page counts as covered when this share of its transaction lines matched a parsed amount
+HYBRID_COVERAGE_THRESHOLD = 0.8
+
+
+def hybrid_enabled() -> bool:
+    """Hybrid mode is opt-in: BANK_EXTRACTOR_HYBRID=1."""
+    return os.environ.get("BANK_EXTRACTOR_HYBRID", "0") == "1"
+
+
+def page_transaction_coverage(page_text: str, parsed_amounts: set) -> Tuple[int, int]:
+    """
+    (matched, total) transaction-looking lines on a page. A line is matched when
+    any amount on it (transaction or running balance) was parsed deterministically.
+    """
+    matched = total = 0
+    for line in page_text.split('\n'):
+        if not _HYBRID_DATE_RE.match(line):
+            continue
+        amounts = _HYBRID_AMOUNT_RE.findall(line)
+        if not amounts:
+            continue
+        total += 1
+        if any(round(_det_parse_amount(a), 2) in parsed_amounts for a in amounts):
+            matched += 1
+    return matched, total
+
+
+def uncovered_pages(page_texts: List[str], transactions: List[Dict]) -> List[int]:
+    """0-based indexes of pages whose transaction lines the deterministic result does not cover."""
+    parsed_amounts = set()
+    for t in transactions:
+        parsed_amounts.add(round(safe_float_amount(t.get("amount", 0)), 2))
+        if t.get("ending_balance") is not None:
+            parsed_amounts.add(round(safe_float_amount(t["ending_balance"]), 2))
+
+    missing = []
+    for i, text in enumerate(page_texts):
+        matched, total = page_transaction_coverage(text, parsed_amounts)
+        if total and matched / total < HYBRID_COVERAGE_THRESHOLD:
+            missing.append(i)
+    return missing
+
+
+def merge_hybrid_transactions(det_txns: List[Dict], ai_txns: List[Dict],
+                              ai_page_texts: List[str]) -> Tuple[List[Dict], int]:
+    """
+    Deterministic transactions plus the AI ones. Returns (merged, AI transactions dropped).
+
+    AI may re-read a row that is not on its pages (from the page 1 header it gets as
+    context). An AI transaction is dropped as such a repeat only when it matches an
+    unclaimed deterministic one (same date, amount and type) and AI returned its
+    amount more often than the pages sent to AI (ai_page_texts) print it on dated
+    lines. A recurring same-day fee or transfer printed on those pages is kept.
+    """
+    printed = Counter()
+    for text in ai_page_texts:
+        for line in text.split('\n'):
+            if _HYBRID_DATE_RE.match(line):
+                for amount in {round(_det_parse_amount(a), 2) for a in _HYBRID_AMOUNT_RE.findall(line)}:
+                    printed[amount] += 1
+    returned = Counter(round(safe_float_amount(t.get("amount", 0)), 2) for t in ai_txns)
+    surplus = {amount: count - printed[amount] for amount, count in returned.items() if count > printed[amount]}
+
+    remaining = defaultdict(int)
+    for t in det_txns:
+        remaining[(t.get("date"), round(safe_float_amount(t.get("amount", 0)), 2), t.get("type"))] += 1
+
+    merged = list(det_txns)
+    dropped = 0
+    for t in ai_txns:
+        key = (t.get("date"), round(safe_float_amount(t.get("amount", 0)), 2), t.get("type"))
+        if remaining[key] > 0 and surplus.get(key[1], 0) > 0:
+            remaining[key] -= 1
+            surplus[key[1]] -= 1
+            dropped += 1
+            continue
+        merged.append(t)
+    merged.sort(key=lambda t: t.get("date") or '')
+    return merged, dropped
+
+
+def run_hybrid_extraction(page_texts: List[str], det_txns: List[Dict], api_key: str, model: str,
+                          corrections: List[Dict]) -> Tuple[List[Dict], Dict, Optional[Dict], List[int]]:
+    """
+    Keep a partial deterministic result and send only the pages it does not cover
+    to Claude. Returns (transactions, usage, ai_statement_summary, ai_pages) with
+    1-based ai_pages.
+    """
+    missing = uncovered_pages(page_texts, det_txns)
+    if not missing:
+        print(f"✓ Hybrid: deterministic result covers every page ({len(det_txns)} transactions)", file=sys.stderr)
+        return list(det_txns), {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "model": "none"}, None, []
+
+    ai_pages = [i + 1 for i in missing]
+    print(f"Hybrid: {len(det_txns)} deterministic transactions, sending pages "
+          f"{', '.join(map(str, ai_pages))} of {len(page_texts)} to AI", file=sys.stderr)
+
+    # Boilerplate is detected across the whole statement, then only the gaps are sent
+    ai_page_texts, boilerplate_removed = prepare_ai_pages(page_texts)
+    parts = []
+    if 0 not in missing and page_texts:
+        # Header of page 1 gives Claude the bank, account and statement period for the year
+        header = '\n'.join(page_texts[0].split('\n')[:12])
+        parts.append(f"Statement header (context only - its transactions were already extracted):\n{header}")
+    for i in missing:
+        parts.append(f"=== PAGE {i + 1} ===\n{ai_page_texts[i]}")
+
+    ai_text, page_starts = join_pages(parts)
+    ai_txns, usage, ai_summary = extract_transactions_with_ai(ai_text, api_key, model, corrections,
+                                                              complete_statement=False, page_starts=page_starts)
+    usage["boilerplate_tokens_removed"] = boilerplate_removed
+    if corrections:
+        ai_txns = apply_corrections(ai_txns, corrections)
+
+    merged, dropped = merge_hybrid_transactions(det_txns, ai_txns, [ai_page_texts[i] for i in missing])
+    usage["hybrid_duplicates_dropped"] = dropped
+    print(f"✓ Hybrid: {len(det_txns)} deterministic + {len(merged) - len(det_txns)} AI transactions"
+          f"{f' ({dropped} AI re-reads of deterministic rows dropped)' if dropped else ''}", file=sys.stderr)
+    return merged, usage, ai_summary, ai_pages
+
+
+# ─── Boilerplate stripping (AI input pre-pass) ───────────────────────────────
+#
+# Page furniture costs input tokens on every AI-path statement without adding a
+# transaction: headers and footers repeated on each page, page numbers, contact and
+# legal lines, and non-transaction sections such as daily balance tables and
+# disclosures. Lines that look like transactions, section and column headers,
+# balances, totals and dated statement-period lines are kept.
+
+# Page furniture only. The bank-specific *_SKIP_RE patterns are not reused: they also
+# skip column headers and "Total" lines, which the deterministic parsers can do
+# without but Claude reads for context.
+_BOILERPLATE_LINE_RE = re.compile(
+    r'^(?:Page:?\s*\d+(?:\s*of\s*\d+)?$|§\s*PAGE|-*\s*continued(?:\s+on\s+next\s+page)?\.?$|'
+    r'Member\s+FDIC|Equal\s+Housing\s+(?:Lender|Opportunity)|'
+    r'This\s+page\s+(?:is\s+)?intentionally\s+left\s+blank|'
+    r'Customer\s+(?:Call|Service)\s+Center|For\s+inquiries|\(\d{3}\)\s*\d{3}-\d{4}|'
+    r'IMPORTANT\s+INFORMATION|FOR\s+ACCOUNT\s+BALANCING|BALANCING\s+YOUR\s+ACCOUNT|'
+    r'ADDRESS\s+CHANGES|CHANGE\s+OF\s+ADDRESS|ELECTRONIC\s+TRANSFER\s+RIGHTS)',
+    re.I,
+)
+# The summary sections carry the beginning/ending balances Claude reports, so keep them
+_BOILERPLATE_SECTION_MARKERS = {m for m in _NON_TXN_SECTION_MARKERS if 'summary' not in m}
+_BOILERPLATE_YEAR_RE = re.compile(r'\b(?:19|20)\d{2}\b')
+_BOILERPLATE_WORD_RE = re.compile(r'[A-Za-z]{3,}')
+_BOILERPLATE_PAGE_NO_RE = re.compile(r'\bpage:?\s*\d+\s*of\s*\d+')
+
+
+def boilerplate_enabled() -> bool:
+    """Boilerplate stripping before AI extraction (BANK_EXTRACTOR_STRIP_BOILERPLATE, default on)."""
+    return os.environ.get("BANK_EXTRACTOR_STRIP_BOILERPLATE", "1") != "0"
+
+
+def _boilerplate_protected(line: str) -> bool:
+    """Lines the pre-pass must never drop."""
+    stripped = line.strip()
+    if stripped.startswith('==='):
+        return True  # OCR page markers
+    has_amount = bool(_HYBRID_AMOUNT_RE.search(stripped))
+    if has_amount and _HYBRID_DATE_RE.match(stripped):
+        return True
+    if any(pattern.match(stripped) for pattern, _, _ in _SECTION_HEADER_PATTERNS):
+        return True
+    lower = stripped.lower()
+    if has_amount and 'balance' in lower:
+        return True
+    return any(marker in lower for marker in _CREDIT_SECTION_MARKERS | _DEBIT_SECTION_MARKERS)
+
+
+def _boilerplate_section_start(line: str) -> bool:
+    """A short heading line such as "DAILY ENDING BALANCE" or "Disclosures"."""
+    words = re.sub(r'[^a-z& ]+', ' ', line.lower()).split()
+    heading = ' '.join(words)
+    return any(heading.startswith(m) and len(heading) <= len(m) + 12 for m in _BOILERPLATE_SECTION_MARKERS)
+
+
+def strip_boilerplate(page_texts: List[str]) -> Tuple[List[str], int]:
+    """
+    Drop boilerplate lines from each page before the text goes to Claude. Returns
+    (page_texts, estimated_tokens_removed); the page list keeps its length and order.
+
+    - A line repeated on at least half the pages (page numbers ignored, so
+      "Page 2 of 6" counts), at most twice per page, is kept on its first page only.
+    - Page numbers, contact and legal lines (_BOILERPLATE_LINE_RE) are dropped,
+      except dated statement-period lines that give Claude the year.
+    - Lines wrapped under a transaction (its description continued) are kept.
+    - A daily balance, message or disclosure section is dropped with its heading,
+      date/amount rows included, until the next section header or a row with a
+      transaction description; it may run on across a page break.
+    """
+    pages = [text.split('\n') if text else [] for text in page_texts]
+    min_pages = max(2, (len(pages) + 1) // 2)
+
+    def key(line: str) -> str:
+        return _BOILERPLATE_PAGE_NO_RE.sub('page # of #', ' '.join(line.split()).lower())
+
+    # Page furniture shows up about once per page; a pattern that recurs many times on
+    # a page (e.g. a merchant's city on description continuation lines) is content
+    seen_on: Dict[str, set] = defaultdict(set)
+    occurrences: Dict[str, int] = defaultdict(int)
+    for i, lines in enumerate(pages):
+        for line in lines:
+            if line.strip():
+                seen_on[key(line)].add(i)
+                occurrences[key(line)] += 1
+    repeated = {k for k, on in seen_on.items() if len(on) >= min_pages and occurrences[k] <= 2 * len(on)}
+
+    stripped_pages = []
+    removed_lines = []
+    kept_repeats = set()
+    in_section = False
+    for lines in pages:
+        kept = []
+        continuation = False
+        for line in lines:
+            stripped = line.strip()
+            if not stripped:
+                kept.append(line)
+                continuation = False
+                continue
+            protected = _boilerplate_protected(stripped)
+            if protected and not _HYBRID_AMOUNT_RE.search(stripped):
+                in_section = False  # a section header ends a skipped section
+            if in_section and _HYBRID_DATE_RE.match(stripped) and _HYBRID_AMOUNT_RE.search(stripped) \
+                    and _BOILERPLATE_WORD_RE.search(stripped) and 'balance' not in stripped.lower():
+                in_section = False  # a described, dated amount is a transaction: the section is over
+            if _boilerplate_section_start(stripped):
+                in_section = True
+                drop = True
+            elif in_section:
+                drop = True  # balance rows go with their heading
+            elif protected:
+                drop = False
+            elif continuation and not (_BOILERPLATE_PAGE_NO_RE.search(stripped.lower())
+                                       or _BOILERPLATE_LINE_RE.match(stripped)):
+                drop = False  # wrapped description of the transaction above
+            elif key(line) in repeated:
+                drop = key(line) in kept_repeats
+                kept_repeats.add(key(line))
+            else:
+                drop = bool(_BOILERPLATE_LINE_RE.match(stripped)) and not _BOILERPLATE_YEAR_RE.search(stripped)
+            if drop:
+                removed_lines.append(line)
+            else:
+                kept.append(line)
+            if protected or not continuation or drop:
+                continuation = (not drop and not in_section
+                                and bool(_HYBRID_DATE_RE.match(stripped) and _HYBRID_AMOUNT_RE.search(stripped)))
+        stripped_pages.append(re.sub(r'\n{3,}', '\n\n', '\n'.join(kept)))
+
+    return stripped_pages, estimate_tokens('\n'.join(removed_lines))
+
+
+def prepare_ai_pages(page_texts: List[str]) -> Tuple[List[str], int]:
+    """strip_boilerplate when enabled, with a log line; otherwise the pages unchanged."""
+    if not boilerplate_enabled():
+        return list(page_texts), 0
+    stripped, removed = strip_boilerplate(page_texts)
+    before = estimate_tokens("\n\n".join(t for t in page_texts if t))
+    if removed:
+        print(f"✂️  Boilerplate: removed ~{removed} of ~{before} input tokens before AI extraction", file=sys.stderr)
+    return stripped, removed
+
+
+# ─── Result cache (content-addressed, on disk) ───────────────────────────────
+
+class _DiskLRUCache:
+    """
+    Directory of JSON files keyed by hex digest, bounded by total size.
+    File mtime is the recency stamp: a hit touches the entry, and writes evict
+    the least recently used entries until the directory fits in max_bytes.
+    Writes are atomic (temp file + rename) so concurrent workers never see a
+    partial entry.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict]:
+        path = self._path(key)
+        try:
+            with open(path, 'r') as f:
+                value = json.load(f)
+            os.utime(path, None)
+            return value
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: str, value: Dict) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(value, f)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        self._evict()
+
+    def _evict(self) -> None:
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+            total += st.st_size
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(os.path.join(self.directory, name))
+                total -= size
+            except OSError:
+                pass
+
+
+_RESULT_CACHE: Optional[_DiskLRUCache] = None
+
+
+def get_result_cache() -> Optional[_DiskLRUCache]:
+    """
+    Extraction result cache, configured from the environment:
+      BANK_EXTRACTOR_CACHE=0         disable
+      BANK_EXTRACTOR_CACHE=refresh   always extract, then store the fresh result (reprocessing)
+      BANK_EXTRACTOR_CACHE_DIR       location (default storage/app/extraction_cache)
+      BANK_EXTRACTOR_CACHE_MAX_MB    size bound (default 512)
+    """
+    global _RESULT_CACHE
+    if os.environ.get("BANK_EXTRACTOR_CACHE", "1") == "0":
+        return None
+    if _RESULT_CACHE is None:
+        directory = os.environ.get("BANK_EXTRACTOR_CACHE_DIR") or os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "extraction_cache")
+        max_mb = float(os.environ.get("BANK_EXTRACTOR_CACHE_MAX_MB", "512"))
+        try:
+            _RESULT_CACHE = _DiskLRUCache(directory, int(max_mb * 1024 * 1024))
+        except OSError as e:
+            print(f"⚠️  Result cache disabled: {e}", file=sys.stderr)
+            return None
+    return _RESULT_CACHE
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def extraction_settings(model: str) -> Dict:
+    """The environment settings that change extraction output for `model`."""
+    return {
+        "hybrid": hybrid_enabled(),
+        "ocr_renderer": ocr_renderer(),
+        "ai_format": ai_output_format(),
+        "strip_boilerplate": boilerplate_enabled(),
+        "chunk_tokens": chunk_token_budget(),
+        "max_continuations": max_continuations(),
+        "escalation_model": chunk_escalation_model(model),
+    }
+
+
+def extraction_cache_key(pdf_hash: str, model: str, corrections: List[Dict]) -> str:
+    """Cache key over (PDF bytes, extractor version, model, settings, corrections fingerprint)."""
+    corrections_fp = hashlib.sha256(
+        json.dumps(corrections, sort_keys=True, default=str).encode()
+    ).hexdigest()
+    settings = json.dumps(extraction_settings(model), sort_keys=True)
+    material = f"{pdf_hash}|{EXTRACTOR_VERSION}|{model}|{settings}|{corrections_fp}"
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+def _result_cacheable(result: Dict) -> bool:
+    """Only complete, successful extractions are worth serving again."""
+    metadata = result.get("metadata") or {}
+    return bool(result.get("success") and result.get("transactions")
+                and not metadata.get("ai_unavailable") and not metadata.get("truncated_chunks"))
+
+
+def run_extraction(pdf_path: str, api_key: str, model: str = "claude-haiku-4-5",
+                   corrections: List[Dict] = None) -> Dict:
+    """
+    Run the full extraction pipeline for one PDF and return the result dict that the
+    CLI prints as JSON. Errors are returned as {"success": False, "error": ...} so the
+    same function can back the CLI, the socket server and batch runs. When Claude is
+    unavailable and a failed deterministic parser's partial result is all there is,
+    that result comes back with success False, partial True and metadata.ai_unavailable.
+
+    Successful results are cached on disk by PDF content hash, so re-analysing an
+    identical upload skips the PDF and the API entirely. A cached result reports
+    zero API cost and metadata.cache_hit = True. Results with no transactions or
+    with answers still cut off after continuation are not cached.
+    """
+    corrections = corrections or []
+    cache = get_result_cache()
+    if cache is None or not os.path.exists(pdf_path):
+        return _run_extraction_uncached(pdf_path, api_key, model, corrections)
+
+    try:
+        cache_key = extraction_cache_key(file_sha256(pdf_path), model, corrections)
+    except OSError as e:
+        return {"success": False, "error": str(e)}
+
+    refresh = os.environ.get("BANK_EXTRACTOR_CACHE") == "refresh"
+    cached = None if refresh else cache.get(cache_key)
+    if cached is not None:
+        print(f"✓ Result cache hit ({cache_key[:12]})", file=sys.stderr)
+        cached["api_cost"] = calculate_api_cost({
+            "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0,
+            "model": (cached.get("api_cost") or {}).get("model", model),
+        })
+        metadata = cached.setdefault("metadata", {})
+        metadata["pdf_file"] = os.path.basename(pdf_path)
+        metadata["cache_hit"] = True
+        return cached
+
+    result = _run_extraction_uncached(pdf_path, api_key, model, corrections)
+    if _result_cacheable(result):
+        result.setdefault("metadata", {})["cache_hit"] = False
+        try:
+            cache.put(cache_key, result)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"⚠️  Could not write result cache: {e}", file=sys.stderr)
+    return result
+
+
+def _run_extraction_uncached(pdf_path: str, api_key: str, model: str,
+                             corrections: List[Dict]) -> Dict:
+    """The extraction pipeline proper; see run_extraction."""
+    doc: Optional[StatementDocument] = None
+
+    try:
+        # One shared document for text extraction and every deterministic strategy
+        doc = StatementDocument(pdf_path)
+        attach = getattr(_AI_REQUESTER, "attach", None)
+        if attach is not None:
+            attach(doc)
+
+        # Extract text from PDF
+        pdf_text, pages, ocr_used = extract_text_from_pdf(doc)
+        hybrid_pages: Optional[List[int]] = None
+        ai_unavailable: Optional[str] = None
+
+        # Extract expected totals from statement header for validation
+        # expected_totals = extract_statement_totals(pdf_text)
+
+        # Pre-process check tables to extract individual check transactions
+        # TEMPORARILY DISABLED - causing issues with PNC format
+        # pdf_text = preprocess_check_tables(pdf_text)
+
+        # TRY DETERMINISTIC EXTRACTION FIRST (Option 1 - programmatic table parsing)
+        print("Attempting deterministic table extraction...", file=sys.stderr)
+        det_partials: Dict[str, List[Dict]] = {}
+        transactions_det, det_success, det_label = extract_transactions_deterministic(doc, det_partials)
+
+        # Map strategy label → bank name (for strategies that identify a specific bank)
+        _DET_BANK_NAMES = {
+            "section markers":  "JPMorgan Chase",   # *start*/*end* markers are Chase/JPMorgan-specific
+            "U.S. Bank":        "U.S. Bank",
+            "FirstLight FCU":   "FirstLight FCU",
+            "BOKF":             "Bank of Texas",
+            "CNBank":           "Community Bank NA",
+            "MichiganFirst":    "Michigan First Credit Union",
+            "M&T Bank":         "M&T Bank",
+            "BofA Business":    "Bank of America",
+            "Truist Business":  "Truist Bank",
+            "Firstrust":        "Firstrust Bank",
+            "Citizens Bank":    "Citizens Bank, N.A.",
+        }
+        det_bank_name = _DET_BANK_NAMES.get(det_label) if det_label else None
+
+        # Hybrid mode: a deterministic result that leaves pages uncovered (or the best
+        # partial result of a failed cascade) is kept, and only the gaps go to AI
+        hybrid_base: Optional[Tuple[str, List[Dict]]] = None
+        if hybrid_enabled():
+            if det_success and transactions_det:
+                page_texts, _ = extract_pages_from_pdf(doc)
+                if uncovered_pages(page_texts, transactions_det):
+                    hybrid_base = (det_label, transactions_det)
+            elif det_partials:
+                hybrid_base = max(det_partials.items(), key=lambda item: len(item[1]))
+
+        if hybrid_base is not None:
+            det_label, base_txns = hybrid_base
+            det_bank_name = _DET_BANK_NAMES.get(det_label)
+            page_texts, _ = extract_pages_from_pdf(doc)
+            try:
+                transactions, usage, ai_summary, hybrid_pages = run_hybrid_extraction(
+                    page_texts, base_txns, api_key, model, corrections)
+                extraction_method = "hybrid"
+            except ClaudeUnavailableError as e:
+                # Circuit open: the deterministic part is better than failing the job
+                print(f"⚠️  {e}; keeping {len(base_txns)} deterministic transactions", file=sys.stderr)
+                ai_unavailable = str(e)
+                transactions, ai_summary = list(base_txns), None
+                usage = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "model": "none"}
+                extraction_method = "deterministic"
+            statement_summary = _extract_statement_summary(pdf_text) or ai_summary
+        elif det_success and len(transactions_det) > 0:
+            # Deterministic extraction succeeded - use these results
+            print(f"✓ Deterministic extraction successful: {len(transactions_det)} transactions", file=sys.stderr)
+            transactions = transactions_det
+            usage = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "model": "none"}  # No AI usage
+            extraction_method = "deterministic"
+
+            # Extract statement summary (beginning/ending/average balance) from PDF text.
+            # _extract_statement_summary uses labeled-line patterns (no AI cost).
+            det_summary = _extract_statement_summary(pdf_text)
+
+            # If we found a beginning balance but no explicit ADB, compute it from
+            # the transaction list so downstream analytics have a useful number.
+            if det_summary.get('beginning_balance') is not None:
+                if det_summary.get('average_daily_balance') is None:
+                    computed_adb = _compute_adb_from_transactions(
+                        transactions_det, det_summary['beginning_balance']
+                    )
+                    if computed_adb is not None:
+                        det_summary['average_daily_balance'] = computed_adb
+                        print(f"  Computed ADB: ${computed_adb:,.2f}", file=sys.stderr)
+
+            statement_summary = det_summary if det_summary else None
+        else:
+            # Fallback to AI extraction
+            print("Deterministic extraction failed or returned no transactions. Falling back to AI extraction...", file=sys.stderr)
+            page_texts, _ = extract_pages_from_pdf(doc)
+            ai_page_texts, boilerplate_removed = prepare_ai_pages(page_texts)
+            ai_text, page_starts = join_pages(ai_page_texts)
+            try:
+                transactions, usage, statement_summary = extract_transactions_with_ai(ai_text, api_key, model, corrections,
+                                                                                      page_starts=page_starts)
+                usage["boilerplate_tokens_removed"] = boilerplate_removed
+                extraction_method = "ai"
+            except ClaudeUnavailableError as e:
+                if not det_partials:
+                    raise
+                # Circuit open: fall back to the best partial deterministic result
+                det_label, transactions = max(det_partials.items(), key=lambda item: len(item[1]))
+                det_bank_name = _DET_BANK_NAMES.get(det_label)
+                print(f"⚠️  {e}; using {len(transactions)} transactions from the {det_label} parser", file=sys.stderr)
+                ai_unavailable = str(e)
+                usage = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "model": "none"}
+                extraction_method = "deterministic"
+                statement_summary = _extract_statement_summary(pdf_text) or None
+
+        # Apply corrections post-processing (double-check) - only for AI extraction
+        # (hybrid mode applies them to its AI transactions inside run_hybrid_extraction)
+        if corrections and extraction_method == "ai":
+            transactions = apply_corrections(transactions, corrections)
+            corrections_applied = len([t for t in transactions if t.get('corrected_by_learning')])
+        elif extraction_method == "hybrid":
+            corrections_applied = len([t for t in transactions if t.get('corrected_by_learning')])
+        else:
+            corrections_applied = 0
+
+        # Calculate costs and summary
+        api_cost = calculate_api_cost(usage)
+        summary = calculate_summary(transactions)
+
+        # MCA and debt-collector detection run here, once, over the final merged list -
+        # not per chunk while responses stream in: they group each lender's or
+        # collector's payments across the whole statement to count them and infer
+        # the payment frequency, which a partial list would get wrong
+
+        # Detect MCA payments
+        mca_summary = detect_mca_payments(transactions)
+
+        # Detect debt collector payments
+        debt_summary = detect_debt_collectors(transactions)
+
+        # Validate extracted totals against statement header
+        validation_warnings = []
+
+        # expected_credits = expected_totals.get('total_credits') or expected_totals.get('total_deposits')
+        # expected_debits = expected_totals.get('total_debits') or expected_totals.get('total_withdrawals')
+        expected_credits = None
+        expected_debits = None
+
+        if expected_credits:
+            credit_diff = abs(expected_credits - summary['credit_total'])
+            if credit_diff > 1.00:  # Allow $1 rounding tolerance
+                validation_warnings.append({
+                    "type": "credit_mismatch",
+                    "severity": "error" if credit_diff > 100 else "warning",
+                    "message": f"Credits mismatch: Expected ${expected_credits:,.2f} from statement header, but extracted ${summary['credit_total']:,.2f}",
+                    "difference": round(credit_diff, 2),
+                    "expected": round(expected_credits, 2),
+                    "extracted": round(summary['credit_total'], 2),
+                    "suggestion": "Some credit transactions may be misclassified as debits. Review transactions in the 'Deposits/Credits' section."
+                })
+
+        if expected_debits:
+            debit_diff = abs(expected_debits - summary['debit_total'])
+            if debit_diff > 1.00:  # Allow $1 rounding tolerance
+                validation_warnings.append({
+                    "type": "debit_mismatch",
+                    "severity": "error" if debit_diff > 100 else "warning",
+                    "message": f"Debits mismatch: Expected ${expected_debits:,.2f} from statement header, but extracted ${summary['debit_total']:,.2f}",
+                    "difference": round(debit_diff, 2),
+                    "expected": round(expected_debits, 2),
+                    "extracted": round(summary['debit_total'], 2),
+                    "suggestion": "Some debit transactions may be misclassified as credits. Review transactions in the 'Withdrawals/Debits' section."
+                })
+
+        # Output JSON result
+        result = {
+            "success": True,
+            "summary": summary,
+            "api_cost": api_cost,
+            "transactions": transactions,
+            "mca_analysis": mca_summary,
+            "debt_collector_analysis": debt_summary,
+            "statement_summary": statement_summary,  # Beginning/ending balance from statement
+            "validation": {
+                "expected_credits": round(expected_credits, 2) if expected_credits else None,
+                "expected_debits": round(expected_debits, 2) if expected_debits else None,
+                "warnings": validation_warnings,
+                "has_warnings": len(validation_warnings) > 0
+            },
+            "metadata": {
+                "pdf_file": os.path.basename(pdf_path),
+                "pages": pages,
+                "extraction_date": datetime.now().isoformat(),
+                "extraction_method": extraction_method,
+                "ocr_used": ocr_used,
+                "model_used": model if extraction_method == "ai" or hybrid_pages else None,
+                "bank_name": det_bank_name if extraction_method in ("deterministic", "hybrid") else None,
+                "characters_extracted": len(pdf_text),
+                "corrections_available": len(corrections),
+                "corrections_applied": corrections_applied
+            }
+        }
+        if extraction_method == "hybrid":
+            result["metadata"]["hybrid_strategy"] = det_label
+            result["metadata"]["hybrid_ai_pages"] = hybrid_pages
+            result["metadata"]["hybrid_duplicates_dropped"] = usage.get("hybrid_duplicates_dropped", 0)
+        if "boilerplate_tokens_removed" in usage:
+            result["metadata"]["boilerplate_tokens_removed"] = usage["boilerplate_tokens_removed"]
+        if ai_unavailable:
+            # A partial deterministic parse is not a successful extraction: callers must
+            # retry it once the API is back, and it must never be cached
+            result["metadata"]["ai_unavailable"] = ai_unavailable
+            result["success"] = False
+            result["partial"] = True
+            result["error"] = (f"AI extraction unavailable ({ai_unavailable}); only a partial result "
+                               f"of {len(transactions)} transactions from the deterministic parser is included")
+        if usage.get("continued_chunks"):
+            result["metadata"]["continued_chunks"] = usage["continued_chunks"]
+            result["metadata"]["continuations"] = usage["continuations"]
+        if usage.get("truncated_chunks"):
+            # Answers still cut off after continuation: transactions may be missing
+            result["metadata"]["truncated_chunks"] = usage["truncated_chunks"]
+        if usage.get("escalated_chunks"):
+            result["metadata"]["escalated_chunks"] = usage["escalated_chunks"]
+            result["metadata"]["escalation_model"] = chunk_escalation_model(model)
+        if "response_cache_hits" in usage:
+            result["metadata"]["response_cache"] = {
+                "hits": usage["response_cache_hits"],
+                "misses": usage["response_cache_misses"],
+            }
+
+        return result
+
+    except AIRequestsDeferred:
+        # Message Batches mode: the batch runner resumes this statement later
+        raise
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e)
+        }
+    finally:
+        if doc is not None:
+            doc.close()
+
+
+# ─── Server mode (persistent extractor) ──────────────────────────────────────
+#
+# Protocol: one JSON request per line on a Unix socket, one JSON result per line back.
+#   {"pdf_path": "...", "api_key": "...", "model": "claude-haiku-4-5", "corrections": [...]}
+# The response is exactly what the CLI prints for the same arguments.
+
+class _ExtractionRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for raw in self.rfile:
+            raw = raw.strip()
+            if not raw:
+                continue
+            try:
+                request = json.loads(raw)
+                if not isinstance(request, dict) or not request.get("pdf_path"):
+                    raise ValueError("Request must be a JSON object with a 'pdf_path' key")
+                corrections = request.get("corrections") or []
+                if isinstance(corrections, str):
+                    corrections = json.loads(corrections) if corrections.strip() else []
+                result = run_extraction(
+                    request["pdf_path"],
+                    request.get("api_key") or os.environ.get("ANTHROPIC_API_KEY", ""),
+                    request.get("model") or "claude-haiku-4-5",
+                    corrections,
+                )
+            except Exception as e:
+                result = {"success": False, "error": str(e)}
+            self.wfile.write((json.dumps(result) + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+
+class _ExtractionServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(socket_path: str) -> None:
+    """
+    Run the extractor as a long-lived process listening on a Unix socket, so queue
+    workers stop paying interpreter start-up, library imports and API client setup
+    for every statement.
+    """
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    server = _ExtractionServer(socket_path, _ExtractionRequestHandler)
+    os.chmod(socket_path, 0o660)
+    print(f"Extractor server listening on {socket_path} (pid {os.getpid()})", file=sys.stderr)
+
+    def _shutdown(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, _shutdown)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+# ─── Message Batches (bulk reprocessing at the batch discount) ───────────────
+#
+# A batch run with --message-batches extracts every statement once with a
+# _BatchRequester installed as _AI_REQUESTER. Instead of calling Claude it raises
+# AIRequestsDeferred with the Message Batches requests it needs; the runner submits
+# the requests of all statements together, polls until the job has ended, and runs
+# the deferred statements again with the results keyed by custom_id.
+
+MESSAGE_BATCH_MAX_REQUESTS = 10000
+
+
+def message_batch_poll_seconds() -> float:
+    """Seconds between Message Batches status polls (BANK_EXTRACTOR_BATCH_POLL_SECONDS, default 60)."""
+    try:
+        return max(0.1, float(os.environ.get("BANK_EXTRACTOR_BATCH_POLL_SECONDS", "60")))
+    except ValueError:
+        return 60.0
+
+
+class AIRequestsDeferred(Exception):
+    """A statement's AI requests have no batch results yet; carries the requests to submit."""
+
+    def __init__(self, requests: List[Dict], pages: Optional[Tuple] = None):
+        super().__init__(f"{len(requests)} AI requests deferred to a message batch")
+        self.requests = requests
+        self.pages = pages
+
+
+class _BatchRequester:
+    """
+    Stand-in for request_chunks during a Message Batches run. Chunk j of the statement's
+    n-th extract_transactions_with_ai call has custom_id "s<statement>-c<n>-<j>".
+    A result of None means the batch request errored or expired; that chunk is sent
+    directly instead.
+    """
+
+    def __init__(self, statement: int, results: Dict[str, Optional[Dict]], pages: Optional[Tuple] = None):
+        self.statement = statement
+        self.results = results
+        self.pages = pages
+        self.calls = 0
+        self.doc: Optional[StatementDocument] = None
+
+    def attach(self, doc: StatementDocument) -> None:
+        # Reuse the page text from the first pass so scanned statements are not OCR'd twice
+        self.doc = doc
+        if self.pages is not None:
+            doc._memo(('extracted_pages',), lambda: self.pages)
+
+    def __call__(self, client, model: str, system, contents: List[str], output_format: str = "json") -> List[Dict]:
+        call = self.calls
+        self.calls += 1
+        custom_ids = [f"s{self.statement}-c{call}-{j}" for j in range(len(contents))]
+
+        if not all(cid in self.results for cid in custom_ids):
+            requests = [
+                {
+                    "custom_id": cid,
+                    "params": {
+                        "model": model,
+                        "max_tokens": 32000,
+                        "temperature": 0,
+                        "system": system,
+                        "messages": [{"role": "user", "content": content}],
+                        **(ai_tool_params(output_format) or {}),
+                    },
+                }
+                for cid, content in zip(custom_ids, contents)
+            ]
+            pages = self.doc._cache.get(('extracted_pages',)) if self.doc is not None else None
+            raise AIRequestsDeferred(requests, pages)
+
+        chunk_results = []
+        for cid, content in zip(custom_ids, contents):
+            result = self.results[cid]
+            if result is None:
+                print(f"⚠️  Batch request {cid} has no result, sending it directly", file=sys.stderr)
+                result = _request_chunk(client, model, system, content, output_format)
+            chunk_results.append(result)
+        return chunk_results
+
+
+def run_message_batch(client, requests: List[Dict]) -> Dict[str, Optional[Dict]]:
+    """
+    Submit requests ({"custom_id", "params"}) as Message Batches jobs, wait for them to
+    end and return custom_id → chunk result (None for errored, canceled or expired
+    requests). Results are marked "batch" so their cost gets the batch discount.
+    """
+    models = {r["custom_id"]: r["params"]["model"] for r in requests}
+    # Batch management calls are cheap and not load-shed like messages; let the SDK retry them
+    client = client.with_options(max_retries=3)
+    batches = []
+    for start in range(0, len(requests), MESSAGE_BATCH_MAX_REQUESTS):
+        part = requests[start:start + MESSAGE_BATCH_MAX_REQUESTS]
+        batch = client.messages.batches.create(requests=part)
+        print(f"Message batch {batch.id}: {len(part)} requests submitted", file=sys.stderr)
+        batches.append(batch)
+
+    poll_seconds = message_batch_poll_seconds()
+    results: Dict[str, Optional[Dict]] = {}
+    for batch in batches:
+        while batch.processing_status != "ended":
+            time.sleep(poll_seconds)
+            batch = client.messages.batches.retrieve(batch.id)
+            counts = batch.request_counts
+            print(f"  … batch {batch.id}: {batch.processing_status}, {counts.processing} processing, "
+                  f"{counts.succeeded} succeeded, {counts.errored} errored", file=sys.stderr)
+
+        for entry in client.messages.batches.results(batch.id):
+            if entry.result.type == "succeeded":
+                chunk_result = _chunk_result_from_message(entry.result.message, models.get(entry.custom_id, ""))
+                chunk_result["batch"] = True
+                results[entry.custom_id] = chunk_result
+            else:
+                print(f"⚠️  Batch request {entry.custom_id}: {entry.result.type}", file=sys.stderr)
+                results[entry.custom_id] = None
+        print(f"✓ Message batch {batch.id} ended", file=sys.stderr)
+
+    for custom_id in models:
+        results.setdefault(custom_id, None)
+    return results
+
+
+# ─── Batch mode (many statements, one invocation) ────────────────────────────
+
+def _init_batch_worker(ai_limit) -> None:
+    """Process-pool initializer: share the batch-wide AI concurrency semaphore."""
+    global _AI_CONCURRENCY_LIMIT
+    _AI_CONCURRENCY_LIMIT = ai_limit
+
+
+def _run_batch_item(pdf_path: str, api_key: str, model: str, corrections: List[Dict],
+                    requester: Optional["_BatchRequester"] = None) -> Dict:
+    global _AI_REQUESTER
+    _AI_REQUESTER = requester
+    try:
+        result = run_extraction(pdf_path, api_key, model, corrections)
+    except AIRequestsDeferred as deferred:
+        return {"pdf_path": pdf_path, "deferred_requests": deferred.requests, "pages": deferred.pages}
+    finally:
+        _AI_REQUESTER = None
+    return {"pdf_path": pdf_path, **result}
+
+
+def read_batch_manifest(manifest_path: str) -> List[str]:
+    """
+    Read PDF paths from a manifest: either a JSON array of paths or a plain text file
+    with one path per line (blank lines and '#' comments ignored). '-' reads stdin.
+    """
+    if manifest_path == "-":
+        content = sys.stdin.read()
+    else:
+        with open(manifest_path, "r") as f:
+            content = f.read()
+
+    stripped = content.strip()
+    if stripped.startswith("["):
+        return [str(p) for p in json.loads(stripped) if p]
+
+    return [
+        line.strip() for line in content.splitlines()
+        if line.strip() and not line.strip().startswith("#")
+    ]
+
+
+def run_batch(pdf_paths: List[str], api_key: str, model: str, corrections: List[Dict],
+              workers: int, ai_concurrency: int, message_batches: bool = False) -> int:
+    """
+    Extract many statements in one invocation. Text extraction, OCR and deterministic
+    parsing fan out across a bounded process pool; Claude calls from every worker share
+    one concurrency limit. Prints one JSON Lines record per statement as each finishes
+    (same shape as the single-file output plus "pdf_path"). Returns the failure count.
+
+    With message_batches, statements that need Claude are parked instead: their AI
+    requests from the whole run go out as one Message Batches job, and once it has
+    ended those statements are run again with the batch results filled in.
+    """
+    workers = max(1, min(workers, len(pdf_paths) or 1))
+    ai_limit = multiprocessing.BoundedSemaphore(max(1, ai_concurrency))
+    failures = 0
+
+    print(f"Batch: {len(pdf_paths)} statements, {workers} workers, "
+          f"{ai_concurrency} concurrent AI requests"
+          f"{', AI via Message Batches' if message_batches else ''}", file=sys.stderr)
+
+    # Statement index → requester for the next pass (None runs AI requests directly)
+    pending: Dict[int, Optional[_BatchRequester]] = {
+        i: _BatchRequester(i, {}) if message_batches else None for i in range(len(pdf_paths))
+    }
+    batch_results: Dict[str, Optional[Dict]] = {}
+
+    while pending:
+        deferred_requests: List[Dict] = []
+        deferred_pages: Dict[int, Optional[Tuple]] = {}
+
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending)), initializer=_init_batch_worker,
+                                 initargs=(ai_limit,)) as pool:
+            futures = {
+                pool.submit(_run_batch_item, pdf_paths[i], api_key, model, corrections, requester): i
+                for i, requester in pending.items()
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    record = future.result()
+                except Exception as e:
+                    # Worker process died (e.g. OOM on a huge scan) — report, keep going
+                    record = {"pdf_path": pdf_paths[i], "success": False, "error": str(e)}
+                if "deferred_requests" in record:
+                    deferred_requests.extend(record["deferred_requests"])
+                    deferred_pages[i] = record["pages"]
+                    continue
+                if not record.get("success"):
+                    failures += 1
+                sys.stdout.write(json.dumps(record) + "\n")
+                sys.stdout.flush()
+
+        if not deferred_requests:
+            break
+
+        batch_results.update(run_message_batch(get_anthropic_client(api_key), deferred_requests))
+        pending = {
+            i: _BatchRequester(i, {cid: r for cid, r in batch_results.items() if cid.startswith(f"s{i}-")}, pages)
+            for i, pages in deferred_pages.items()
+        }
+
+    return failures
+
+
+def _batch_main(argv: List[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="bank_statement_extractor.py --batch",
+        description="Extract many bank statements, one JSON Lines record per statement.",
+    )
+    parser.add_argument("pdf_paths", nargs="*", help="PDF files to process")
+    parser.add_argument("--manifest", help="File listing PDF paths (JSON array or one per line, '-' for stdin)")
+    parser.add_argument("--api-key", default=os.environ.get("ANTHROPIC_API_KEY", ""))
+    parser.add_argument("--model", default="claude-haiku-4-5")
+    parser.add_argument("--corrections", default="[]", help="Corrections JSON, same as the single-file CLI")
+    parser.add_argument("--workers", type=int,
+                        default=int(os.environ.get("BANK_EXTRACTOR_BATCH_WORKERS", os.cpu_count() or 4)))
+    parser.add_argument("--ai-concurrency", type=int,
+                        default=int(os.environ.get("BANK_EXTRACTOR_AI_CONCURRENCY", 4)))
+    parser.add_argument("--message-batches", action="store_true",
+                        help="Send all AI requests as one Message Batches job (half price, results within 24h)")
+    args = parser.parse_args(argv)
+
+    pdf_paths = list(args.pdf_paths)
+    if args.manifest:
+        pdf_paths.extend(read_batch_manifest(args.manifest))
+    if not pdf_paths:
+        parser.error("no PDF paths given (pass paths and/or --manifest)")
+
+    try:
+        corrections = json.loads(args.corrections) if args.corrections else []
+    except json.JSONDecodeError:
+        corrections = []
+
+    failures = run_batch(pdf_paths, args.api_key, args.model, corrections,
+                         args.workers, args.ai_concurrency, args.message_batches)
+    sys.exit(1 if failures else 0)
+
+
+def main():
+    # Server mode: keep the interpreter, imports and API clients warm between statements
+    if len(sys.argv) > 1 and sys.argv[1] == "--serve":
+        if len(sys.argv) < 3:
+            print(json.dumps({
+                "success": False,
+                "error": "Usage: python3 bank_statement_extractor.py --serve <socket_path>"
+            }))
+            sys.exit(1)
+        serve(sys.argv[2])
+        return
+
+    # Batch mode: many PDFs in one invocation, JSON Lines output
+    if len(sys.argv) > 1 and sys.argv[1] == "--batch":
+        _batch_main(sys.argv[2:])
+        return
+
+    # Parse command line arguments
+    if len(sys.argv) < 3:
+        print(json.dumps({
+            "success": False,
+            "error": "Usage: python3 bank_statement_extractor.py <pdf_path> <api_key> [model] [corrections_json]"
+        }))
+        sys.exit(1)
+
+    pdf_path = sys.argv[1]
+    api_key = sys.argv[2]
+    model = sys.argv[3] if len(sys.argv) > 3 else "claude-haiku-4-5"  # Default to most cost-effective model
+
+    # Parse corrections JSON if provided
+    corrections = []
+    if len(sys.argv) > 4:
+        try:
+            corrections = json.loads(sys.argv[4])
+        except json.JSONDecodeError:
+            corrections = []
+
+    result = run_extraction(pdf_path, api_key, model, corrections)
+    print(json.dumps(result))
+    if not result.get("success"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+AI Response Format Benchmark
+Compares the "json" and "compact" AI output formats of bank_statement_extractor.py.
+
+Offline (default): renders each statement's deterministic transactions in both formats
+exactly as the prompts ask Claude to write them, checks that the compact rows parse
+back to the same transactions, and compares output size in tokens (counted by the
+API when --count-tokens is given, otherwise estimated with estimate_tokens) and the
+decode time that implies at --tokens-per-sec.
+
+Estimate check (--check-estimate): counts each statement page with the API and with
+estimate_tokens (which sizes AI chunks) and reports how far the estimate is off.
+
+Live (--live): runs extract_transactions_with_ai on each statement once per format and
+reports wall time, output tokens, cost and transaction count from the real API.
+
+Usage: python3 benchmark_ai_format.py [--live | --count-tokens | --check-estimate] [--model MODEL] [pdf_path ...]
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from typing import Dict, List
+
+from bank_statement_extractor import (
+    StatementDocument, calculate_api_cost, estimate_tokens, extract_text_from_pdf,
+    extract_transactions_deterministic, extract_transactions_with_ai, get_anthropic_client,
+    parse_compact_response,
+)
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+
+
+def render_json(transactions: List[Dict]) -> str:
+    """Transactions as the json format asks for them (one object per line)."""
+    rows = ',\n'.join('    ' + json.dumps({
+        "date": t["date"], "description": t["description"], "amount": t["amount"], "type": t["type"],
+        **({"ending_balance": t["ending_balance"]} if t.get("ending_balance") is not None else {}),
+    }) for t in transactions)
+    return '{\n  "transactions": [\n' + rows + '\n  ]\n}'
+
+
+def render_compact(transactions: List[Dict]) -> str:
+    """Transactions as the compact format asks for them."""
+    lines = ["SUMMARY|||", "date|type|amount|ending_balance|description"]
+    for t in transactions:
+        balance = t.get("ending_balance")
+        lines.append('|'.join([
+            t["date"], "C" if t["type"] == "credit" else "D", f'{t["amount"]:.2f}',
+            f'{balance:.2f}' if balance is not None else '', t["description"],
+        ]))
+    return '\n'.join(lines)
+
+
+def count_tokens(text: str, client, model: str) -> int:
+    if client is None:
+        return estimate_tokens(text)
+    # count_tokens measures a whole request; subtract the cost of an empty one
+    full = client.messages.count_tokens(model=model, messages=[{"role": "user", "content": text}])
+    empty = client.messages.count_tokens(model=model, messages=[{"role": "user", "content": "."}])
+    return full.input_tokens - empty.input_tokens
+
+
+def benchmark_offline(pdf_paths: List[str], client, model: str, tokens_per_sec: float) -> None:
+    header = f"{'PDF':<40} {'txns':>5} {'json tok':>9} {'compact tok':>12} {'saving':>7} {'json s':>7} {'compact s':>10}"
+    print(header)
+    print('-' * len(header))
+    totals = {"json": 0, "compact": 0}
+    for pdf_path in pdf_paths:
+        name = os.path.basename(pdf_path)[:40]
+        with StatementDocument(pdf_path) as doc:
+            transactions, ok, _ = extract_transactions_deterministic(doc)
+        if not ok:
+            print(f"{name:<40} skipped (no deterministic reference; use --live)")
+            continue
+
+        compact = render_compact(transactions)
+        parsed = parse_compact_response(compact)["transactions"]
+        roundtrip = [(t["date"], t["type"], round(t["amount"], 2), t["description"]) for t in parsed] == \
+                    [(t["date"], t["type"], round(t["amount"], 2), t["description"].strip()) for t in transactions]
+
+        json_tokens = count_tokens(render_json(transactions), client, model)
+        compact_tokens = count_tokens(compact, client, model)
+        totals["json"] += json_tokens
+        totals["compact"] += compact_tokens
+        saving = 1 - compact_tokens / json_tokens if json_tokens else 0
+        print(f"{name:<40} {len(transactions):>5} {json_tokens:>9} {compact_tokens:>12} {saving:>6.0%} "
+              f"{json_tokens / tokens_per_sec:>7.1f} {compact_tokens / tokens_per_sec:>10.1f}"
+              f"{'' if roundtrip else '  (compact round-trip MISMATCH)'}")
+
+    if totals["json"]:
+        print(f"\nTotal output tokens: json {totals['json']}, compact {totals['compact']} "
+              f"({1 - totals['compact'] / totals['json']:.0%} fewer)")
+    if client is None:
+        print("Token counts are estimates; pass --count-tokens for exact counts.")
+
+
+def check_estimate(pdf_paths: List[str], client, model: str) -> None:
+    header = f"{'PDF':<40} {'pages':>5} {'counted':>8} {'estimated':>10} {'error':>7} {'worst page':>11}"
+    print(header)
+    print('-' * len(header))
+    totals = {"counted": 0, "estimated": 0}
+    for pdf_path in pdf_paths:
+        name = os.path.basename(pdf_path)[:40]
+        with StatementDocument(pdf_path) as doc:
+            pages = [t for t in doc.page_texts() if t.strip()]
+        counted = [count_tokens(t, client, model) for t in pages]
+        estimated = [estimate_tokens(t) for t in pages]
+        if not sum(counted):
+            print(f"{name:<40} skipped (no text layer)")
+            continue
+        totals["counted"] += sum(counted)
+        totals["estimated"] += sum(estimated)
+        worst = max((e / c - 1 for c, e in zip(counted, estimated) if c), key=abs)
+        print(f"{name:<40} {len(pages):>5} {sum(counted):>8} {sum(estimated):>10} "
+              f"{sum(estimated) / sum(counted) - 1:>+7.0%} {worst:>+11.0%}")
+
+    if totals["counted"]:
+        print(f"\nTotal: counted {totals['counted']}, estimated {totals['estimated']} "
+              f"({totals['estimated'] / totals['counted'] - 1:+.0%}); a chunk budget of N estimated "
+              f"tokens is about {totals['counted'] / totals['estimated']:.2f}N real ones")
+
+
+def benchmark_live(pdf_paths: List[str], api_key: str, model: str) -> None:
+    header = f"{'PDF':<40} {'format':<8} {'txns':>5} {'out tok':>8} {'wall s':>7} {'cost $':>8}"
+    print(header)
+    print('-' * len(header))
+    for pdf_path in pdf_paths:
+        name = os.path.basename(pdf_path)[:40]
+        with StatementDocument(pdf_path) as doc:
+            pdf_text, _, _ = extract_text_from_pdf(doc)
+        for fmt in ("json", "compact"):
+            os.environ["BANK_EXTRACTOR_AI_FORMAT"] = fmt
+            start = time.perf_counter()
+            transactions, usage, _ = extract_transactions_with_ai(pdf_text, api_key, model, [])
+            wall = time.perf_counter() - start
+            cost = calculate_api_cost(usage)
+            print(f"{name:<40} {fmt:<8} {len(transactions):>5} {usage['completion_tokens']:>8} "
+                  f"{wall:>7.1f} {cost['total_cost']:>8.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark json vs compact AI output formats")
+    parser.add_argument("pdf_paths", nargs="*", help="PDF files (default: sample PDFs in the repo root)")
+    parser.add_argument("--model", default="claude-haiku-4-5")
+    parser.add_argument("--api-key", default=os.environ.get("ANTHROPIC_API_KEY"))
+    parser.add_argument("--live", action="store_true", help="Run real extractions with both formats")
+    parser.add_argument("--count-tokens", action="store_true", help="Count tokens with the API instead of estimating")
+    parser.add_argument("--check-estimate", action="store_true",
+                        help="Compare estimate_tokens with API token counts on each page")
+    parser.add_argument("--tokens-per-sec", type=float, default=80.0,
+                        help="Output decode speed used to estimate time offline (default 80)")
+    args = parser.parse_args()
+
+    pdf_paths = args.pdf_paths or sorted(glob.glob(os.path.join(REPO_ROOT, '*.pdf')))
+    if (args.live or args.count_tokens or args.check_estimate) and not args.api_key:
+        print("--live, --count-tokens and --check-estimate need --api-key or ANTHROPIC_API_KEY", file=sys.stderr)
+        sys.exit(1)
+
+    if args.live:
+        benchmark_live(pdf_paths, args.api_key, args.model)
+    elif args.check_estimate:
+        check_estimate(pdf_paths, get_anthropic_client(args.api_key), args.model)
+    else:
+        client = get_anthropic_client(args.api_key) if args.count_tokens else None
+        benchmark_offline(pdf_paths, client, args.model, args.tokens_per_sec)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+AI Path Benchmark
+Runs extract_transactions_with_ai against a local anthropic_stub_server.py, so chunk
+concurrency, retry/backoff, streaming and response parsing can be measured
+deterministically and without API spend.
+
+Each statement is extracted once per fault profile and concurrency setting. The stub
+answers with recorded responses (--replay DIR, e.g. captured earlier with
+`anthropic_stub_server.py --record DIR --upstream https://api.anthropic.com`) or with
+synthetic ones, and injects errors, truncation and mid-stream failures from a seeded
+RNG, so two runs with the same --seed see the same faults in the same order.
+
+Profiles:
+  clean       no faults
+  overloaded  15% 529 overloaded, 5% 429 rate limited
+  flaky       5% each of 500 and 503, 10% of streams dropped midway
+  truncated   20% of responses cut short at max_tokens
+
+Usage: python3 benchmark_ai_path.py [--profile NAME ...] [--concurrency N ...] [--latency S]
+                                    [--tokens-per-sec N] [--replay DIR] [--seed N] [pdf_path ...]
+"""
+
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+import bank_statement_extractor as extractor
+from anthropic_stub_server import start_stub_server
+from bank_statement_extractor import StatementDocument, extract_text_from_pdf, extract_transactions_with_ai
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+
+PROFILES = {
+    "clean": {},
+    "overloaded": {"error_rates": {529: 0.15, 429: 0.05}, "retry_after": 0},
+    "flaky": {"error_rates": {500: 0.05, 503: 0.05}, "stream_error_rate": 0.1},
+    "truncated": {"truncate_rate": 0.2},
+}
+
+
+class _ParseTimer:
+    """Wraps extractor.scan_ai_response to add up the time spent parsing responses."""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self._parse = extractor.scan_ai_response
+
+    def __call__(self, result: str, output_format: str, cut_off: bool = False) -> Tuple[Dict, Optional[int]]:
+        start = time.perf_counter()
+        try:
+            return self._parse(result, output_format, cut_off)
+        finally:
+            self.seconds += time.perf_counter() - start
+
+
+def benchmark_run(pdf_text: str, model: str, profile: str, concurrency: int, stub_options: Dict) -> Dict:
+    """One extraction against a fresh stub; wall time, parse time, stub request counts."""
+    server, base_url = start_stub_server(**stub_options, **PROFILES[profile])
+    limiter_file = tempfile.NamedTemporaryFile(prefix="bench_limiter_", suffix=".json", delete=False).name
+    os.environ.update({
+        "BANK_EXTRACTOR_API_BASE_URL": base_url,
+        "BANK_EXTRACTOR_AI_CONCURRENCY": str(concurrency),
+        "BANK_EXTRACTOR_LIMITER_FILE": limiter_file,
+    })
+    timer = _ParseTimer()
+    extractor.scan_ai_response = timer
+    start = time.perf_counter()
+    try:
+        transactions, usage, _ = extract_transactions_with_ai(pdf_text, "stub-key", model, [])
+        error = None
+    except Exception as e:
+        transactions, usage, error = [], {}, f"{type(e).__name__}: {e}"
+    finally:
+        wall = time.perf_counter() - start
+        extractor.scan_ai_response = timer._parse
+        server.shutdown()
+        server.server_close()
+        os.unlink(limiter_file)
+
+    return {
+        "wall": wall,
+        "parse_ms": timer.seconds * 1000,
+        "transactions": len(transactions),
+        "escalated": len(usage.get("escalated_chunks") or []),
+        "error": error,
+        **server.state.stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the AI extraction path against a local API stand-in")
+    parser.add_argument("pdf_paths", nargs="*", help="PDF files (default: sample PDFs in the repo root)")
+    parser.add_argument("--model", default="claude-haiku-4-5")
+    parser.add_argument("--profile", action="append", choices=sorted(PROFILES),
+                        help="Fault profile to run, repeatable (default: all)")
+    parser.add_argument("--concurrency", action="append", type=int,
+                        help="BANK_EXTRACTOR_AI_CONCURRENCY values to compare, repeatable (default: 1 and 4)")
+    parser.add_argument("--latency", type=float, default=0.5, help="Stub time to first byte in seconds (default 0.5)")
+    parser.add_argument("--tokens-per-sec", type=float, default=400.0,
+                        help="Stub output pacing (default 400; 0 for unpaced)")
+    parser.add_argument("--replay", help="Directory of recorded responses (default: synthetic responses)")
+    parser.add_argument("--seed", type=int, default=1, help="Fault injection seed (default 1)")
+    parser.add_argument("--retry-base", type=float, default=0.1,
+                        help="BANK_EXTRACTOR_RETRY_BASE_SECONDS for the run (default 0.1)")
+    parser.add_argument("--no-stream", action="store_true", help="Use non-streaming requests")
+    args = parser.parse_args()
+
+    pdf_paths: List[str] = args.pdf_paths or sorted(glob.glob(os.path.join(REPO_ROOT, '*.pdf')))
+    if not pdf_paths:
+        print("No PDFs to benchmark", file=sys.stderr)
+        sys.exit(1)
+
+    # Measure the request path itself, not the caches in front of it
+    os.environ.update({
+        "BANK_EXTRACTOR_RESPONSE_CACHE": "0",
+        "BANK_EXTRACTOR_RETRY_BASE_SECONDS": str(args.retry_base),
+        "BANK_EXTRACTOR_STREAM": "0" if args.no_stream else "1",
+    })
+    stub_options = {"latency": args.latency, "tokens_per_sec": args.tokens_per_sec, "seed": args.seed,
+                    "replay_dir": args.replay}
+
+    header = (f"{'PDF':<36} {'profile':<11} {'conc':>4} {'wall s':>7} {'parse ms':>9} {'txns':>5} "
+              f"{'reqs':>5} {'errors':>6} {'trunc':>5} {'drops':>5} {'esc':>4}")
+    print(header)
+    print('-' * len(header))
+    for pdf_path in pdf_paths:
+        name = os.path.basename(pdf_path)[:36]
+        with StatementDocument(pdf_path) as doc:
+            pdf_text, _, _ = extract_text_from_pdf(doc)
+        for profile in args.profile or list(PROFILES):
+            for concurrency in args.concurrency or [1, 4]:
+                r = benchmark_run(pdf_text, args.model, profile, concurrency, stub_options)
+                print(f"{name:<36} {profile:<11} {concurrency:>4} {r['wall']:>7.2f} {r['parse_ms']:>9.1f} "
+                      f"{r['transactions']:>5} {r['requests']:>5} {r['errors']:>6} {r['truncated']:>5} "
+                      f"{r['stream_errors']:>5} {r['escalated']:>4}"
+                      f"{'  ' + r['error'] if r['error'] else ''}")
+
+
+if __name__ == "__main__":
+    main()
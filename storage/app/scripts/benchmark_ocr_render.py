@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+OCR Page Render Benchmark
+Compares the OCR rendering backends of bank_statement_extractor.py (PyMuPDF pixmaps
+vs pdf2image/poppler) on the same pages, optionally including the tesseract pass.
+
+Usage: python3 benchmark_ocr_render.py [--pages N] [--dpi N] [--repeat N] [--ocr] [pdf_path ...]
+
+With no PDFs given, the sample statements in the repository root are used.
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+from typing import Dict, List
+
+from bank_statement_extractor import OCR_RENDERERS, StatementDocument, _ocr_image, render_pages
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+
+
+def benchmark_backend(pdf_path: str, renderer: str, pages: int, dpi: int,
+                      repeat: int, ocr: bool) -> Dict:
+    """Time one backend on the first `pages` pages of a PDF, best of `repeat` runs."""
+    best_render = best_ocr = float('inf')
+    peak_pixels = 0
+    with StatementDocument(pdf_path) as doc:
+        page_numbers = list(range(1, min(pages, doc.page_count) + 1))
+        for _ in range(repeat):
+            render_time = ocr_time = 0.0
+            pending = render_pages(doc, page_numbers, dpi=dpi, renderer=renderer)
+            while True:
+                start = time.perf_counter()
+                try:
+                    _, image = next(pending)
+                except StopIteration:
+                    break
+                render_time += time.perf_counter() - start
+                peak_pixels = max(peak_pixels, image.width * image.height)
+                if ocr:
+                    start = time.perf_counter()
+                    _ocr_image(image)
+                    ocr_time += time.perf_counter() - start
+            best_render = min(best_render, render_time)
+            best_ocr = min(best_ocr, ocr_time)
+
+    n = len(page_numbers) or 1
+    return {
+        "pages": len(page_numbers),
+        "render_ms_per_page": best_render * 1000 / n,
+        "ocr_ms_per_page": best_ocr * 1000 / n if ocr else None,
+        "peak_megapixels": peak_pixels / 1_000_000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark OCR page rendering backends")
+    parser.add_argument("pdf_paths", nargs="*", help="PDF files (default: sample PDFs in the repo root)")
+    parser.add_argument("--pages", type=int, default=5, help="Pages per PDF (default 5)")
+    parser.add_argument("--dpi", type=int, default=150, help="Render DPI (default 150, as used for OCR)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per backend, best is reported (default 3)")
+    parser.add_argument("--ocr", action="store_true", help="Also time tesseract on each rendered page")
+    args = parser.parse_args()
+
+    pdf_paths: List[str] = args.pdf_paths or sorted(glob.glob(os.path.join(REPO_ROOT, '*.pdf')))
+    if not pdf_paths:
+        print("No PDFs to benchmark", file=sys.stderr)
+        sys.exit(1)
+
+    header = f"{'PDF':<44} {'backend':<10} {'pages':>5} {'render ms/pg':>13} {'ocr ms/pg':>10} {'MPix':>6}"
+    print(header)
+    print('-' * len(header))
+    totals: Dict[str, List[float]] = {name: [] for name in OCR_RENDERERS}
+
+    for pdf_path in pdf_paths:
+        name = os.path.basename(pdf_path)[:44]
+        for renderer in OCR_RENDERERS:
+            try:
+                r = benchmark_backend(pdf_path, renderer, args.pages, args.dpi, args.repeat, args.ocr)
+            except Exception as e:
+                print(f"{name:<44} {renderer:<10} unavailable: {e}")
+                continue
+            totals[renderer].append(r["render_ms_per_page"])
+            ocr_ms = f"{r['ocr_ms_per_page']:.1f}" if r["ocr_ms_per_page"] is not None else '-'
+            print(f"{name:<44} {renderer:<10} {r['pages']:>5} {r['render_ms_per_page']:>13.1f} "
+                  f"{ocr_ms:>10} {r['peak_megapixels']:>6.2f}")
+
+    print()
+    for renderer, times in totals.items():
+        if times:
+            print(f"{renderer:<10} mean render latency: {sum(times) / len(times):.1f} ms/page over {len(times)} PDFs")
+
+
+if __name__ == "__main__":
+    main()